@@ -3,25 +3,38 @@ from fastapi.responses import JSONResponse
 
 from app.models.schemas import (
     SPKDeleteRequest,
+    SPKCheckRequest,
     SPKCheckResponse,
     SPKDeleteResponse,
     DashboardQueryResponse,
+    DashboardCacheInvalidateResponse,
+    DashboardHierarchyResponse,
     SPKNumberQueryResponse
 )
 from app.models.user import UserInDB
-from app.services.arcgis_service import ArcGISService
+from app.services.async_arcgis_service import AsyncArcGISService
 from app.core.dependencies import get_user_gis_credentials, get_current_active_user
 
 router = APIRouter()
 
 
+@router.get("/dashboard/hierarchy", response_model=DashboardHierarchyResponse, tags=["Dashboard"])
+async def get_hierarchy(
+    current_user: UserInDB = Depends(get_current_active_user),
+    gis_credentials: dict = Depends(get_user_gis_credentials)
+):
+    arcgis_service = AsyncArcGISService(gis_credentials)
+    hierarchy = await arcgis_service.get_hierarchy(current_user.gis_auth_username)
+    return {"vendor_code": current_user.gis_auth_username, "regions": hierarchy.to_dict()}
+
+
 @router.get("/dashboard/regions", response_model=DashboardQueryResponse, tags=["Dashboard"])
 async def get_regions(
     current_user: UserInDB = Depends(get_current_active_user),
     gis_credentials: dict = Depends(get_user_gis_credentials)
 ):
-    arcgis_service = ArcGISService(gis_credentials)
-    values = arcgis_service.get_regions(current_user.gis_auth_username)
+    arcgis_service = AsyncArcGISService(gis_credentials)
+    values = await arcgis_service.get_regions(current_user.gis_auth_username)
     return {"values": values}
 
 
@@ -31,8 +44,8 @@ async def get_districts(
     current_user: UserInDB = Depends(get_current_active_user),
     gis_credentials: dict = Depends(get_user_gis_credentials)
 ):
-    arcgis_service = ArcGISService(gis_credentials)
-    values = arcgis_service.get_districts(current_user.gis_auth_username, region)
+    arcgis_service = AsyncArcGISService(gis_credentials)
+    values = await arcgis_service.get_districts(current_user.gis_auth_username, region)
     return {"values": values}
 
 
@@ -42,8 +55,8 @@ async def get_petaks(
     current_user: UserInDB = Depends(get_current_active_user),
     gis_credentials: dict = Depends(get_user_gis_credentials)
 ):
-    arcgis_service = ArcGISService(gis_credentials)
-    values = arcgis_service.get_petaks(current_user.gis_auth_username, district)
+    arcgis_service = AsyncArcGISService(gis_credentials)
+    values = await arcgis_service.get_petaks(current_user.gis_auth_username, district)
     return {"values": values}
 
 
@@ -53,18 +66,26 @@ async def get_spk_numbers(
     current_user: UserInDB = Depends(get_current_active_user),
     gis_credentials: dict = Depends(get_user_gis_credentials)
 ):
-    arcgis_service = ArcGISService(gis_credentials)
-    values = arcgis_service.get_spk_numbers(current_user.gis_auth_username, petak)
+    arcgis_service = AsyncArcGISService(gis_credentials)
+    values = await arcgis_service.get_spk_numbers(current_user.gis_auth_username, petak)
     return {"values": values}
 
 
+@router.delete("/dashboard/cache", response_model=DashboardCacheInvalidateResponse, tags=["Dashboard"])
+async def invalidate_dashboard_cache(
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    invalidated = AsyncArcGISService.invalidate_dashboard_cache(current_user.gis_auth_username)
+    return {"success": True, "invalidated": invalidated}
+
+
 @router.post("/spk/check", response_model=SPKCheckResponse, tags=["ArcGIS"])
 async def check_spk(
-    request: SPKDeleteRequest,
+    request: SPKCheckRequest,
     gis_credentials: dict = Depends(get_user_gis_credentials)
 ):
-    arcgis_service = ArcGISService(gis_credentials)
-    result = arcgis_service.check_spk_exists(request.spk_number)
+    arcgis_service = AsyncArcGISService(gis_credentials)
+    result = await arcgis_service.check_spk_exists(request.spk_number, request.include_oids)
     return result
 
 
@@ -73,6 +94,6 @@ async def delete_spk(
     request: SPKDeleteRequest,
     gis_credentials: dict = Depends(get_user_gis_credentials)
 ):
-    arcgis_service = ArcGISService(gis_credentials)
-    result = arcgis_service.delete_spk(request.spk_number)
+    arcgis_service = AsyncArcGISService(gis_credentials)
+    result = await arcgis_service.delete_spk(request.spk_number)
     return result
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.models.user import UserCreate, UserLogin, UserResponse, User, Token
+from fastapi.concurrency import run_in_threadpool
+from app.models.user import UserCreate, UserLogin, UserResponse, User, Token, LogoutResponse
 from app.services.user_service import UserService
 from app.services.arcgis_service import ArcGISService
-from app.core.security import create_access_token
-from app.core.dependencies import get_current_active_user
+from app.core.security import create_access_token, token_claims
+from app.core.dependencies import get_current_active_user, get_token_payload
+from app.core.revocation import revocation_list
 from app.models.user import UserInDB
 
 router = APIRouter()
@@ -23,7 +25,8 @@ async def register(user_create: UserCreate):
     """
     try:
         # Validate GIS Auth credentials with ArcGIS server
-        is_valid = ArcGISService.validate_gis_auth_credentials(
+        is_valid = await run_in_threadpool(
+            ArcGISService.validate_gis_auth_credentials,
             user_create.gis_auth_username,
             user_create.gis_auth_password
         )
@@ -35,10 +38,10 @@ async def register(user_create: UserCreate):
             )
 
         # Create user
-        user = UserService.create_user(user_create)
+        user = await UserService.create_user(user_create)
 
         # Create access token
-        access_token = create_access_token(data={"sub": user.id, "gis_auth_username": user.gis_auth_username})
+        access_token = create_access_token(data=token_claims(user))
 
         # Return user without sensitive data
         user_response = User(
@@ -71,7 +74,7 @@ async def login(user_login: UserLogin):
 
     Returns access token and user information.
     """
-    user = UserService.authenticate_user(user_login.gis_auth_username, user_login.gis_auth_password)
+    user = await UserService.authenticate_user(user_login.gis_auth_username, user_login.gis_auth_password)
 
     if not user:
         raise HTTPException(
@@ -81,7 +84,7 @@ async def login(user_login: UserLogin):
         )
 
     # Create access token
-    access_token = create_access_token(data={"sub": user.id, "gis_auth_username": user.gis_auth_username})
+    access_token = create_access_token(data=token_claims(user))
 
     # Return user without sensitive data
     user_response = User(
@@ -111,3 +114,20 @@ async def get_current_user_info(current_user: UserInDB = Depends(get_current_act
         is_active=current_user.is_active,
         created_at=current_user.created_at
     )
+
+
+@router.post("/logout", response_model=LogoutResponse, tags=["Authentication"])
+async def logout(payload: dict = Depends(get_token_payload)):
+    """
+    Revoke the bearer token used for this request.
+
+    Tokens issued before token IDs were added cannot be revoked one by one,
+    so for those every token of the user is revoked. Revocations are
+    enforced in both auth modes.
+    """
+    if payload.get("jti"):
+        await revocation_list.revoke_token(payload["jti"], payload["exp"])
+    else:
+        await revocation_list.revoke_user(payload["sub"])
+
+    return LogoutResponse(success=True, message="Token revoked")
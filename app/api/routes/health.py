@@ -1,7 +1,15 @@
 from fastapi import APIRouter
 
 from app.core.config import settings
-from app.models.schemas import HealthResponse
+from app.core.security import password_hasher
+from app.models.schemas import (
+    HealthResponse,
+    ArcGISConcurrencyResponse,
+    CacheStatsResponse,
+    PasswordHasherStatsResponse
+)
+from app.services.async_arcgis_service import arcgis_limiter
+from app.services.user_service import UserService
 
 router = APIRouter()
 
@@ -13,3 +21,21 @@ async def health_check():
         "version": settings.VERSION,
         "app_name": settings.APP_NAME
     }
+
+
+@router.get("/health/arcgis", response_model=ArcGISConcurrencyResponse, tags=["Health"])
+async def arcgis_concurrency():
+    """Current adaptive ArcGIS concurrency limit and observed request latencies"""
+    return arcgis_limiter.stats()
+
+
+@router.get("/health/users", response_model=CacheStatsResponse, tags=["Health"])
+async def user_cache_stats():
+    """Size and hit/miss counters of the in-process user cache used for authentication"""
+    return UserService.cache_stats()
+
+
+@router.get("/health/auth", response_model=PasswordHasherStatsResponse, tags=["Health"])
+async def password_hasher_stats():
+    """bcrypt worker pool size, queue depth and shed logins"""
+    return password_hasher.stats()
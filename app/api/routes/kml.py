@@ -1,22 +1,44 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
 from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
-import shutil
-import pandas as pd
+from typing import Any, Dict, List, Optional
+import logging
 
 from app.models.schemas import (
     ShapefileGenerateResponse,
     ProcessCompleteResponse,
     UploadToArcGISResponse,
+    UploadStatusResponse,
     KMLMetadata
 )
 from app.services.kml_parser import KMLParser
 from app.services.shapefile_service import ShapefileService
-from app.services.arcgis_service import ArcGISService
+from app.services.artifacts import get_artifact_store
+from app.services.async_arcgis_service import AsyncArcGISService
+from app.services.esri_json import EsriJSONEncoder
+from app.services.upload_journal import UploadJournal, get_upload_journal
 from app.utils.file_utils import FileUtils
-from app.core.exceptions import InvalidFileFormatError
+from app.utils.workspace import get_workspace_manager
+from app.core.config import settings
+from app.core.exceptions import InvalidFileFormatError, FileProcessingError
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+UPLOAD_MODES = ("direct", "portal")
+SYNC_STRATEGIES = ("replace", "upsert")
+
+EDIT_ZIP = "zones_for_edit.zip"
+FINAL_ZIP = "final_upload.zip"
+
+
+def _artifact_path(filename: str, artifact_id: str, missing: str) -> Path:
+    """File of an artifact; 404 with `missing` as detail if the ID is unknown or expired."""
+    path = get_artifact_store().path(artifact_id, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail=missing)
+    return path
 
 
 @router.post("/generate-shapefile", response_model=ShapefileGenerateResponse, tags=["Processing"])
@@ -27,12 +49,13 @@ async def generate_shapefile_for_edit(
     if not FileUtils.validate_file_extension(kml_zip.filename, ['.zip']):
         raise InvalidFileFormatError("File must be a ZIP archive")
 
-    work_dir = FileUtils.get_work_dir()
+    workspace = get_workspace_manager().create()
+    work_dir = workspace.path
 
     try:
         # Save and extract KML ZIP
-        zip_path = await FileUtils.save_upload_file(kml_zip, work_dir, "data.zip")
-        FileUtils.extract_zip(zip_path, work_dir)
+        zip_path = await FileUtils.save_upload_file(kml_zip, work_dir, "data.zip", workspace)
+        FileUtils.extract_zip(zip_path, work_dir, workspace)
 
         # Parse KMLs
         parser = KMLParser()
@@ -41,10 +64,10 @@ async def generate_shapefile_for_edit(
         # Create shapefile for editing
         shapefile_service = ShapefileService()
         edit_zip = shapefile_service.create_shapefile_for_edit(merged_gdf, spk_number, work_dir)
+        workspace.check_quota()
 
-        # Copy to a permanent location for download
-        output_file = Path("zones_for_edit.zip")
-        shutil.copy(edit_zip, output_file)
+        # Keep a copy for download under this request's own ID
+        artifact_id = get_artifact_store().save(edit_zip, EDIT_ZIP)
 
         metadata = parser.extract_kml_metadata(merged_gdf)
 
@@ -53,22 +76,23 @@ async def generate_shapefile_for_edit(
             "message": "Shapefile generated successfully for QGIS editing",
             "total_zones": metadata["total_zones"],
             "zone_names": metadata["zone_names"],
-            "filename": output_file.name
+            "filename": EDIT_ZIP,
+            "artifact_id": artifact_id
         }
 
     finally:
-        FileUtils.cleanup_work_dir(work_dir)
+        workspace.cleanup()
 
 
 @router.get("/download/shapefile-for-edit", tags=["Processing"])
-async def download_shapefile_for_edit():
-    file_path = Path("zones_for_edit.zip")
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found. Generate shapefile first.")
+async def download_shapefile_for_edit(
+    artifact_id: str = Query(..., description="artifact_id returned by generate-shapefile")
+):
+    file_path = _artifact_path(EDIT_ZIP, artifact_id, "File not found. Generate shapefile first.")
 
     return FileResponse(
         path=file_path,
-        filename="zones_for_edit.zip",
+        filename=EDIT_ZIP,
         media_type="application/zip"
     )
 
@@ -87,20 +111,22 @@ async def process_complete_workflow(
     if not FileUtils.validate_file_extension(excel_file.filename, ['.xlsx', '.xls', '.xlsm']):
         raise InvalidFileFormatError("Excel file must be .xlsx, .xls, or .xlsm")
 
-    work_dir = FileUtils.get_work_dir()
+    workspace = get_workspace_manager().create()
+    work_dir = workspace.path
 
     try:
         # Save and extract KML ZIP
-        zip_path = await FileUtils.save_upload_file(kml_zip, work_dir, "data.zip")
-        FileUtils.extract_zip(zip_path, work_dir)
+        zip_path = await FileUtils.save_upload_file(kml_zip, work_dir, "data.zip", workspace)
+        FileUtils.extract_zip(zip_path, work_dir, workspace)
 
         # Save Excel file
-        excel_path = await FileUtils.save_upload_file(excel_file, work_dir, "data.xlsx")
+        excel_path = await FileUtils.save_upload_file(excel_file, work_dir, "data.xlsx", workspace)
 
         # Parse KMLs or load edited shapefile
         if edited_shapefile:
             shapefile_service = ShapefileService()
-            edited_zip_path = await FileUtils.save_upload_file(edited_shapefile, work_dir, "edited.zip")
+            edited_zip_path = await FileUtils.save_upload_file(edited_shapefile, work_dir, "edited.zip", workspace)
+            workspace.check_quota(incoming=FileUtils.zip_size(edited_zip_path))
             merged_gdf = shapefile_service.load_shapefile_from_zip(edited_zip_path, work_dir)
         else:
             parser = KMLParser()
@@ -112,32 +138,33 @@ async def process_complete_workflow(
 
         # Create final shapefile ZIP
         final_zip = shapefile_service.create_final_shapefile(filtered_gdf, df_summary, spk_number, work_dir)
+        workspace.check_quota()
 
-        # Copy to permanent location
-        output_file = Path("final_upload.zip")
-        shutil.copy(final_zip, output_file)
+        # Keep a copy for download and upload under this request's own ID
+        artifact_id = get_artifact_store().save(final_zip, FINAL_ZIP)
 
         return {
             "success": True,
             "message": "Processing completed successfully",
             "total_zones": len(filtered_gdf),
             "columns": filtered_gdf.columns.tolist(),
-            "filename": output_file.name
+            "filename": FINAL_ZIP,
+            "artifact_id": artifact_id
         }
 
     finally:
-        FileUtils.cleanup_work_dir(work_dir)
+        workspace.cleanup()
 
 
 @router.get("/download/final-upload", tags=["Processing"])
-async def download_final_upload():
-    file_path = Path("final_upload.zip")
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found. Process workflow first.")
+async def download_final_upload(
+    artifact_id: str = Query(..., description="artifact_id returned by process")
+):
+    file_path = _artifact_path(FINAL_ZIP, artifact_id, "File not found. Process workflow first.")
 
     return FileResponse(
         path=file_path,
-        filename="final_upload.zip",
+        filename=FINAL_ZIP,
         media_type="application/zip"
     )
 
@@ -146,44 +173,219 @@ async def download_final_upload():
 async def upload_to_arcgis(
     spk_number: str = Form(..., description="SPK number"),
     key_id: str = Form(..., description="Key ID"),
-    final_zip: UploadFile = File(None, description="Optional: final upload ZIP (if not using pre-generated)")
+    final_zip: UploadFile = File(None, description="Optional: final upload ZIP (if not using pre-generated)"),
+    artifact_id: Optional[str] = Form(None, description="artifact_id returned by process, to upload its ZIP"),
+    mode: str = Form(settings.ARCGIS_UPLOAD_MODE, description="direct (local Esri JSON encoding) or portal (features/generate)"),
+    strategy: str = Form("replace", description="replace (delete then add) or upsert (diff by FlightID)"),
+    dry_run: bool = Form(False, description="With upsert: return the planned diff without writing")
 ):
-    work_dir = FileUtils.get_work_dir()
+    if mode not in UPLOAD_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(UPLOAD_MODES)}")
+    if strategy not in SYNC_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"strategy must be one of {', '.join(SYNC_STRATEGIES)}")
+    if dry_run and strategy != "upsert":
+        raise HTTPException(status_code=400, detail="dry_run is only supported with strategy=upsert")
+
+    workspace = get_workspace_manager().create()
+    work_dir = workspace.path
 
     try:
         # Determine which file to use
+        content_hash = None
         if final_zip:
-            zip_path = await FileUtils.save_upload_file(final_zip, work_dir, "final_upload.zip")
-        else:
-            zip_path = Path("final_upload.zip")
-            if not zip_path.exists():
-                raise HTTPException(
-                    status_code=404,
-                    detail="No final upload ZIP found. Either upload one or run the process workflow first."
-                )
-
-        # Check and delete existing SPK if needed
-        arcgis_service = ArcGISService()
-        check_result = arcgis_service.check_spk_exists(spk_number)
-
-        if check_result["exists"]:
-            delete_result = arcgis_service.delete_spk(spk_number)
+            zip_path, content_hash = await FileUtils.persist_upload(
+                final_zip, work_dir, FINAL_ZIP, workspace=workspace
+            )
+        elif not artifact_id:
+            raise HTTPException(status_code=400, detail="Either upload final_zip or pass the artifact_id from process.")
         else:
-            delete_result = {"message": "No existing data to delete"}
+            zip_path = _artifact_path(
+                FINAL_ZIP, artifact_id, "No final upload ZIP found. Either upload one or run the process workflow first."
+            )
 
-        # Upload shapefile
-        upload_result = arcgis_service.upload_shapefile(zip_path, spk_number)
+        if dry_run:
+            # Nothing is written, so there is nothing to resume
+            return await _run_upload(
+                spk_number, key_id, mode, strategy, zip_path, work_dir, dry_run=True, content_hash=content_hash
+            )
 
-        # Apply edits
-        apply_result = arcgis_service.apply_edits(upload_result, spk_number, key_id)
+        journal = get_upload_journal()
+        upload_id = await run_in_threadpool(journal.create, spk_number, key_id, mode, strategy, zip_path)
+        return await _run_journaled(journal, upload_id, work_dir, content_hash)
 
-        return {
-            "success": True,
-            "message": f"Successfully uploaded to ArcGIS. {delete_result.get('message', '')}",
-            "upload_result": upload_result,
-            "apply_edits_result": apply_result,
-            "features_added": apply_result.get("features_added", 0)
+    finally:
+        workspace.cleanup()
+
+
+@router.post("/upload-to-arcgis/{upload_id}/resume", response_model=UploadToArcGISResponse, tags=["ArcGIS"])
+async def resume_upload_to_arcgis(upload_id: str):
+    """Continue an interrupted upload from its last committed applyEdits batch."""
+    journal = get_upload_journal()
+    entry = await run_in_threadpool(journal.get, upload_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+    if entry["status"] == "completed":
+        raise HTTPException(status_code=409, detail=f"Upload {upload_id} already completed")
+    if not await run_in_threadpool(journal.claim, upload_id):
+        raise HTTPException(status_code=409, detail=f"Upload {upload_id} is still running")
+
+    workspace = get_workspace_manager().create()
+    try:
+        return await _run_journaled(journal, upload_id, workspace.path)
+    finally:
+        workspace.cleanup()
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatusResponse, tags=["ArcGIS"])
+async def get_upload_status(upload_id: str):
+    entry = await run_in_threadpool(get_upload_journal().get, upload_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+    return entry
+
+
+async def _run_journaled(
+    journal: UploadJournal, upload_id: str, work_dir: Path, content_hash: Optional[str] = None
+) -> Dict[str, Any]:
+    """Run a journaled upload, leaving it resumable if it stops before every feature is in."""
+    entry = await run_in_threadpool(journal.get, upload_id)
+    try:
+        response = await _run_upload(
+            entry["spk"], entry["key_id"], entry["mode"], entry["strategy"], journal.zip_path(upload_id), work_dir,
+            journal=journal, upload_id=upload_id, content_hash=content_hash
+        )
+    except HTTPException as e:
+        await run_in_threadpool(journal.fail, upload_id, str(e.detail))
+        e.headers = {**(e.headers or {}), "X-Upload-ID": upload_id}
+        raise
+    except Exception as e:
+        await run_in_threadpool(journal.fail, upload_id, str(e))
+        raise
+
+    if response["success"]:
+        await run_in_threadpool(journal.complete, upload_id)
+    else:
+        await run_in_threadpool(journal.fail, upload_id, response["message"])
+    response["upload_id"] = upload_id
+    return response
+
+
+async def _run_upload(
+    spk_number: str,
+    key_id: str,
+    mode: str,
+    strategy: str,
+    zip_path: Path,
+    work_dir: Path,
+    dry_run: bool = False,
+    journal: UploadJournal = None,
+    upload_id: str = None,
+    content_hash: Optional[str] = None
+) -> Dict[str, Any]:
+    arcgis_service = AsyncArcGISService()
+
+    # Encode zones locally; the portal generate step stays as a fallback
+    features = None
+    if mode == "direct":
+        try:
+            features = await run_in_threadpool(EsriJSONEncoder.encode_shapefile_zip, zip_path, work_dir)
+            upload_result = {"mode": "direct", "features": len(features)}
+        except FileProcessingError as e:
+            logger.warning(f"Direct encoding failed, falling back to portal generate: {e.detail}")
+
+    if features is None:
+        # Portal conversion; features are streamed out of the generate response
+        features = arcgis_service.generate_features(zip_path, spk_number, content_hash)
+        upload_result = {"mode": "portal"}
+
+    if strategy == "upsert":
+        if not isinstance(features, list):
+            # The diff needs every new zone at once
+            features = [feature async for feature in features]
+        # The diff is against the live layer, so re-running it after a failure is safe
+        apply_result = await arcgis_service.sync_features(features, spk_number, key_id, dry_run)
+        plan = apply_result["plan"]
+        delete_result = {
+            "message": f"Planned {len(plan['adds'])} adds, {len(plan['updates'])} updates, "
+                       f"{len(plan['deletes'])} deletes, {plan['unchanged']} unchanged."
         }
+    else:
+        resume = {}
+        stage = (await run_in_threadpool(journal.get, upload_id))["stage"] if journal else "received"
+
+        if stage == "received":
+            # Check and delete existing SPK if needed
+            check_result = await arcgis_service.check_spk_exists(spk_number)
+
+            if check_result["exists"]:
+                delete_result = await arcgis_service.delete_spk(spk_number)
+            else:
+                delete_result = {"message": "No existing data to delete"}
+            if journal:
+                await run_in_threadpool(journal.set_stage, upload_id, "deleted")
+        else:
+            delete_result = {"message": "Existing data was deleted by an earlier attempt"}
 
-    finally:
-        FileUtils.cleanup_work_dir(work_dir)
+        if journal:
+            resume = await _resume_hooks(journal, upload_id, arcgis_service, spk_number)
+            await run_in_threadpool(journal.set_stage, upload_id, "applying")
+
+        # Apply edits
+        apply_result = await arcgis_service.apply_features(features, spk_number, key_id, **resume)
+
+    if upload_result["mode"] == "portal":
+        upload_result["features"] = (
+            len(features) if isinstance(features, list) else len(apply_result["response"]["addResults"])
+        )
+
+    failed = apply_result.get("failed_features", [])
+    if dry_run:
+        message = f"Dry run, nothing written. {delete_result.get('message', '')}"
+    elif failed:
+        message = f"Uploaded to ArcGIS with {len(failed)} failed features. {delete_result.get('message', '')}"
+    else:
+        message = f"Successfully uploaded to ArcGIS. {delete_result.get('message', '')}"
+
+    return {
+        "success": apply_result["success"],
+        "message": message,
+        "upload_result": upload_result,
+        "apply_edits_result": apply_result,
+        "features_added": apply_result.get("features_added", 0),
+        "failed_features": failed,
+        "sync_plan": apply_result.get("plan")
+    }
+
+
+async def _resume_hooks(
+    journal: UploadJournal,
+    upload_id: str,
+    arcgis_service: AsyncArcGISService,
+    spk_number: str
+) -> Dict[str, Any]:
+    """
+    apply_features arguments that checkpoint every batch and skip what is already in.
+
+    FlightIDs from committed batches are skipped. If a batch was sent but
+    its answer never recorded, the server may or may not have applied it,
+    so the FlightIDs live under the SPK are skipped too.
+    """
+    skip = await run_in_threadpool(journal.committed_flight_ids, upload_id)
+    if await run_in_threadpool(journal.has_uncommitted_batches, upload_id):
+        skip |= await arcgis_service.spk_flight_ids(spk_number)
+
+    async def on_batch_sent(index: int, flight_ids: List[Any]) -> None:
+        await run_in_threadpool(journal.batch_sent, upload_id, index, flight_ids)
+
+    async def on_batch_committed(index: int, flight_ids: List[Any], results: List[Dict[str, Any]]) -> None:
+        added = [(flight_id, r.get("objectId")) for flight_id, r in zip(flight_ids, results) if r.get("success")]
+        await run_in_threadpool(
+            journal.batch_committed, upload_id, index, [f for f, _ in added], [oid for _, oid in added]
+        )
+
+    return {
+        "skip_flight_ids": skip,
+        "on_batch_sent": on_batch_sent,
+        "on_batch_committed": on_batch_committed,
+        "start_index": await run_in_threadpool(journal.next_batch_index, upload_id)
+    }
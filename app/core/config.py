@@ -12,6 +12,16 @@ class Settings(BaseSettings):
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production-min-32-chars")
+    # "stateful" loads the user for every request; "stateless" trusts the signed token claims
+    AUTH_MODE: str = os.getenv("AUTH_MODE", "stateful")
+    AUTH_REVOCATION_REFRESH_INTERVAL: float = 60  # seconds between deny-list reloads
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # hashes with another cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 4  # threads doing bcrypt work
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # waiting hash jobs before logins are shed with 503
+
+    # User store: "firestore", or "sqlite" for single-node installs without Firebase
+    USER_STORE: str = os.getenv("USER_STORE", "firestore")
+    USER_STORE_PATH: str = os.getenv("USER_STORE_PATH", "data/users.sqlite3")
 
     # Firebase Configuration
     FIREBASE_SERVICE_ACCOUNT_PATH: str = os.getenv("FIREBASE_SERVICE_ACCOUNT_PATH", "")
@@ -43,6 +53,73 @@ class Settings(BaseSettings):
         "https://maps.sinarmasforestry.com/arcgis/rest/services/PreFo/DroneSprayingDashboard/MapServer/1"
     )
 
+    # ArcGIS HTTP client
+    ARCGIS_HTTP2: bool = True
+    ARCGIS_TIMEOUT: float = 120.0
+    ARCGIS_CONNECT_TIMEOUT: float = 10.0
+    ARCGIS_MAX_CONNECTIONS: int = 100
+    ARCGIS_MAX_KEEPALIVE_CONNECTIONS: int = 20
+
+    # "direct" encodes zones to Esri JSON locally; "portal" converts via features/generate
+    ARCGIS_UPLOAD_MODE: str = "direct"
+
+    # Portal features/generate
+    ARCGIS_GENERATE_MAX_RECORDS: int = 1000  # publishParameters maxRecordCount
+    ARCGIS_GENERATE_PARTITION_SIZE: int = 1000  # zones per generate upload, capped at maxRecordCount
+    ARCGIS_GENERATE_CONCURRENCY: int = 4
+
+    # FeatureServer query paging
+    ARCGIS_QUERY_PAGE_SIZE: int = 1000
+    ARCGIS_QUERY_CONCURRENCY: int = 4
+    ARCGIS_QUERY_FORMAT: str = "pbf"  # "pbf" falls back to "json" per layer when unsupported
+
+    # applyEdits batching
+    ARCGIS_EDIT_BATCH_SIZE: int = 250
+    ARCGIS_EDIT_BATCH_MAX_BYTES: int = 4 * 1024 * 1024  # 4MB
+    ARCGIS_EDIT_CONCURRENCY: int = 4
+
+    # applyEdits payload compaction
+    ARCGIS_COORDINATE_PRECISION: int = 7  # decimal places in degrees (~1cm)
+    ARCGIS_GZIP_REQUESTS: bool = False  # enable when the server or its proxy accepts gzip request bodies
+    ARCGIS_GZIP_LEVEL: int = 6
+
+    # Adaptive concurrency limit shared by all outbound ArcGIS requests
+    ARCGIS_LIMIT_INITIAL: int = 8
+    ARCGIS_LIMIT_MIN: int = 1
+    ARCGIS_LIMIT_MAX: int = 64
+    ARCGIS_LIMIT_BACKOFF: float = 0.5  # multiplier applied on timeouts, 429/5xx and error bodies
+    ARCGIS_LIMIT_LATENCY_TOLERANCE: float = 2.0  # latency above this multiple of the endpoint baseline backs off
+    ARCGIS_LIMIT_LATENCY_FLOOR: float = 0.05  # seconds; faster responses always count as healthy
+
+    # Dashboard lookup cache
+    DASHBOARD_CACHE_TTL: float = 15 * 60  # seconds an entry is fresh
+    DASHBOARD_CACHE_STALE_TTL: float = 24 * 60 * 60  # seconds a stale entry may still be served
+    DASHBOARD_CACHE_MAX_ENTRIES: int = 2048
+    DASHBOARD_PAGE_SIZE: int = 2000  # rows per page when loading a vendor's hierarchy
+
+    # In-process cache of users by ID for request authentication
+    USER_CACHE_TTL: float = 60  # seconds; writes through UserService invalidate immediately
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
+    # Local SPKNumber -> OBJECTID index
+    SPK_INDEX_ENABLED: bool = True
+    SPK_INDEX_PATH: str = os.getenv("SPK_INDEX_PATH", "data/spk_index.sqlite3")
+    SPK_INDEX_MAX_AGE: float = 10 * 60  # seconds an SPK entry is trusted without a live query
+    SPK_INDEX_RECONCILE_INTERVAL: float = 5 * 60  # seconds between background reconcile passes; 0 disables
+    SPK_INDEX_RECONCILE_BATCH: int = 50  # SPKs re-queried per pass
+
+    # Upload journal for resumable uploads
+    UPLOAD_JOURNAL_PATH: str = os.getenv("UPLOAD_JOURNAL_PATH", "data/upload_journal.sqlite3")
+    UPLOAD_JOURNAL_DIR: str = os.getenv("UPLOAD_JOURNAL_DIR", "data/uploads")  # ZIP copies kept until an upload completes
+    UPLOAD_JOURNAL_LEASE: float = 2 * 60  # seconds without a checkpoint before a running upload may be resumed
+    UPLOAD_JOURNAL_RETENTION: float = 7 * 24 * 60 * 60  # seconds an untouched upload is kept
+
+    # Local cache of features/generate results, keyed by ZIP content hash
+    GENERATE_CACHE_ENABLED: bool = True
+    GENERATE_CACHE_DIR: str = os.getenv("GENERATE_CACHE_DIR", "data/generate_cache")
+    GENERATE_CACHE_TTL: float = 24 * 60 * 60  # seconds
+    GENERATE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
     # ArcGIS Credentials
     GIS_AUTH_USERNAME: str = os.getenv("GIS_AUTH_USERNAME", "")
     GIS_AUTH_PASSWORD: str = os.getenv("GIS_AUTH_PASSWORD", "")
@@ -50,8 +127,14 @@ class Settings(BaseSettings):
     GIS_PASSWORD: str = os.getenv("GIS_PASSWORD", "")
 
     # File Processing
-    WORK_DIR: str = "working"
-    MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
+    # Root of the per-request workspaces; empty picks /dev/shm when it is writable, else the temp dir
+    WORK_DIR: str = os.getenv("WORK_DIR", "")
+    WORKSPACE_QUOTA: int = 512 * 1024 * 1024  # bytes one request may use under WORK_DIR
+    WORKSPACE_STALE_AFTER: float = 6 * 60 * 60  # seconds before a leftover workspace is swept at startup
+    ARTIFACT_DIR: str = os.getenv("ARTIFACT_DIR", "data/artifacts")  # generated ZIPs kept for download
+    ARTIFACT_TTL: float = 24 * 60 * 60  # seconds
+    MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB, per request body and per uploaded file
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes copied per read when saving uploads
 
     # CORS
     CORS_ORIGINS: list = ["*"]
@@ -1,6 +1,8 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
+from app.core.config import settings
+from app.core.revocation import revocation_list
 from app.core.security import decode_access_token
 from app.services.user_service import UserService
 from app.models.user import UserInDB, TokenData
@@ -8,28 +10,52 @@ from app.models.user import UserInDB, TokenData
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> UserInDB:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+async def get_token_payload(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
     token = credentials.credentials
     payload = decode_access_token(token)
 
-    if payload is None:
-        raise credentials_exception
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+
+    # Both modes honour logout; the list is held in memory, so this costs no I/O per request
+    await revocation_list.ensure_fresh()
+    if revocation_list.is_revoked(payload):
+        raise _credentials_exception()
+
+    return payload
 
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
 
-    user = UserService.get_user_by_id(user_id)
+def _user_from_claims(payload: dict) -> Optional[UserInDB]:
+    """Rebuild the user from a stateless token; None for tokens issued without the claims."""
+    if "active" not in payload or "gis_auth_username" not in payload:
+        return None
+
+    return UserInDB(
+        id=payload["sub"],
+        gis_auth_username=payload["gis_auth_username"],
+        full_name=payload.get("full_name"),
+        is_active=payload["active"],
+        created_at=payload["created_at"],
+        hashed_gis_auth_password=""
+    )
+
+
+async def get_current_user(payload: dict = Depends(get_token_payload)) -> UserInDB:
+    user = _user_from_claims(payload) if settings.AUTH_MODE == "stateless" else None
+    if user is None:
+        user = await UserService.get_user_by_id(payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
     return user
 
@@ -43,8 +69,12 @@ async def get_current_active_user(
     return current_user
 
 
-def get_user_gis_credentials(current_user: UserInDB = Depends(get_current_active_user)) -> dict:
-    credentials = UserService.get_user_gis_credentials(current_user.id)
+async def get_user_gis_credentials(current_user: UserInDB = Depends(get_current_active_user)) -> dict:
+    if settings.AUTH_MODE == "stateless":
+        # The signed token already proved the user; the credentials are shared ones
+        return UserService.shared_gis_credentials()
+
+    credentials = await UserService.get_user_gis_credentials(current_user.id)
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
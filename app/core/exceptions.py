@@ -39,3 +39,28 @@ class InvalidFileFormatError(HTTPException):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=detail
         )
+
+
+class ServiceBusyError(HTTPException):
+    def __init__(self, detail: str = "Server is busy, please retry shortly", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class WorkspaceQuotaExceededError(HTTPException):
+    def __init__(self, quota: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request needs more than {quota // (1024 * 1024)}MB of working space"
+        )
+
+
+class UploadTooLargeError(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds the {limit // (1024 * 1024)}MB limit"
+        )
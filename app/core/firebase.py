@@ -1,10 +1,11 @@
 import os
 import json
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 from typing import Optional
 
 _db: Optional[firestore.Client] = None
+_async_db = None
 
 
 def initialize_firebase():
@@ -54,3 +55,14 @@ def get_firestore_client() -> firestore.Client:
         _db = initialize_firebase()
 
     return _db
+
+
+def get_async_firestore_client():
+    """Get the shared async Firestore client; one client (and channel) serves every request."""
+    global _async_db
+
+    if _async_db is None:
+        get_firestore_client()  # initializes the default app
+        _async_db = firestore_async.client()
+
+    return _async_db
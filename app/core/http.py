@@ -0,0 +1,45 @@
+import httpx
+from typing import Optional
+
+from app.core.config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client(**kwargs) -> httpx.AsyncClient:
+    """Create an HTTP/2 capable async client configured for ArcGIS calls."""
+    options = {
+        "http2": settings.ARCGIS_HTTP2,
+        "timeout": httpx.Timeout(settings.ARCGIS_TIMEOUT, connect=settings.ARCGIS_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=settings.ARCGIS_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ARCGIS_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    }
+    options.update(kwargs)
+    return httpx.AsyncClient(**options)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared async HTTP client, creating it on first use."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+
+    return _client
+
+
+def set_http_client(client: Optional[httpx.AsyncClient]) -> None:
+    """Replace the shared client (used by tests to inject a mock transport)."""
+    global _client
+    _client = client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,49 @@
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.exceptions import UploadTooLargeError
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies larger than MAX_UPLOAD_SIZE before they are buffered.
+
+    A declared Content-Length over the limit is answered with 413 without
+    reading the body. Chunked bodies are counted as they arrive, and the
+    request stops with 413 at the first chunk past the limit; the routes
+    never see a partly spooled form.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = settings.MAX_UPLOAD_SIZE if self.max_bytes is None else self.max_bytes
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            error = UploadTooLargeError(limit)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes a 413 response
+                    raise UploadTooLargeError(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.services.user_repository import Revocations, get_user_repository
+
+logger = logging.getLogger(__name__)
+
+
+def load_revocations() -> Revocations:
+    """Read every unexpired revocation from the user store."""
+    return get_user_repository().load_revocations()
+
+
+def store_revocation(kind: str, key: str, value: float) -> None:
+    get_user_repository().store_revocation(kind, key, value)
+
+
+class RevocationList:
+    """
+    Compact deny-list of user IDs and token IDs for stateless JWT checks.
+
+    The full list is reloaded from the store every `refresh_interval`
+    seconds in the background, so checking a token never waits on I/O
+    once the first load is done. Revoking a user rejects every token
+    issued to them up to that moment; revoking a token rejects only its
+    `jti` until it would have expired anyway. Revocations made by this
+    process apply immediately; ones made elsewhere within one interval.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Revocations] = load_revocations,
+        store: Callable[[str, str, float], None] = store_revocation,
+        refresh_interval: float = None
+    ):
+        self.loader = loader
+        self.store = store
+        self.refresh_interval = (
+            settings.AUTH_REVOCATION_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        )
+        self._users: Dict[str, float] = {}
+        self._tokens: Dict[str, float] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh: Optional["asyncio.Task"] = None
+
+    async def _reload(self) -> None:
+        users, tokens = await asyncio.to_thread(self.loader)
+        # Keep local revocations the store has not returned yet
+        self._users = {**self._users, **users}
+        now = time.time()
+        self._tokens = {jti: exp for jti, exp in {**self._tokens, **tokens}.items() if exp > now}
+        self._loaded_at = time.monotonic()
+
+    async def ensure_fresh(self) -> None:
+        """Load the list on first use, then refresh it in the background once it is due."""
+        if self._loaded_at is None:
+            if self._refresh is None or self._refresh.done():
+                self._refresh = asyncio.ensure_future(self._reload())
+            await asyncio.shield(self._refresh)
+            return
+
+        due = time.monotonic() - self._loaded_at > self.refresh_interval
+        if due and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.ensure_future(self._reload())
+            self._refresh.add_done_callback(self._log_failure)
+
+    def clear(self) -> None:
+        """Forget every entry and force a reload on next use."""
+        self._users, self._tokens, self._loaded_at, self._refresh = {}, {}, None, None
+
+    @staticmethod
+    def _log_failure(task: "asyncio.Task") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Revocation list refresh failed: {task.exception()}")
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        jti = payload.get("jti")
+        if jti is not None and jti in self._tokens:
+            return True
+        revoked_at = self._users.get(payload.get("sub"))
+        return revoked_at is not None and payload.get("iat", 0) <= revoked_at
+
+    async def revoke_token(self, jti: str, expires_at: float) -> None:
+        self._tokens[jti] = expires_at
+        await asyncio.to_thread(self.store, 'token', jti, expires_at)
+
+    async def revoke_user(self, user_id: str) -> None:
+        revoked_at = time.time()
+        self._users[user_id] = revoked_at
+        await asyncio.to_thread(self.store, 'user', user_id, revoked_at)
+
+
+revocation_list = RevocationList()
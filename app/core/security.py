@@ -1,11 +1,21 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.exceptions import ServiceBusyError
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; pinning min and max rounds makes hashes with any other cost "need update"
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 # JWT settings
 SECRET_KEY = settings.SECRET_KEY
@@ -21,6 +31,67 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded thread pool so hashing never blocks the event loop.
+
+    At most `workers` hashes run at once; further jobs queue, and once
+    `max_queue` are waiting new ones are refused with ServiceBusyError
+    instead of piling up behind a login burst.
+    """
+
+    def __init__(self, context: CryptContext = None, workers: int = None, max_queue: int = None):
+        self.context = context or pwd_context
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_queue = settings.PASSWORD_HASH_MAX_QUEUE if max_queue is None else max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise ServiceBusyError("Too many logins in progress, please retry shortly")
+
+        self.in_flight += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify, and return a new hash when the stored one uses a different cost factor."""
+        return await self._run(self.context.verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+
+password_hasher = PasswordHasher()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -28,11 +99,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def token_claims(user: Any) -> Dict[str, Any]:
+    """Claims that let a stateless request rebuild the user without a database read."""
+    return {
+        "sub": user.id,
+        "gis_auth_username": user.gis_auth_username,
+        "full_name": user.full_name,
+        "active": user.is_active,
+        "created_at": user.created_at.isoformat()
+    }
+
+
 def decode_access_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
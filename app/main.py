@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -11,6 +12,13 @@ from app.core.exceptions import (
     SPKNotFoundError,
     InvalidFileFormatError
 )
+from app.core.http import close_http_client
+from app.core.middleware import BodySizeLimitMiddleware
+from app.services.async_arcgis_service import run_spk_index_reconciler
+from app.services.spk_index import close_spk_index
+from app.services.upload_journal import close_upload_journal
+from app.services.user_repository import close_user_repository
+from app.utils.workspace import get_workspace_manager
 from app.api.routes import health, arcgis, kml
 
 # Configure logging
@@ -29,6 +37,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Reject oversized bodies before they are read; added first so CORS headers still wrap the 413
+app.add_middleware(BodySizeLimitMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -53,7 +64,8 @@ async def arcgis_auth_exception_handler(request, exc):
     logger.error(f"ArcGIS Authentication Error: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 
@@ -62,7 +74,8 @@ async def arcgis_upload_exception_handler(request, exc):
     logger.error(f"ArcGIS Upload Error: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 
@@ -71,7 +84,8 @@ async def file_processing_exception_handler(request, exc):
     logger.error(f"File Processing Error: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 
@@ -80,7 +94,8 @@ async def spk_not_found_exception_handler(request, exc):
     logger.warning(f"SPK Not Found: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 
@@ -89,18 +104,34 @@ async def invalid_file_format_exception_handler(request, exc):
     logger.warning(f"Invalid File Format: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 
 @app.on_event("startup")
 async def startup_event():
     logger.info(f"{settings.APP_NAME} v{settings.VERSION} starting up...")
+    swept = get_workspace_manager().sweep()
+    if swept:
+        logger.info(f"Removed {swept} workspaces left by earlier runs")
+    app.state.spk_reconciler = None
+    if settings.SPK_INDEX_ENABLED and settings.SPK_INDEX_RECONCILE_INTERVAL > 0:
+        app.state.spk_reconciler = asyncio.create_task(
+            run_spk_index_reconciler(settings.SPK_INDEX_RECONCILE_INTERVAL)
+        )
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info(f"{settings.APP_NAME} shutting down...")
+    reconciler = getattr(app.state, "spk_reconciler", None)
+    if reconciler is not None:
+        reconciler.cancel()
+    await close_http_client()
+    close_spk_index()
+    close_upload_journal()
+    close_user_repository()
 
 
 @app.get("/")
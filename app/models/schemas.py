@@ -11,11 +11,18 @@ class SPKDeleteRequest(BaseModel):
     spk_number: str = Field(..., description="SPK number to delete")
 
 
+class SPKCheckRequest(BaseModel):
+    spk_number: str = Field(..., description="SPK number to check")
+    include_oids: bool = Field(
+        True, description="Return matching OBJECTIDs; set false for a cheaper count-only check with empty oids"
+    )
+
+
 class SPKCheckResponse(BaseModel):
     exists: bool
     count: int
     spk: str
-    oids: List[int]
+    oids: List[int] = []
 
 
 class SPKDeleteResponse(BaseModel):
@@ -31,6 +38,7 @@ class ShapefileGenerateResponse(BaseModel):
     total_zones: int
     zone_names: List[str]
     filename: str
+    artifact_id: str
 
 
 class ProcessCompleteResponse(BaseModel):
@@ -39,6 +47,7 @@ class ProcessCompleteResponse(BaseModel):
     total_zones: int
     columns: List[str]
     filename: str
+    artifact_id: str
 
 
 class UploadToArcGISResponse(BaseModel):
@@ -47,6 +56,23 @@ class UploadToArcGISResponse(BaseModel):
     upload_result: Dict[str, Any]
     apply_edits_result: Dict[str, Any]
     features_added: int
+    failed_features: List[Dict[str, Any]] = []
+    sync_plan: Optional[Dict[str, Any]] = None
+    upload_id: Optional[str] = None
+
+
+class UploadStatusResponse(BaseModel):
+    upload_id: str
+    spk: str
+    mode: str
+    strategy: str
+    stage: str
+    status: str
+    error: Optional[str] = None
+    batches_committed: int
+    features_committed: int
+    created_at: float
+    updated_at: float
 
 
 class KMLMetadata(BaseModel):
@@ -63,10 +89,53 @@ class HealthResponse(BaseModel):
     app_name: str
 
 
+class LatencyStats(BaseModel):
+    samples: int
+    mean: Optional[float] = None
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    max: Optional[float] = None
+
+
+class ArcGISConcurrencyResponse(BaseModel):
+    limit: int
+    min_limit: int
+    max_limit: int
+    in_flight: int
+    waiting: int
+    successes: int
+    overloads: int
+    latency: LatencyStats
+
+
+class PasswordHasherStatsResponse(BaseModel):
+    workers: int
+    max_queue: int
+    in_flight: int
+    waiting: int
+    peak_waiting: int
+    completed: int
+    rejected: int
+
+
+class CacheStatsResponse(BaseModel):
+    entries: int
+    max_entries: int
+    ttl: float
+    hits: int
+    stale_hits: int
+    misses: int
+
+
 class DashboardQueryResponse(BaseModel):
     values: List[str]
 
 
+class DashboardCacheInvalidateResponse(BaseModel):
+    success: bool
+    invalidated: int
+
+
 class SPKNumberItem(BaseModel):
     spk_number: str
     activity: str
@@ -76,5 +145,25 @@ class SPKNumberQueryResponse(BaseModel):
     values: List[SPKNumberItem]
 
 
+class HierarchyPetak(BaseModel):
+    petak: str
+    spk_numbers: List[SPKNumberItem]
+
+
+class HierarchyDistrict(BaseModel):
+    district: str
+    petaks: List[HierarchyPetak]
+
+
+class HierarchyRegion(BaseModel):
+    region: str
+    districts: List[HierarchyDistrict]
+
+
+class DashboardHierarchyResponse(BaseModel):
+    vendor_code: str
+    regions: List[HierarchyRegion]
+
+
 class ErrorResponse(BaseModel):
     detail: str
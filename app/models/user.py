@@ -44,3 +44,8 @@ class UserResponse(BaseModel):
     user: User
     access_token: str
     token_type: str = "bearer"
+
+
+class LogoutResponse(BaseModel):
+    success: bool
+    message: str
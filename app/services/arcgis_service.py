@@ -1,9 +1,8 @@
 import json
 import time
 import datetime
-import requests
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set
 
 from app.core.config import settings
 from app.core.exceptions import (
@@ -14,6 +13,12 @@ from app.core.exceptions import (
 
 
 class ArcGISService:
+    TOKEN_STEP_ERRORS = {
+        1: "Failed step 1: initial login",
+        2: "Failed step 2: scoped token",
+        3: "Failed step 3: final login",
+    }
+
     def __init__(self, gis_credentials: dict = None):
         self.base_url = settings.ARCGIS_BASE_URL
         self.server_url = settings.ARCGIS_SERVER_URL
@@ -35,6 +40,8 @@ class ArcGISService:
         Validate GIS Auth credentials against ArcGIS server.
         Returns True if credentials are valid, False otherwise.
         """
+        import requests
+
         try:
             session = requests.Session()
             token_headers = {
@@ -66,59 +73,64 @@ class ArcGISService:
             print(f"Error validating GIS Auth credentials: {e}")
             return False
 
-    def get_token(self) -> str:
-        session = requests.Session()
-
+    def _credentials(self) -> tuple:
         # Get credentials from user or fallback to settings
-        gis_auth_username = self.gis_credentials.get('GIS_AUTH_USERNAME', settings.GIS_AUTH_USERNAME)
-        gis_auth_password = self.gis_credentials.get('GIS_AUTH_PASSWORD', settings.GIS_AUTH_PASSWORD)
-        gis_username = self.gis_credentials.get('GIS_USERNAME', settings.GIS_USERNAME)
-        gis_password = self.gis_credentials.get('GIS_PASSWORD', settings.GIS_PASSWORD)
-
-        # Step 1: Initial authentication
-        step1 = session.post(self.token_url, headers=self.token_headers, data={
-            'request': 'getToken',
-            'username': gis_auth_username,
-            'password': gis_auth_password,
-            'expiration': '60',
-            'referer': 'https://maps.sinarmasforestry.com',
-            'f': 'json'
-        }).json()
-
-        step1_token = step1.get('token')
-        if not step1_token:
-            raise ArcGISAuthenticationError("Failed step 1: initial login")
-
-        # Step 2: Scoped token for MapServer
-        step2 = session.post(self.token_url, headers=self.token_headers, data={
-            'request': 'getToken',
-            'serverUrl': self.server_url,
-            'token': step1_token,
-            'referer': 'https://maps.sinarmasforestry.com',
-            'f': 'json'
-        }).json()
+        return (
+            self.gis_credentials.get('GIS_AUTH_USERNAME', settings.GIS_AUTH_USERNAME),
+            self.gis_credentials.get('GIS_AUTH_PASSWORD', settings.GIS_AUTH_PASSWORD),
+            self.gis_credentials.get('GIS_USERNAME', settings.GIS_USERNAME),
+            self.gis_credentials.get('GIS_PASSWORD', settings.GIS_PASSWORD),
+        )
 
-        scoped_token = step2.get('token')
-        if not scoped_token:
-            raise ArcGISAuthenticationError("Failed step 2: scoped token")
+    def _token_step_data(self, step: int, token: str = None) -> Dict[str, Any]:
+        gis_auth_username, gis_auth_password, gis_username, gis_password = self._credentials()
 
+        if step == 1:
+            # Step 1: Initial authentication
+            return {
+                'request': 'getToken',
+                'username': gis_auth_username,
+                'password': gis_auth_password,
+                'expiration': '60',
+                'referer': 'https://maps.sinarmasforestry.com',
+                'f': 'json'
+            }
+        if step == 2:
+            # Step 2: Scoped token for MapServer
+            return {
+                'request': 'getToken',
+                'serverUrl': self.server_url,
+                'token': token,
+                'referer': 'https://maps.sinarmasforestry.com',
+                'f': 'json'
+            }
         # Step 3: Final authentication
-        step3 = session.post(self.token_url, headers=self.token_headers, data={
+        return {
             'request': 'getToken',
             'username': gis_username,
             'password': gis_password,
             'expiration': '60',
             'referer': 'https://maps.sinarmasforestry.com',
             'f': 'json'
-        }).json()
+        }
+
+    def get_token(self) -> str:
+        import requests
+
+        session = requests.Session()
 
-        final_token = step3.get('token')
-        if not final_token:
-            raise ArcGISAuthenticationError("Failed step 3: final login")
+        token = None
+        for step in (1, 2, 3):
+            result = session.post(self.token_url, headers=self.token_headers, data=self._token_step_data(step, token)).json()
+            token = result.get('token')
+            if not token:
+                raise ArcGISAuthenticationError(self.TOKEN_STEP_ERRORS[step])
 
-        return final_token
+        return token
 
     def query_spk(self, spk: str) -> List[int]:
+        import requests
+
         session = requests.Session()
         token = self.get_token()
 
@@ -135,6 +147,8 @@ class ArcGISService:
         return oids
 
     def delete_spk(self, spk: str) -> Dict[str, Any]:
+        import requests
+
         session = requests.Session()
         token = self.get_token()
 
@@ -167,6 +181,8 @@ class ArcGISService:
         }
 
     def upload_shapefile(self, zip_path: Path, spk_number: str) -> Dict[str, Any]:
+        import requests
+
         session = requests.Session()
         token = self.get_token()
 
@@ -177,18 +193,7 @@ class ArcGISService:
             }
             response = session.post(
                 self.upload_url,
-                params={
-                    'filetype': 'shapefile',
-                    'publishParameters': json.dumps({
-                        'name': f'UploadedZone_{spk_number}',
-                        'targetSR': {'wkid': 4326},
-                        'maxRecordCount': 1000,
-                        'enforceInputFileSizeLimit': True,
-                        'enforceOutputJsonSizeLimit': True,
-                    }),
-                    'f': 'json',
-                    'token': token
-                },
+                params=self._generate_params(spk_number, token),
                 files=files
             )
 
@@ -197,33 +202,61 @@ class ArcGISService:
 
         return response.json()
 
-    def apply_edits(self, upload_response: Dict[str, Any], spk_number: str, key_id: str) -> Dict[str, Any]:
-        token = self.get_token()
-        apply_url = f"{self.base_url}/applyEdits?token={token}"
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    @staticmethod
+    def _generate_params(spk_number: str, token: str) -> Dict[str, Any]:
+        return {
+            'filetype': 'shapefile',
+            'publishParameters': json.dumps({
+                'name': f'UploadedZone_{spk_number}',
+                'targetSR': {'wkid': 4326},
+                'maxRecordCount': settings.ARCGIS_GENERATE_MAX_RECORDS,
+                'enforceInputFileSizeLimit': True,
+                'enforceOutputJsonSizeLimit': True,
+            }),
+            'f': 'json',
+            'token': token
+        }
 
-        features = upload_response.get("featureCollection", {}).get("layers", [])[0].get('featureSet', {}).get("features", [])
+    @staticmethod
+    def extract_features(upload_response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pull the feature list out of a portal generate response."""
+        return upload_response.get("featureCollection", {}).get("layers", [])[0].get('featureSet', {}).get("features", [])
 
-        adds = []
+    @staticmethod
+    def parse_flight_time(value: Any) -> Optional[int]:
+        """Epoch milliseconds of a 'YYYY-MM-DD HH:MM:SS' flight time, or None if missing or unreadable."""
+        if not value:
+            return None
+        try:
+            return int(datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp() * 1000)
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def unparsed_flight_times(cls, features: List[Dict[str, Any]]) -> Dict[Any, Set[str]]:
+        """FlightID -> the StartFlight/EndFlight fields build_adds had to fill with the current time."""
+        unparsed = {}
         for feat in features:
-            start_flight = feat["attributes"].get("StarFlight", "")
-            end_flight = feat["attributes"].get("EndFlight", "")
+            fields = {
+                field for field, source in (("StartFlight", "StarFlight"), ("EndFlight", "EndFlight"))
+                if cls.parse_flight_time(feat["attributes"].get(source)) is None
+            }
+            if fields:
+                unparsed[feat["attributes"].get("Name")] = fields
+        return unparsed
 
+    @classmethod
+    def build_adds(cls, features: List[Dict[str, Any]], spk_number: str, key_id: str) -> List[Dict[str, Any]]:
+        """Map generated shapefile features onto the FeatureServer schema."""
+        adds = []
+        for feat in features:
             now_ms = int(time.time() * 1000)
-            start_timestamp = now_ms
-            end_timestamp = now_ms
-
-            if start_flight:
-                try:
-                    start_timestamp = int(datetime.datetime.strptime(start_flight, "%Y-%m-%d %H:%M:%S").timestamp() * 1000)
-                except ValueError:
-                    pass
-
-            if end_flight:
-                try:
-                    end_timestamp = int(datetime.datetime.strptime(end_flight, "%Y-%m-%d %H:%M:%S").timestamp() * 1000)
-                except ValueError:
-                    pass
+            start_timestamp = cls.parse_flight_time(feat["attributes"].get("StarFlight"))
+            end_timestamp = cls.parse_flight_time(feat["attributes"].get("EndFlight"))
+            if start_timestamp is None:
+                start_timestamp = now_ms
+            if end_timestamp is None:
+                end_timestamp = now_ms
 
             adds.append({
                 "aggregateGeometries": None,
@@ -248,6 +281,17 @@ class ArcGISService:
                     "CRT_Date": int(time.time() * 1000),
                 }
             })
+        return adds
+
+    def apply_edits(self, upload_response: Dict[str, Any], spk_number: str, key_id: str) -> Dict[str, Any]:
+        import requests
+
+        token = self.get_token()
+        apply_url = f"{self.base_url}/applyEdits?token={token}"
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+        features = self.extract_features(upload_response)
+        adds = self.build_adds(features, spk_number, key_id)
 
         payload = {
             "f": "json",
@@ -266,21 +310,30 @@ class ArcGISService:
         }
 
     def query_dashboard(self, where: str, out_fields: str) -> List[Dict[str, Any]]:
+        import requests
+
         token = self.get_token()
         response = requests.get(
             f"{settings.ARCGIS_DASHBOARD_URL}/query",
-            params={
-                'f': 'json',
-                'where': where,
-                'outFields': out_fields,
-                'returnDistinctValues': 'true',
-                'returnGeometry': 'false',
-                'spatialRel': 'esriSpatialRelIntersects',
-                'token': token
-            },
+            params=self._dashboard_params(where, out_fields, token),
             headers=self.token_headers
         )
-        data = response.json()
+        return self._dashboard_attributes(response.json())
+
+    @staticmethod
+    def _dashboard_params(where: str, out_fields: str, token: str) -> Dict[str, Any]:
+        return {
+            'f': 'json',
+            'where': where,
+            'outFields': out_fields,
+            'returnDistinctValues': 'true',
+            'returnGeometry': 'false',
+            'spatialRel': 'esriSpatialRelIntersects',
+            'token': token
+        }
+
+    @staticmethod
+    def _dashboard_attributes(data: Dict[str, Any]) -> List[Dict[str, Any]]:
         if 'error' in data:
             raise ArcGISUploadError(f"Dashboard query failed: {data['error'].get('message', str(data['error']))}")
         return [f['attributes'] for f in data.get('features', [])]
@@ -303,6 +356,10 @@ class ArcGISService:
     def get_spk_numbers(self, vendor_code: str, petak: str) -> List[Dict[str, str]]:
         where = f"VendorCode='{vendor_code}' AND Petak='{petak}' AND Drone=0"
         results = self.query_dashboard(where, 'SPKNumber,Activity')
+        return self._unique_spk_numbers(results)
+
+    @staticmethod
+    def _unique_spk_numbers(results: List[Dict[str, Any]]) -> List[Dict[str, str]]:
         seen = set()
         unique = []
         for r in results:
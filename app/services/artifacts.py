@@ -0,0 +1,78 @@
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ArtifactStore:
+    """
+    Generated files kept for download, one directory per artifact ID.
+
+    Each request that produces a ZIP gets its own ID, so parallel requests
+    never overwrite each other's output. Artifacts are removed `ttl`
+    seconds after they were written.
+    """
+
+    def __init__(self, directory: str = None, ttl: float = None):
+        self.directory = Path(directory or settings.ARTIFACT_DIR)
+        self.ttl = settings.ARTIFACT_TTL if ttl is None else ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def save(self, src: Path, filename: str) -> str:
+        """Copy `src` in as `filename` under a new artifact ID, which is returned."""
+        self.purge()
+        artifact_id = uuid.uuid4().hex
+        target = self.directory / artifact_id
+        target.mkdir()
+        shutil.copy(src, target / filename)
+        return artifact_id
+
+    def path(self, artifact_id: str, filename: str) -> Optional[Path]:
+        """The artifact's file, or None if the ID is unknown, expired or malformed."""
+        if not _ID.match(artifact_id or ""):
+            return None
+        path = self.directory / artifact_id / filename
+        try:
+            fresh = time.time() - path.stat().st_mtime <= self.ttl
+        except FileNotFoundError:
+            return None
+        return path if fresh else None
+
+    def purge(self) -> int:
+        """Drop expired artifacts; returns how many."""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for path in self.directory.iterdir():
+            try:
+                expired = path.is_dir() and path.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                continue
+            if expired:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Get the shared store, creating it on first use."""
+    global _store
+
+    if _store is None:
+        _store = ArtifactStore()
+
+    return _store
+
+
+def set_artifact_store(store: Optional[ArtifactStore]) -> None:
+    """Replace the shared store (used by tests to point at a temporary directory)."""
+    global _store
+    _store = store
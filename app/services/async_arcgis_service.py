@@ -0,0 +1,536 @@
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Set, Union
+
+import httpx
+
+from app.core.http import get_http_client
+from app.core.config import settings
+from app.core.exceptions import (
+    ArcGISAuthenticationError,
+    ArcGISUploadError,
+    FileProcessingError,
+    SPKNotFoundError
+)
+from app.services.arcgis_service import ArcGISService
+from app.services.shapefile_service import ShapefileService
+from app.services.concurrency import AdaptiveLimiter, LimitedClient
+from app.services.edit_batcher import ApplyEditsBatcher, BatchCommittedFn, BatchSentFn
+from app.services.feature_query import FeatureQueryEngine
+from app.services.feature_stream import GENERATE_FEATURES, FeatureStreamDecoder, iter_response_features
+from app.services.generate_cache import generate_cache_key, get_generate_cache
+from app.services.payload import PayloadStats, encode_form, quantize_features
+from app.services.spk_index import get_spk_index
+from app.services.spk_sync import SPKSyncPlanner, SyncPlan, SYNC_OUT_FIELDS
+from app.services.hierarchy import VendorHierarchy, HIERARCHY_FIELDS
+from app.utils.cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+# One limit per process: every ArcGIS call from every request shares it
+arcgis_limiter = AdaptiveLimiter()
+# Layers that rejected a gzip-encoded request body; these get plain bodies from then on
+_gzip_rejected = set()
+# Responses that mean the server could not read a compressed body. Anything
+# else (validation errors, overload, auth) is passed through unchanged.
+GZIP_REJECTED_STATUSES = {400, 411, 415}
+GZIP_REJECTED_ERROR_CODES = {411, 415}
+GZIP_REJECTED_ERROR_MESSAGES = ("unable to parse", "invalid or missing input parameters")
+
+# Dashboard lookups change about once a day; share each vendor's tree across requests
+hierarchy_cache = AsyncTTLCache(
+    ttl=settings.DASHBOARD_CACHE_TTL,
+    max_entries=settings.DASHBOARD_CACHE_MAX_ENTRIES,
+    stale_ttl=settings.DASHBOARD_CACHE_STALE_TTL
+)
+
+
+class AsyncArcGISService(ArcGISService):
+    """
+    Non-blocking counterpart of ArcGISService for use inside async routes.
+
+    Shares the pooled HTTP/2 client from app.core.http, so concurrent
+    requests on one worker multiplex over the same ArcGIS connections, and
+    gates every call through the process-wide adaptive arcgis_limiter.
+    """
+
+    def __init__(self, gis_credentials: dict = None, client: httpx.AsyncClient = None):
+        super().__init__(gis_credentials)
+        self._client = client
+
+    @property
+    def client(self) -> LimitedClient:
+        return LimitedClient(self._client or get_http_client(), arcgis_limiter)
+
+    async def get_token(self) -> str:
+        token = None
+        for step in (1, 2, 3):
+            response = await self.client.post(
+                self.token_url,
+                headers=self.token_headers,
+                data=self._token_step_data(step, token)
+            )
+            token = response.json().get('token')
+            if not token:
+                raise ArcGISAuthenticationError(self.TOKEN_STEP_ERRORS[step])
+
+        return token
+
+    def query_engine(self, token: str, layer_url: str = None) -> FeatureQueryEngine:
+        return FeatureQueryEngine(self.client, layer_url or self.base_url, token, headers=self.token_headers)
+
+    async def _spk_index(self, method: str, spk: str, *args: Any) -> Any:
+        """Call an SPKIndex method off the event loop; no-op when the index is disabled."""
+        index = get_spk_index()
+        if index is None:
+            return None
+        return await asyncio.to_thread(getattr(index, method), self.base_url, spk, *args)
+
+    async def query_spk(self, spk: str, token: str = None, fresh: bool = False) -> List[int]:
+        """OBJECTIDs of an SPK, from the local index when fresh, otherwise from the layer."""
+        if not fresh:
+            cached = await self._spk_index('lookup', spk)
+            if cached is not None:
+                return cached
+
+        token = token or await self.get_token()
+        oids = await self.query_engine(token).object_ids(f"SPKNumber='{spk}'")
+        await self._spk_index('reconcile', spk, oids)
+        return oids
+
+    async def count_spk(self, spk: str, token: str = None) -> int:
+        cached = await self._spk_index('lookup', spk)
+        if cached is not None:
+            return len(cached)
+
+        token = token or await self.get_token()
+        return await self.query_engine(token).count(f"SPKNumber='{spk}'")
+
+    async def _delete_oids(self, spk: str, token: str, oids: List[int]) -> Dict[str, Any]:
+        result = await self._batcher(token).submit_deletes(oids)
+        await self._spk_index('remove', spk, [r["objectId"] for r in result["deleteResults"] if r.get("success")])
+        return result
+
+    async def delete_spk(self, spk: str) -> Dict[str, Any]:
+        token = await self.get_token()
+
+        oids = await self.query_spk(spk, token)
+        if not oids:
+            raise SPKNotFoundError(spk)
+
+        result = await self._delete_oids(spk, token, oids)
+        deleted = result["deleted"]
+        if result["failed"]:
+            # The index may have been stale; retry once against the live layer
+            remaining = await self.query_spk(spk, token, fresh=True)
+            if remaining:
+                result = await self._delete_oids(spk, token, remaining)
+                deleted += result["deleted"]
+                if result["failed"]:
+                    await self._spk_index('invalidate', spk)
+                    raise ArcGISUploadError(
+                        f"Delete failed for OBJECTIDs {[f['objectId'] for f in result['failed']]}"
+                    )
+
+        return {
+            "success": True,
+            "message": f"Deleted {deleted} objects for SPK {spk}",
+            "deleted_count": deleted,
+            "oids": oids
+        }
+
+    async def reconcile_spk_index(self, limit: int = None) -> int:
+        """Re-query the SPKs whose index entries are oldest; returns how many were refreshed."""
+        index = get_spk_index()
+        if index is None:
+            return 0
+
+        spks = await asyncio.to_thread(
+            index.stale, self.base_url, index.max_age / 2, limit or settings.SPK_INDEX_RECONCILE_BATCH
+        )
+        if not spks:
+            return 0
+
+        token = await self.get_token()
+        await asyncio.gather(*(self.query_spk(spk, token, fresh=True) for spk in spks))
+        return len(spks)
+
+    async def upload_shapefile(self, zip_path: Path, spk_number: str) -> Dict[str, Any]:
+        token = await self.get_token()
+
+        with open(zip_path, 'rb') as f:
+            response = await self.client.post(
+                self.upload_url,
+                params=self._generate_params(spk_number, token),
+                data={'token': token},
+                files={'file': ('final_upload.zip', f, 'application/zip')}
+            )
+
+        if not response.is_success:
+            raise ArcGISUploadError(f"Upload failed: {response.status_code} {response.text}")
+
+        return response.json()
+
+    async def generate_features(
+        self, zip_path: Path, spk_number: str, content_hash: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Convert the shapefile ZIP through features/generate, yielding quantized features as they stream in.
+
+        Unlike upload_shapefile, the featureCollection is never materialized.
+        ZIPs with more zones than fit in one generate call are split into
+        parts that are converted concurrently and yielded in order. Results
+        are cached by the ZIP's content hash and the generate parameters, so
+        retrying the same ZIP skips the upload entirely. `content_hash` is
+        the ZIP's sha256 when the caller already has it.
+        """
+        precision = settings.ARCGIS_COORDINATE_PRECISION
+        cache = get_generate_cache()
+        writer = None
+        if cache is not None:
+            key = await asyncio.to_thread(
+                generate_cache_key, zip_path, {**self._generate_params(spk_number, None), 'precision': precision},
+                content_hash
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                for feature in cache.read(cached):
+                    yield feature
+                return
+            writer = cache.writer(key)
+
+        try:
+            size = self._partition_size()
+            try:
+                count = await asyncio.to_thread(ShapefileService.count_features, zip_path)
+            except FileProcessingError:
+                # Let the portal report what is wrong with the file
+                count = 0
+
+            with tempfile.TemporaryDirectory() as work_dir:
+                if count > size:
+                    features = self._generate_partitioned(zip_path, spk_number, size, Path(work_dir))
+                else:
+                    features = self._generate_part(zip_path, spk_number)
+                async for feature in features:
+                    if writer is not None:
+                        writer.write(feature)
+                    yield feature
+        except BaseException:
+            # Failed or abandoned part-way; never cache a partial result
+            if writer is not None:
+                writer.discard()
+            raise
+
+        if writer is not None:
+            await asyncio.to_thread(writer.commit)
+
+    @staticmethod
+    def _partition_size() -> int:
+        size = settings.ARCGIS_GENERATE_PARTITION_SIZE or settings.ARCGIS_GENERATE_MAX_RECORDS
+        return min(size, settings.ARCGIS_GENERATE_MAX_RECORDS)
+
+    async def _generate_part(self, zip_path: Path, spk_number: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream one ZIP through features/generate."""
+        token = await self.get_token()
+        decoder = FeatureStreamDecoder(GENERATE_FEATURES)
+        precision = settings.ARCGIS_COORDINATE_PRECISION
+
+        with open(zip_path, 'rb') as f:
+            async with self.client.stream(
+                'POST',
+                self.upload_url,
+                params=self._generate_params(spk_number, token),
+                data={'token': token},
+                files={'file': ('final_upload.zip', f, 'application/zip')}
+            ) as response:
+                async for feature in iter_response_features(response, decoder, "Upload"):
+                    yield quantize_features([feature], precision)[0]
+
+    async def _generate_partitioned(
+        self,
+        zip_path: Path,
+        spk_number: str,
+        size: int,
+        work_dir: Path
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Generate `size`-feature parts concurrently, yielding each part's features in part order."""
+        parts = await asyncio.to_thread(ShapefileService.partition_shapefile_zip, zip_path, work_dir, size)
+        semaphore = asyncio.Semaphore(settings.ARCGIS_GENERATE_CONCURRENCY)
+
+        async def convert(part: Path) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return [feature async for feature in self._generate_part(part, spk_number)]
+
+        tasks = [asyncio.ensure_future(convert(part)) for part in parts]
+        try:
+            for task in tasks:
+                for feature in await task:
+                    yield feature
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def apply_edits(self, upload_response: Dict[str, Any], spk_number: str, key_id: str) -> Dict[str, Any]:
+        features = quantize_features(self.extract_features(upload_response), settings.ARCGIS_COORDINATE_PRECISION)
+        return await self.apply_features(features, spk_number, key_id)
+
+    async def apply_features(
+        self,
+        features: Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        spk_number: str,
+        key_id: str,
+        skip_flight_ids: Set[Any] = None,
+        on_batch_sent: BatchSentFn = None,
+        on_batch_committed: BatchCommittedFn = None,
+        start_index: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Map Esri JSON zone features onto the layer schema and submit them via applyEdits.
+
+        `features` may be a list or an async stream (see generate_features);
+        each feature is mapped and batched as it arrives. Features whose
+        FlightID is in `skip_flight_ids` are left out, which is how a resumed
+        upload avoids re-adding what an earlier attempt committed. The batch
+        hooks are passed through to the batcher.
+        """
+        token = await self.get_token()
+        skip = skip_flight_ids or set()
+
+        async def adds() -> AsyncIterator[Dict[str, Any]]:
+            if isinstance(features, list):
+                for feature in features:
+                    if feature["attributes"].get("Name") not in skip:
+                        yield self.build_adds([feature], spk_number, key_id)[0]
+            else:
+                async for feature in features:
+                    if feature["attributes"].get("Name") not in skip:
+                        yield self.build_adds([feature], spk_number, key_id)[0]
+
+        stats = self._payload_stats()
+        result = await self._batcher(token, stats).submit_adds_stream(
+            adds(), on_batch_sent=on_batch_sent, on_batch_committed=on_batch_committed, start_index=start_index
+        )
+        await self._spk_index('add', spk_number, self._succeeded_ids(result["addResults"]))
+
+        return {
+            "success": not result["failed"],
+            "response": result,
+            "features_added": result["added"],
+            "failed_features": result["failed"],
+            "payload": stats.to_dict()
+        }
+
+    async def spk_flight_ids(self, spk: str) -> Set[Any]:
+        """FlightIDs currently stored under an SPK, read from the layer."""
+        token = await self.get_token()
+        return {
+            feature["attributes"].get("FlightID")
+            async for feature in self.query_engine(token).iter_features(f"SPKNumber='{spk}'", out_fields="FlightID")
+        }
+
+    async def sync_features(
+        self,
+        features: List[Dict[str, Any]],
+        spk_number: str,
+        key_id: str,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """Upsert an SPK by sending only the adds, updates and deletes that differ from the live layer."""
+        token = await self.get_token()
+        new_features = self.build_adds(features, spk_number, key_id)
+
+        # Live features are reduced to hashes as they stream in
+        planner = SPKSyncPlanner(settings.ARCGIS_COORDINATE_PRECISION)
+        plan = SyncPlan()
+        async for feature in self.query_engine(token).iter_features(
+            f"SPKNumber='{spk_number}'",
+            out_fields=SYNC_OUT_FIELDS,
+            return_geometry=True,
+            outSR=4326
+        ):
+            planner.add_existing(plan, feature)
+        # The stream just listed every live feature of the SPK
+        await self._spk_index('reconcile', spk_number, [oid for oid, _, _, _ in plan.existing.values()] + plan.deletes)
+        planner.diff(plan, new_features, self.unparsed_flight_times(features))
+
+        if dry_run:
+            return {
+                "success": True,
+                "dry_run": True,
+                "plan": plan.summary(),
+                "features_added": 0,
+                "failed_features": []
+            }
+
+        stats = self._payload_stats()
+        result = await self._batcher(token, stats).submit_edits(plan.adds, plan.updates, plan.deletes)
+        await self._spk_index('add', spk_number, self._succeeded_ids(result["addResults"]))
+        await self._spk_index('remove', spk_number, self._succeeded_ids(result["deleteResults"]))
+
+        return {
+            "success": not result["failed"],
+            "dry_run": False,
+            "plan": plan.summary(),
+            "response": result,
+            "features_added": result["added"],
+            "features_updated": result["updated"],
+            "features_deleted": result["deleted"],
+            "failed_features": result["failed"],
+            "payload": stats.to_dict()
+        }
+
+    @staticmethod
+    def _succeeded_ids(results: List[Dict[str, Any]]) -> List[int]:
+        return [r["objectId"] for r in results if r.get("success") and r.get("objectId") is not None]
+
+    def _payload_stats(self) -> PayloadStats:
+        return PayloadStats(
+            settings.ARCGIS_COORDINATE_PRECISION,
+            settings.ARCGIS_GZIP_REQUESTS and self.base_url not in _gzip_rejected
+        )
+
+    async def _post_edits(self, token: str, payload: Dict[str, str], stats: PayloadStats) -> Any:
+        compress = stats.gzip and self.base_url not in _gzip_rejected
+        if compress:
+            # Compressing tens of MB would stall the event loop
+            body, headers, raw_size = await asyncio.to_thread(
+                encode_form, payload, True, settings.ARCGIS_GZIP_LEVEL
+            )
+        else:
+            body, headers, raw_size = encode_form(payload, False)
+
+        response = await self.client.post(
+            f"{self.base_url}/applyEdits",
+            params={'token': token},
+            content=body,
+            headers=headers
+        )
+
+        if compress and self._rejected_compressed_body(response):
+            # Server does not accept compressed bodies; remember and resend plain
+            _gzip_rejected.add(self.base_url)
+            stats.gzip = False
+            return await self._post_edits(token, payload, stats)
+
+        stats.record(raw_size, len(body))
+        return response
+
+    @staticmethod
+    def _rejected_compressed_body(response: httpx.Response) -> bool:
+        if response.status_code in GZIP_REJECTED_STATUSES:
+            return True
+        try:
+            # ArcGIS reports unreadable requests as HTTP 200 with an error body
+            error = response.json().get('error')
+        except (ValueError, AttributeError):
+            return False
+        if not isinstance(error, dict):
+            return False
+        message = str(error.get('message', '')).lower()
+        return (
+            error.get('code') in GZIP_REJECTED_ERROR_CODES
+            or (error.get('code') == 400 and any(text in message for text in GZIP_REJECTED_ERROR_MESSAGES))
+        )
+
+    def _batcher(self, token: str, stats: PayloadStats = None) -> ApplyEditsBatcher:
+        stats = stats or self._payload_stats()
+
+        async def submit(payload: Dict[str, str]) -> Dict[str, Any]:
+            response = await self._post_edits(token, payload, stats)
+            if not response.is_success:
+                raise ArcGISUploadError(f"Apply edits failed: {response.status_code}")
+            return response.json()
+
+        return ApplyEditsBatcher(submit)
+
+    async def query_dashboard(self, where: str, out_fields: str) -> List[Dict[str, Any]]:
+        """Run a distinct-values dashboard query through the limited client, as f=pbf where supported."""
+        token = await self.get_token()
+        data = await self.query_engine(token, settings.ARCGIS_DASHBOARD_URL).query(
+            self._dashboard_params(where, out_fields, token)
+        )
+        return self._dashboard_attributes(data)
+
+    @staticmethod
+    def invalidate_dashboard_cache(vendor_code: str = None) -> int:
+        """Drop cached dashboard lookups for one vendor, or all of them."""
+        if vendor_code is None:
+            count = len(hierarchy_cache)
+            hierarchy_cache.clear()
+            return count
+        return hierarchy_cache.invalidate(lambda key: key[0] == vendor_code)
+
+    async def get_hierarchy(self, vendor_code: str) -> VendorHierarchy:
+        """Get the vendor's full Region/District/Petak/SPK tree, cached per vendor."""
+        return await hierarchy_cache.get_or_load(
+            (vendor_code,),
+            lambda: self._load_hierarchy(vendor_code)
+        )
+
+    async def _load_hierarchy(self, vendor_code: str) -> VendorHierarchy:
+        token = await self.get_token()
+        where = f"VendorCode='{vendor_code}' AND Drone=0"
+        page_size = settings.DASHBOARD_PAGE_SIZE
+
+        engine = self.query_engine(token, settings.ARCGIS_DASHBOARD_URL)
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            params = self._dashboard_params(where, HIERARCHY_FIELDS, token)
+            params.update({
+                'orderByFields': HIERARCHY_FIELDS,
+                'resultOffset': offset,
+                'resultRecordCount': page_size,
+            })
+            data = await engine.query(params)
+            page = self._dashboard_attributes(data)
+            rows.extend(page)
+
+            if not data.get('exceededTransferLimit') or not page:
+                break
+            offset += len(page)
+
+        return VendorHierarchy(rows)
+
+    async def get_regions(self, vendor_code: str) -> List[str]:
+        return (await self.get_hierarchy(vendor_code)).regions()
+
+    async def get_districts(self, vendor_code: str, region: str) -> List[str]:
+        return (await self.get_hierarchy(vendor_code)).districts(region)
+
+    async def get_petaks(self, vendor_code: str, district: str) -> List[str]:
+        return (await self.get_hierarchy(vendor_code)).petaks(district)
+
+    async def get_spk_numbers(self, vendor_code: str, petak: str) -> List[Dict[str, str]]:
+        return (await self.get_hierarchy(vendor_code)).spk_numbers(petak)
+
+    async def check_spk_exists(self, spk: str, include_oids: bool = True) -> Dict[str, Any]:
+        if include_oids:
+            oids = await self.query_spk(spk)
+            count = len(oids)
+        else:
+            oids = []
+            count = await self.count_spk(spk)
+
+        return {
+            "exists": count > 0,
+            "count": count,
+            "spk": spk,
+            "oids": oids
+        }
+
+
+async def run_spk_index_reconciler(interval: float) -> None:
+    """Background loop that keeps the SPK index's entries from going stale."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            refreshed = await AsyncArcGISService().reconcile_spk_index()
+            if refreshed:
+                logger.info(f"Reconciled {refreshed} SPK index entries")
+        except Exception as e:
+            logger.warning(f"SPK index reconcile failed: {e}")
@@ -0,0 +1,238 @@
+import asyncio
+import contextlib
+import statistics
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.config import settings
+
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+# Transport failures that mean the server is shedding load: timeouts, refused
+# or reset connections, and responses cut off mid-stream
+OVERLOAD_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for outbound ArcGIS requests.
+
+    The limit grows by roughly one slot per round of healthy responses and
+    is cut multiplicatively on timeouts and dropped connections, 429/5xx
+    responses, ArcGIS error bodies with a 429/5xx code, or latency well
+    above the endpoint's recent baseline. Other ArcGIS errors (bad query,
+    expired token) are counted but leave the limit alone.
+    """
+
+    def __init__(
+        self,
+        initial: int = None,
+        min_limit: int = None,
+        max_limit: int = None,
+        backoff: float = None,
+        latency_tolerance: float = None,
+        latency_floor: float = None,
+        window: int = 200
+    ):
+        self.min_limit = min_limit or settings.ARCGIS_LIMIT_MIN
+        self.max_limit = max_limit or settings.ARCGIS_LIMIT_MAX
+        self.limit = float(initial or settings.ARCGIS_LIMIT_INITIAL)
+        self.backoff = backoff or settings.ARCGIS_LIMIT_BACKOFF
+        self.latency_tolerance = latency_tolerance or settings.ARCGIS_LIMIT_LATENCY_TOLERANCE
+        self.latency_floor = settings.ARCGIS_LIMIT_LATENCY_FLOOR if latency_floor is None else latency_floor
+        self.in_flight = 0
+        self.successes = 0
+        self.overloads = 0
+        self.errors = 0
+        self._waiters: Deque["asyncio.Future"] = deque()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._baselines: Dict[str, Deque[float]] = {}
+        self._last_cut = 0.0
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> None:
+        while self.in_flight >= self.current_limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Already popped by _wake: pass the wakeup on instead of losing it
+                if waiter not in self._waiters:
+                    self._wake()
+                raise
+            finally:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = self.current_limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Waiters may belong to another loop (e.g. the test client's portal)
+                waiter.get_loop().call_soon_threadsafe(self._resolve, waiter)
+                free -= 1
+
+    @staticmethod
+    def _resolve(waiter: "asyncio.Future") -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _cut(self, factor: float) -> None:
+        now = time.monotonic()
+        # At most one cut per typical round trip, so one burst of errors counts once
+        cooldown = statistics.median(self._latencies) if self._latencies else 0.0
+        if now - self._last_cut < cooldown:
+            return
+        self._last_cut = now
+        self.limit = max(float(self.min_limit), self.limit * factor)
+
+    def record_success(self, endpoint: str, latency: float) -> None:
+        self.successes += 1
+        self._latencies.append(latency)
+        samples = self._baselines.setdefault(endpoint, deque(maxlen=50))
+        baseline = min(samples) if samples else latency
+        samples.append(latency)
+
+        if latency <= self.latency_floor or latency <= baseline * self.latency_tolerance:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+            self._wake()
+        else:
+            self._cut(0.9)
+
+    def record_overload(self) -> None:
+        self.overloads += 1
+        self._cut(self.backoff)
+
+    def record_error(self) -> None:
+        """A failed request that says nothing about load; leaves the limit alone."""
+        self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+        return {
+            "limit": self.current_limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "errors": self.errors,
+            "latency": {
+                "samples": len(latencies),
+                "mean": round(statistics.fmean(latencies), 4) if latencies else None,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1], 4) if latencies else None,
+            },
+        }
+
+
+def _endpoint(url: Any) -> str:
+    return urlparse(str(url)).path.rsplit('/', 1)[-1] or '/'
+
+
+def _arcgis_error_code(response: httpx.Response) -> Optional[int]:
+    """Code of an ArcGIS error body (reported as HTTP 200 with {"error": {...}}), else None; 0 if it has none."""
+    content_type = response.headers.get('content-type', '')
+    if 'json' not in content_type and 'text/plain' not in content_type:
+        return None
+    # Sniff before parsing so successful responses are never decoded here
+    if not response.content[:64].lstrip().startswith(b'{"error"'):
+        return None
+    try:
+        code = response.json()['error'].get('code')
+        return int(code)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return 0
+
+
+def _is_overload_code(code: int) -> bool:
+    return code in OVERLOAD_STATUSES or 500 <= code < 600
+
+
+class LimitedClient:
+    """Routes httpx.AsyncClient calls through an AdaptiveLimiter."""
+
+    def __init__(self, client: httpx.AsyncClient, limiter: AdaptiveLimiter):
+        self.client = client
+        self.limiter = limiter
+
+    def _classify(self, url: Any, response: httpx.Response, started: float) -> None:
+        if response.status_code in OVERLOAD_STATUSES:
+            self.limiter.record_overload()
+            return
+
+        code = _arcgis_error_code(response)
+        if code is None:
+            self.limiter.record_success(_endpoint(url), time.monotonic() - started)
+        elif _is_overload_code(code):
+            self.limiter.record_overload()
+        else:
+            # Bad queries, expired tokens, unsupported formats: not the server's load
+            self.limiter.record_error()
+
+    async def request(self, method: str, url: Any, **kwargs) -> httpx.Response:
+        await self.limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except OVERLOAD_ERRORS:
+            self.limiter.record_overload()
+            raise
+        finally:
+            self.limiter.release()
+
+        self._classify(url, response, started)
+        return response
+
+    async def get(self, url: Any, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: Any, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method: str, url: Any, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        Streamed request whose slot is released once the response headers
+        arrive, so callers may make further limited requests while reading
+        the body without deadlocking at low limits.
+        """
+        await self.limiter.acquire()
+        started = time.monotonic()
+        released = False
+        try:
+            async with self.client.stream(method, url, **kwargs) as response:
+                released = True
+                self.limiter.release()
+                if response.status_code in OVERLOAD_STATUSES:
+                    self.limiter.record_overload()
+                else:
+                    self.limiter.record_success(_endpoint(url), time.monotonic() - started)
+                yield response
+        except OVERLOAD_ERRORS:
+            self.limiter.record_overload()
+            raise
+        finally:
+            if not released:
+                self.limiter.release()
@@ -0,0 +1,270 @@
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Tuple
+
+from app.core.config import settings
+from app.services.payload import dumps
+
+SubmitFn = Callable[[Dict[str, str]], Awaitable[Dict[str, Any]]]
+BatchSentFn = Callable[[int, List[Any]], Awaitable[None]]
+BatchCommittedFn = Callable[[int, List[Any], List[Dict[str, Any]]], Awaitable[None]]
+
+
+class ApplyEditsBatcher:
+    """
+    Splits applyEdits payloads into bounded chunks and submits them concurrently.
+
+    Chunks are capped both by feature count and by serialized size, so a
+    single oversized SPK never turns into one request the server rejects.
+    Results are merged back into input order; a failing chunk only fails
+    the features it carried.
+    """
+
+    def __init__(
+        self,
+        submit: SubmitFn,
+        max_features: int = None,
+        max_bytes: int = None,
+        concurrency: int = None
+    ):
+        self.submit = submit
+        self.max_features = max_features or settings.ARCGIS_EDIT_BATCH_SIZE
+        self.max_bytes = max_bytes or settings.ARCGIS_EDIT_BATCH_MAX_BYTES
+        self.concurrency = concurrency or settings.ARCGIS_EDIT_CONCURRENCY
+
+    def chunk(self, serialized: List[str]) -> List[List[int]]:
+        """Group serialized items into index chunks within the count and byte limits."""
+        chunks: List[List[int]] = []
+        current: List[int] = []
+        current_bytes = 2  # surrounding brackets
+
+        for i, item in enumerate(serialized):
+            size = len(item.encode('utf-8')) + 1  # comma separator
+            if current and (len(current) >= self.max_features or current_bytes + size > self.max_bytes):
+                chunks.append(current)
+                current, current_bytes = [], 2
+            current.append(i)
+            current_bytes += size
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _run(self, payloads: List[Dict[str, str]]) -> List[Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(payload: Dict[str, str]):
+            async with semaphore:
+                return await self.submit(payload)
+
+        return await asyncio.gather(*(run_one(p) for p in payloads), return_exceptions=True)
+
+    @staticmethod
+    def _batch_error(result: Any) -> Any:
+        if isinstance(result, Exception):
+            return {"description": getattr(result, "detail", None) or str(result)}
+        if isinstance(result, dict) and "error" in result:
+            return result["error"]
+        return None
+
+    async def submit_adds(self, adds: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Submit features as chunked `adds` and merge the per-feature addResults."""
+        result = await self.submit_edits(adds=adds)
+        return {
+            "addResults": result["addResults"],
+            "batches": result["batches"],
+            "added": result["added"],
+            "failed": result["failed"]
+        }
+
+    async def submit_adds_stream(
+        self,
+        adds: AsyncIterable[Dict[str, Any]],
+        on_batch_sent: BatchSentFn = None,
+        on_batch_committed: BatchCommittedFn = None,
+        start_index: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Submit features from an async stream as they arrive.
+
+        At most `concurrency` batches are in flight while the next one fills,
+        so memory is bounded by the batch size rather than the SPK size.
+        The optional hooks are awaited with each batch's index and FlightIDs
+        before it is sent, and with its addResults once the server answered.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batches: List[Tuple[List[Any], "asyncio.Task"]] = []
+
+        async def run_one(index: int, flight_ids: List[Any], payload: Dict[str, str]):
+            try:
+                if on_batch_sent is not None:
+                    await on_batch_sent(index, flight_ids)
+                result = await self.submit(payload)
+                if on_batch_committed is not None and self._batch_error(result) is None:
+                    await on_batch_committed(index, flight_ids, self._chunk_results(len(flight_ids), result, None))
+                return result
+            finally:
+                semaphore.release()
+
+        async def launch(serialized: List[str], flight_ids: List[Any]) -> None:
+            # Waiting here stops the producer until a batch slot frees up
+            await semaphore.acquire()
+            payload = {"f": "json", "adds": "[" + ",".join(serialized) + "]"}
+            index = start_index + len(batches)
+            batches.append((flight_ids, asyncio.ensure_future(run_one(index, flight_ids, payload))))
+
+        serialized: List[str] = []
+        flight_ids: List[Any] = []
+        batch_bytes = 2
+        try:
+            async for feature in adds:
+                item = dumps(feature)
+                size = len(item.encode('utf-8')) + 1
+                if serialized and (len(serialized) >= self.max_features or batch_bytes + size > self.max_bytes):
+                    await launch(serialized, flight_ids)
+                    serialized, flight_ids, batch_bytes = [], [], 2
+                serialized.append(item)
+                flight_ids.append(feature.get("attributes", {}).get("FlightID"))
+                batch_bytes += size
+            if serialized:
+                await launch(serialized, flight_ids)
+        finally:
+            results = await asyncio.gather(*(task for _, task in batches), return_exceptions=True)
+
+        add_results: List[Dict[str, Any]] = []
+        failed = []
+        for (ids, _), result in zip(batches, results):
+            for flight_id, entry in zip(ids, self._chunk_results(len(ids), result, self._batch_error(result))):
+                if not entry.get("success"):
+                    failed.append({
+                        "operation": "add",
+                        "index": len(add_results),
+                        "flight_id": flight_id,
+                        "error": entry.get("error")
+                    })
+                add_results.append(entry)
+
+        return {
+            "addResults": add_results,
+            "batches": len(batches),
+            "added": sum(1 for entry in add_results if entry.get("success")),
+            "failed": failed
+        }
+
+    def _chunk_results(self, count: int, result: Any, error: Any) -> List[Dict[str, Any]]:
+        chunk_results: List[Dict[str, Any]] = [None] * count
+        self._place(chunk_results, list(range(count)), [] if error else result.get("addResults", []), error)
+        return chunk_results
+
+    async def submit_deletes(self, oids: List[int]) -> Dict[str, Any]:
+        """Submit OBJECTIDs as chunked comma-separated `deletes`."""
+        result = await self.submit_edits(deletes=oids)
+        return {
+            "deleteResults": result["deleteResults"],
+            "batches": result["batches"],
+            "deleted": result["deleted"],
+            "failed": result["failed"]
+        }
+
+    async def submit_edits(
+        self,
+        adds: List[Dict[str, Any]] = None,
+        updates: List[Dict[str, Any]] = None,
+        deletes: List[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Submit any mix of adds, updates and deletes.
+
+        Small edit sets go out as a single applyEdits request; larger ones
+        are chunked per operation and the i-th chunk of each is sent together.
+        """
+        adds, updates, deletes = adds or [], updates or [], deletes or []
+
+        serialized_adds = [dumps(feature) for feature in adds]
+        serialized_updates = [dumps(feature) for feature in updates]
+        add_chunks = self.chunk(serialized_adds)
+        update_chunks = self.chunk(serialized_updates)
+        delete_chunks = [
+            list(range(start, min(start + self.max_features, len(deletes))))
+            for start in range(0, len(deletes), self.max_features)
+        ]
+        batches = max(len(add_chunks), len(update_chunks), len(delete_chunks))
+
+        def chunk_at(chunks: List[List[int]], i: int) -> List[int]:
+            return chunks[i] if i < len(chunks) else []
+
+        payloads = []
+        for i in range(batches):
+            payload = {"f": "json"}
+            if chunk_at(add_chunks, i):
+                payload["adds"] = "[" + ",".join(serialized_adds[j] for j in add_chunks[i]) + "]"
+            if chunk_at(update_chunks, i):
+                payload["updates"] = "[" + ",".join(serialized_updates[j] for j in update_chunks[i]) + "]"
+            if chunk_at(delete_chunks, i):
+                payload["deletes"] = ",".join(str(deletes[j]) for j in delete_chunks[i])
+            payloads.append(payload)
+
+        results = await self._run(payloads)
+
+        add_results: List[Dict[str, Any]] = [None] * len(adds)
+        update_results: List[Dict[str, Any]] = [None] * len(updates)
+        delete_results: List[Dict[str, Any]] = [None] * len(deletes)
+        for i, result in enumerate(results):
+            error = self._batch_error(result)
+            self._place(add_results, chunk_at(add_chunks, i), [] if error else result.get("addResults", []), error)
+            self._place(update_results, chunk_at(update_chunks, i), [] if error else result.get("updateResults", []), error)
+
+            by_oid = {} if error else {r.get("objectId"): r for r in result.get("deleteResults", [])}
+            for j in chunk_at(delete_chunks, i):
+                delete_results[j] = by_oid.get(deletes[j]) or self._missing_result(deletes[j], error)
+
+        failed = []
+        for i, entry in enumerate(add_results):
+            if not entry.get("success"):
+                failed.append({
+                    "operation": "add",
+                    "index": i,
+                    "flight_id": adds[i].get("attributes", {}).get("FlightID"),
+                    "error": entry.get("error")
+                })
+        for i, entry in enumerate(update_results):
+            if not entry.get("success"):
+                failed.append({
+                    "operation": "update",
+                    "objectId": updates[i].get("attributes", {}).get("OBJECTID"),
+                    "flight_id": updates[i].get("attributes", {}).get("FlightID"),
+                    "error": entry.get("error")
+                })
+        for i, entry in enumerate(delete_results):
+            if not entry.get("success"):
+                failed.append({"operation": "delete", "objectId": deletes[i], "error": entry.get("error")})
+
+        def succeeded(entries: List[Dict[str, Any]]) -> int:
+            return sum(1 for entry in entries if entry.get("success"))
+
+        return {
+            "addResults": add_results,
+            "updateResults": update_results,
+            "deleteResults": delete_results,
+            "batches": batches,
+            "added": succeeded(add_results),
+            "updated": succeeded(update_results),
+            "deleted": succeeded(delete_results),
+            "failed": failed
+        }
+
+    @staticmethod
+    def _missing_result(object_id: Any, error: Any) -> Dict[str, Any]:
+        return {
+            "objectId": object_id,
+            "success": False,
+            "error": error or {"description": "No result returned for feature"}
+        }
+
+    @classmethod
+    def _place(cls, target: List[Dict[str, Any]], idx: List[int], batch_results: List[Dict[str, Any]], error: Any) -> None:
+        """Copy one chunk's positional results back to their input indices."""
+        for position, feature_index in enumerate(idx):
+            if position < len(batch_results):
+                target[feature_index] = batch_results[position]
+            else:
+                target[feature_index] = cls._missing_result(None, error)
@@ -0,0 +1,89 @@
+import datetime
+import math
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from app.core.config import settings
+from app.core.exceptions import FileProcessingError
+from app.services.shapefile_service import ShapefileService
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+    import numpy as np
+
+WGS84 = 4326
+
+
+class EsriJSONEncoder:
+    """
+    Vectorized GeoDataFrame -> Esri JSON polyline encoder.
+
+    Produces the same feature shape as the portal `features/generate`
+    featureSet, so its output can go straight into ArcGISService.build_adds.
+    """
+
+    @staticmethod
+    def encode_paths(geoms: 'np.ndarray', precision: int = None) -> List[List[List[List[float]]]]:
+        """Encode an array of (multi)line or polygon geometries as Esri `paths` lists."""
+        import numpy as np
+        import shapely
+
+        polygonal = np.isin(shapely.get_type_id(geoms), [3, 6])
+        if polygonal.any():
+            geoms = np.where(polygonal, shapely.boundary(geoms), geoms)
+
+        parts, feature_index = shapely.get_parts(geoms, return_index=True)
+        coords, part_index = shapely.get_coordinates(parts, return_index=True)
+        if precision is not None:
+            coords = np.round(coords, precision)
+
+        counts = np.bincount(part_index, minlength=len(parts))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        coord_list = coords.tolist()
+
+        paths: List[List[List[List[float]]]] = [[] for _ in range(len(geoms))]
+        for part, feature in enumerate(feature_index.tolist()):
+            paths[feature].append(coord_list[bounds[part]:bounds[part + 1]])
+        return paths
+
+    @staticmethod
+    def encode(gdf: 'gpd.GeoDataFrame', precision: int = None) -> List[Dict[str, Any]]:
+        """Encode every row as an Esri JSON polyline feature in WGS84."""
+        import numpy as np
+        import pandas as pd
+
+        def to_python(value: Any) -> Any:
+            if value is pd.NaT:
+                return None
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, float) and math.isnan(value):
+                return None
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                # Match the text form generate returns for date fields
+                return str(value)[:19]
+            return value
+
+        try:
+            if gdf.crs is not None and gdf.crs.to_epsg() != WGS84:
+                gdf = gdf.to_crs(epsg=WGS84)
+
+            paths = EsriJSONEncoder.encode_paths(np.asarray(gdf.geometry.values), precision)
+            columns = [c for c in gdf.columns if c != gdf.geometry.name]
+            records = gdf[columns].to_dict(orient='records')
+        except Exception as e:
+            raise FileProcessingError(f"Esri JSON encoding failed: {str(e)}")
+
+        return [
+            {
+                "geometry": {"paths": feature_paths, "spatialReference": {"wkid": WGS84}},
+                "attributes": {k: to_python(v) for k, v in record.items()},
+            }
+            for feature_paths, record in zip(paths, records)
+        ]
+
+    @staticmethod
+    def encode_shapefile_zip(zip_path: Path, work_dir: Path) -> List[Dict[str, Any]]:
+        """Load a final upload ZIP and encode its zones as Esri JSON features."""
+        gdf = ShapefileService.load_shapefile_from_zip(zip_path, work_dir)
+        return EsriJSONEncoder.encode(gdf, settings.ARCGIS_COORDINATE_PRECISION)
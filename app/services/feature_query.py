@@ -0,0 +1,204 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+from app.core.config import settings
+from app.core.exceptions import ArcGISUploadError
+from app.services.concurrency import LimitedClient
+from app.services.feature_stream import FeatureStreamDecoder, iter_response_features
+
+# Query endpoints that did not answer f=pbf; these are queried with f=json from then on
+_pbf_unsupported = set()
+
+
+class FeatureQueryEngine:
+    """
+    Query helper for a single FeatureServer/MapServer layer.
+
+    Uses count-only and ID-only query modes where the caller does not need
+    attributes, and pages attribute queries with resultOffset so results
+    larger than the server's maxRecordCount are never truncated. Queries are
+    sent as f=pbf when configured and fall back to f=json for layers that
+    do not support it.
+    """
+
+    def __init__(
+        self,
+        client: Union[httpx.AsyncClient, LimitedClient],
+        layer_url: str,
+        token: str,
+        headers: Dict[str, str] = None,
+        page_size: int = None,
+        concurrency: int = None,
+        query_format: str = None
+    ):
+        self.client = client
+        self.query_url = f"{layer_url}/query"
+        self.token = token
+        self.headers = headers or {}
+        self.page_size = page_size or settings.ARCGIS_QUERY_PAGE_SIZE
+        self.concurrency = concurrency or settings.ARCGIS_QUERY_CONCURRENCY
+        self.query_format = query_format or settings.ARCGIS_QUERY_FORMAT
+
+    @property
+    def use_pbf(self) -> bool:
+        return self.query_format == 'pbf' and self.query_url not in _pbf_unsupported
+
+    async def _query_pbf(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Query with f=pbf; returns None (and remembers the layer) when the server does not speak it."""
+        # The decoder pulls in numpy, so it loads with the first pbf query
+        from app.services.pbf import PBFDecodeError, decode_query_result
+
+        response = await self.client.get(
+            self.query_url,
+            params={**params, 'f': 'pbf', 'token': self.token},
+            headers=self.headers
+        )
+        if response.status_code >= 500:
+            raise ArcGISUploadError(f"Query failed: {response.status_code}")
+
+        if response.is_success and not response.content.lstrip().startswith(b'{'):
+            try:
+                if len(response.content) > 64 * 1024:
+                    return await asyncio.to_thread(decode_query_result, response.content)
+                return decode_query_result(response.content)
+            except PBFDecodeError:
+                pass
+
+        # JSON error body or undecodable payload: this layer gets f=json from now on
+        _pbf_unsupported.add(self.query_url)
+        return None
+
+    async def _query_json(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.client.get(
+            self.query_url,
+            params={**params, 'f': 'json', 'token': self.token},
+            headers=self.headers
+        )
+        if not response.is_success:
+            raise ArcGISUploadError(f"Query failed: {response.status_code}")
+
+        data = response.json()
+        if 'error' in data:
+            raise ArcGISUploadError(f"Query failed: {data['error'].get('message', str(data['error']))}")
+        return data
+
+    async def _stream_json(self, params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Run an f=json feature query, decoding the body incrementally as it streams in."""
+        decoder = FeatureStreamDecoder()
+        async with self.client.stream(
+            'GET',
+            self.query_url,
+            params={**params, 'f': 'json', 'token': self.token},
+            headers=self.headers
+        ) as response:
+            features = [f async for f in iter_response_features(response, decoder, "Query")]
+        return features, decoder.metadata
+
+    async def _after_pbf_fallback(self, json_query):
+        try:
+            return await json_query
+        except ArcGISUploadError:
+            # The error was not about the format; give pbf another chance next time
+            _pbf_unsupported.discard(self.query_url)
+            raise
+
+    async def query(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one query and return the f=json shaped response, whichever format was used."""
+        if self.use_pbf:
+            data = await self._query_pbf(params)
+            if data is not None:
+                return data
+            return await self._after_pbf_fallback(self._query_json(params))
+        return await self._query_json(params)
+
+    async def _query_features(self, params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        if self.use_pbf:
+            data = await self._query_pbf(params)
+            if data is not None:
+                return data.get('features', []), data
+            return await self._after_pbf_fallback(self._stream_json(params))
+        return await self._stream_json(params)
+
+    async def count(self, where: str) -> int:
+        data = await self.query({'where': where, 'returnCountOnly': 'true'})
+        return data.get('count', 0)
+
+    async def object_ids(self, where: str) -> List[int]:
+        data = await self.query({'where': where, 'returnIdsOnly': 'true'})
+        return sorted(data.get('objectIds') or [])
+
+    async def _fetch_window(self, params: Dict[str, Any], offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Fetch [offset, offset + limit), following up if the server caps the page lower."""
+        features: List[Dict[str, Any]] = []
+        while len(features) < limit:
+            page, metadata = await self._query_features({
+                **params,
+                'resultOffset': offset + len(features),
+                'resultRecordCount': limit - len(features),
+            })
+            features.extend(page)
+            if not page or not metadata.get('exceededTransferLimit'):
+                break
+        return features
+
+    async def iter_features(
+        self,
+        where: str,
+        out_fields: str = '*',
+        return_geometry: bool = False,
+        order_by: str = 'OBJECTID',
+        **extra: Any
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every matching feature in order, paging concurrently once the total count is known.
+
+        At most `concurrency` pages are fetched ahead of the consumer, so
+        memory stays bounded by the page size however large the result is.
+        Extra keyword arguments are passed through as query parameters (e.g. outSR).
+        """
+        total = await self.count(where)
+        if total == 0:
+            return
+
+        params = {
+            'where': where,
+            'outFields': out_fields,
+            'returnGeometry': 'true' if return_geometry else 'false',
+            'orderByFields': order_by,
+            **extra,
+        }
+        offsets = iter(range(0, total, self.page_size))
+        pending: List["asyncio.Task"] = []
+
+        def schedule() -> None:
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(asyncio.ensure_future(self._fetch_window(params, offset, self.page_size)))
+
+        try:
+            for _ in range(self.concurrency):
+                schedule()
+            while pending:
+                page = await pending.pop(0)
+                schedule()
+                for feature in page:
+                    yield feature
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def features(
+        self,
+        where: str,
+        out_fields: str = '*',
+        return_geometry: bool = False,
+        order_by: str = 'OBJECTID',
+        **extra: Any
+    ) -> List[Dict[str, Any]]:
+        """Fetch every matching feature as a list; see iter_features."""
+        return [
+            feature async for feature in
+            self.iter_features(where, out_fields, return_geometry, order_by, **extra)
+        ]
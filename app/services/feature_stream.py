@@ -0,0 +1,87 @@
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+import ijson
+
+from app.core.exceptions import ArcGISUploadError
+
+# Where the feature arrays sit in the responses we stream
+QUERY_FEATURES = "features"
+GENERATE_FEATURES = "featureCollection.layers.item.featureSet.features"
+
+_SCALAR_EVENTS = {"boolean", "number", "string", "null"}
+
+
+class FeatureStreamDecoder:
+    """
+    Incrementally decodes Esri JSON features out of a response body.
+
+    Chunks are fed as they arrive and each feature is returned as soon as
+    its closing brace is parsed, so neither the raw body nor the full
+    feature list is ever held in memory. Top-level scalars (count,
+    exceededTransferLimit) and an ArcGIS `error` object are kept in
+    `metadata`.
+    """
+
+    def __init__(self, features_prefix: str = QUERY_FEATURES):
+        self.item_prefix = f"{features_prefix}.item"
+        self.metadata: Dict[str, Any] = {}
+        self._events = ijson.sendable_list()
+        self._parser = ijson.parse_coro(self._events, use_float=True)
+        self._builder = None
+        self._builder_prefix = None
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        self._parser.send(chunk)
+        return self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        features = []
+        for prefix, event, value in self._events:
+            if self._builder is not None:
+                self._builder.event(event, value)
+                if prefix == self._builder_prefix and event == "end_map":
+                    if prefix == self.item_prefix:
+                        features.append(self._builder.value)
+                    else:
+                        self.metadata[prefix] = self._builder.value
+                    self._builder = None
+            elif event == "start_map" and prefix in (self.item_prefix, "error"):
+                self._builder = ijson.ObjectBuilder()
+                self._builder_prefix = prefix
+                self._builder.event(event, value)
+            elif event in _SCALAR_EVENTS and "." not in prefix and prefix:
+                self.metadata[prefix] = value
+        del self._events[:]
+        return features
+
+    def raise_for_error(self, action: str) -> None:
+        error = self.metadata.get("error")
+        if error is not None:
+            raise ArcGISUploadError(f"{action} failed: {error.get('message', str(error))}")
+
+
+async def iter_response_features(
+    response: httpx.Response,
+    decoder: FeatureStreamDecoder,
+    action: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield features from a streamed response; raises on HTTP or ArcGIS errors."""
+    if not response.is_success:
+        await response.aread()
+        raise ArcGISUploadError(f"{action} failed: {response.status_code} {response.text}")
+
+    try:
+        async for chunk in response.aiter_bytes():
+            for feature in decoder.feed(chunk):
+                yield feature
+        for feature in decoder.close():
+            yield feature
+    except ijson.JSONError as e:
+        raise ArcGISUploadError(f"{action} failed: invalid JSON response ({e})")
+
+    decoder.raise_for_error(action)
@@ -0,0 +1,183 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.cloud.firestore_v1.async_transaction import async_transactional
+
+from app.core.firebase import get_async_firestore_client, get_firestore_client
+from app.models.user import UserInDB
+from app.services.user_repository import Revocations, UserRepository, UsernameTakenError, normalize_username
+
+USERS_COLLECTION = 'users'
+USERNAMES_COLLECTION = 'usernames'
+REVOCATIONS_COLLECTION = 'revocations'
+
+
+def _to_user(user_id: str, user_data: Dict[str, Any]) -> UserInDB:
+    user_data = dict(user_data)
+    user_data['id'] = user_id
+
+    # Convert Firestore Timestamp to datetime if needed
+    if 'created_at' in user_data and hasattr(user_data['created_at'], 'seconds'):
+        user_data['created_at'] = datetime.fromtimestamp(user_data['created_at'].seconds)
+
+    return UserInDB(**user_data)
+
+
+class FirestoreUserRepository(UserRepository):
+    """
+    User documents on Firestore's async client.
+
+    The client is shared process-wide, so every request reuses the same
+    gRPC channel instead of opening its own connection.
+
+    `usernames/{normalized username}` holds `{'user_id': ...}`, so finding
+    a user by username is a document get rather than a query. The index
+    and the user are written in one transaction, which is also what keeps
+    usernames unique. Users created before the index are found with the
+    old exact-case query once and indexed on the way out;
+    `backfill_username_index` indexes them all up front so they can log
+    in with any casing. Legacy users whose names differ only by case are
+    left to the exact-case query, which wins over the index on a clash.
+    """
+
+    def __init__(self, client: Any = None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_async_firestore_client()
+
+    @property
+    def users(self):
+        return self.client.collection(USERS_COLLECTION)
+
+    @property
+    def usernames(self):
+        return self.client.collection(USERNAMES_COLLECTION)
+
+    async def get_by_id(self, user_id: str) -> Optional[UserInDB]:
+        doc = await self.users.document(user_id).get()
+        return _to_user(doc.id, doc.to_dict()) if doc.exists else None
+
+    async def get_by_username(self, gis_auth_username: str) -> Optional[UserInDB]:
+        entry = await self.usernames.document(normalize_username(gis_auth_username)).get()
+        if not entry.exists:
+            return await self._get_unindexed(gis_auth_username)
+
+        user = await self.get_by_id(entry.to_dict()['user_id'])
+        if user is None or user.gis_auth_username.strip() == gis_auth_username.strip():
+            return user
+        # Another casing: a legacy user with exactly this name owns it
+        return await self._get_exact(gis_auth_username) or user
+
+    async def _get_exact(self, gis_auth_username: str) -> Optional[UserInDB]:
+        query = self.users.where('gis_auth_username', '==', gis_auth_username.strip()).limit(1)
+        async for doc in query.stream():
+            return _to_user(doc.id, doc.to_dict())
+        return None
+
+    async def _get_unindexed(self, gis_auth_username: str) -> Optional[UserInDB]:
+        user = await self._get_exact(gis_auth_username)
+        if user is not None:
+            await self.usernames.document(normalize_username(gis_auth_username)).set({'user_id': user.id})
+        return user
+
+    async def backfill_username_index(self) -> Dict[str, List[str]]:
+        """
+        Index every user that is not indexed yet; returns the clashes.
+
+        A one-off migration for users created before the index. Usernames
+        that normalize to the same key are not indexed; they are returned
+        as {key: [user IDs]} so they can be renamed by hand.
+        """
+        ids_by_key: Dict[str, List[str]] = {}
+        async for doc in self.users.stream():
+            key = normalize_username(doc.to_dict()['gis_auth_username'])
+            ids_by_key.setdefault(key, []).append(doc.id)
+
+        collisions: Dict[str, List[str]] = {}
+        for key, user_ids in ids_by_key.items():
+            if len(user_ids) > 1:
+                collisions[key] = sorted(user_ids)
+                continue
+            index_ref = self.usernames.document(key)
+            if not (await index_ref.get()).exists:
+                await index_ref.set({'user_id': user_ids[0]})
+        return collisions
+
+    async def create(self, user_id: str, user_data: Dict[str, Any]) -> UserInDB:
+        """Write the user and its username index entry; raises UsernameTakenError if the name is indexed."""
+        await _create_user(
+            self.client.transaction(),
+            self.usernames.document(normalize_username(user_data['gis_auth_username'])),
+            self.users.document(user_id),
+            user_data
+        )
+        return _to_user(user_id, user_data)
+
+    async def update(self, user_id: str, fields: Dict[str, Any]) -> None:
+        await self.users.document(user_id).update(fields)
+
+    @staticmethod
+    def _revocations():
+        # Called from worker threads, so this uses the sync client
+        return get_firestore_client().collection(REVOCATIONS_COLLECTION)
+
+    def load_revocations(self) -> Revocations:
+        """Every unexpired revocation; expired token entries are deleted on the way."""
+        now = time.time()
+        users: Dict[str, float] = {}
+        tokens: Dict[str, float] = {}
+        expired = []
+        for doc in self._revocations().stream():
+            entry = doc.to_dict()
+            if entry.get('kind') == 'user':
+                users[entry['user_id']] = entry['revoked_at']
+            elif entry.get('expires_at', 0) > now:
+                tokens[doc.id] = entry['expires_at']
+            else:
+                expired.append(doc.reference)
+        self._delete(expired)
+        return users, tokens
+
+    def store_revocation(self, kind: str, key: str, value: float) -> None:
+        if kind == 'user':
+            self._revocations().document(f"user:{key}").set({'kind': 'user', 'user_id': key, 'revoked_at': value})
+        else:
+            self._revocations().document(key).set({'kind': 'token', 'expires_at': value})
+            expired = self._revocations().where('expires_at', '<=', time.time()).stream()
+            self._delete(doc.reference for doc in expired)
+
+    @staticmethod
+    def _delete(refs: Iterable[Any]) -> None:
+        # A write batch holds at most 500 operations
+        client = get_firestore_client()
+        batch, pending = client.batch(), 0
+        for ref in refs:
+            batch.delete(ref)
+            pending += 1
+            if pending == 500:
+                batch.commit()
+                batch, pending = client.batch(), 0
+        if pending:
+            batch.commit()
+
+
+@async_transactional
+async def _create_user(transaction, index_ref, user_ref, user_data: Dict[str, Any]) -> None:
+    entry = await index_ref.get(transaction=transaction)
+    if entry.exists:
+        raise UsernameTakenError("User with this GIS Auth Username already exists")
+    transaction.set(user_ref, user_data)
+    transaction.set(index_ref, {'user_id': user_ref.id})
+
+
+if __name__ == "__main__":
+    # One-off: python -m app.services.firestore_user_repository
+    import asyncio
+
+    clashes = asyncio.run(FirestoreUserRepository().backfill_username_index())
+    for key, user_ids in sorted(clashes.items()):
+        print(f"{key}: {', '.join(user_ids)}")
+    print(f"Username index backfilled; {len(clashes)} case clash(es) left to the exact-case lookup")
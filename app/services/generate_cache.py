@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, Optional
+
+from app.core.config import settings
+from app.services.payload import dumps
+
+_CHUNK = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def generate_cache_key(zip_path: Path, params: Dict[str, Any], content_hash: Optional[str] = None) -> str:
+    """
+    sha256 over the ZIP's sha256 and the canonical JSON of the generate parameters.
+
+    Pass `content_hash` when the ZIP's sha256 is already known (e.g. from
+    saving the upload) to skip reading the file again.
+    """
+    digest = hashlib.sha256()
+    digest.update((content_hash or file_sha256(zip_path)).encode('ascii'))
+    digest.update(b'\0')
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class GenerateCache:
+    """
+    On-disk cache of features/generate results, one JSON-lines file per key.
+
+    Entries expire `ttl` seconds after they were written, and the oldest
+    ones are evicted whenever the directory grows past `max_bytes`. Writers
+    fill a temporary file and rename it into place, so readers only ever
+    see complete entries.
+    """
+
+    def __init__(self, directory: str = None, ttl: float = None, max_bytes: int = None):
+        self.directory = Path(directory or settings.GENERATE_CACHE_DIR)
+        self.ttl = settings.GENERATE_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = settings.GENERATE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.jsonl"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Path of a fresh entry, or None on a miss."""
+        path = self._path(key)
+        try:
+            fresh = time.time() - path.stat().st_mtime <= self.ttl
+        except FileNotFoundError:
+            fresh = False
+        if not fresh:
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    @staticmethod
+    def read(path: Path) -> Iterator[Dict[str, Any]]:
+        """Features of an entry, in the order they were written."""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def writer(self, key: str) -> "GenerateCacheWriter":
+        return GenerateCacheWriter(self, key)
+
+    def _commit(self, temp: Path, key: str) -> None:
+        os.replace(temp, self._path(key))
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the oldest ones until under `max_bytes`; returns how many."""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.jsonl"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.directory.glob("*.jsonl"))
+        return {
+            "entries": len(files),
+            "bytes": sum(path.stat().st_size for path in files if path.exists()),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class GenerateCacheWriter:
+    """Streams features into a new cache entry; nothing is stored unless `commit` is reached."""
+
+    def __init__(self, cache: GenerateCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.temp = cache.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        self._file: IO[str] = open(self.temp, 'w', encoding='utf-8')
+
+    def write(self, feature: Dict[str, Any]) -> None:
+        self._file.write(dumps(feature))
+        self._file.write('\n')
+
+    def commit(self) -> None:
+        self._file.close()
+        self.cache._commit(self.temp, self.key)
+
+    def discard(self) -> None:
+        self._file.close()
+        self.temp.unlink(missing_ok=True)
+
+
+_cache: Optional[GenerateCache] = None
+
+
+def get_generate_cache() -> Optional[GenerateCache]:
+    """Get the shared cache, creating it on first use; None when disabled."""
+    global _cache
+
+    if _cache is None and settings.GENERATE_CACHE_ENABLED:
+        _cache = GenerateCache()
+
+    return _cache
+
+
+def set_generate_cache(cache: Optional[GenerateCache]) -> None:
+    """Replace the shared cache (used by tests to point at a temporary directory)."""
+    global _cache
+    _cache = cache
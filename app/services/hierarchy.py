@@ -0,0 +1,71 @@
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+HIERARCHY_FIELDS = 'Region,District,Petak,SPKNumber,Activity'
+
+
+class VendorHierarchy:
+    """
+    In-memory Region -> District -> Petak -> SPK tree for one vendor.
+
+    Built from the distinct (Region, District, Petak, SPKNumber, Activity)
+    rows of the dashboard layer so every cascade lookup is a dict access.
+    Each level is indexed on its own, like the live queries: a row with no
+    Region still lists its Petak under its District, and so on.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self._regions: Set[str] = set()
+        self._districts_by_region: Dict[str, Set[str]] = {}
+        # Petak and SPK lookups are keyed by district / petak alone, like the live queries
+        self._petaks_by_district: Dict[str, Set[str]] = {}
+        self._spks_by_petak: Dict[str, Set[Tuple[str, str]]] = {}
+
+        for row in rows:
+            region, district, petak = row.get('Region'), row.get('District'), row.get('Petak')
+
+            if region:
+                self._regions.add(region)
+                if district:
+                    self._districts_by_region.setdefault(region, set()).add(district)
+            if district and petak:
+                self._petaks_by_district.setdefault(district, set()).add(petak)
+            if petak and row.get('SPKNumber'):
+                self._spks_by_petak.setdefault(petak, set()).add((row['SPKNumber'], row.get('Activity') or ''))
+
+    def regions(self) -> List[str]:
+        return sorted(self._regions)
+
+    def districts(self, region: str) -> List[str]:
+        return sorted(self._districts_by_region.get(region, ()))
+
+    def petaks(self, district: str) -> List[str]:
+        return sorted(self._petaks_by_district.get(district, ()))
+
+    def spk_numbers(self, petak: str) -> List[Dict[str, str]]:
+        return self._spk_items(self._spks_by_petak.get(petak, ()))
+
+    @staticmethod
+    def _spk_items(spks: Iterable[Tuple[str, str]]) -> List[Dict[str, str]]:
+        return [
+            {'spk_number': spk, 'activity': activity}
+            for spk, activity in sorted(spks)
+        ]
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        """Nested representation of the full cascade for the frontend."""
+        return [
+            {
+                'region': region,
+                'districts': [
+                    {
+                        'district': district,
+                        'petaks': [
+                            {'petak': petak, 'spk_numbers': self.spk_numbers(petak)}
+                            for petak in self.petaks(district)
+                        ]
+                    }
+                    for district in self.districts(region)
+                ]
+            }
+            for region in self.regions()
+        ]
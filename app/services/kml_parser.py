@@ -1,16 +1,20 @@
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import List, Dict, Any
-import geopandas as gpd
-import pandas as pd
-from shapely.geometry import LineString
+from typing import TYPE_CHECKING, List, Dict, Any
 
 from app.core.exceptions import FileProcessingError
 
+if TYPE_CHECKING:
+    import geopandas as gpd
+
 
 class KMLParser:
     @staticmethod
-    def parse_kmls(folder: Path) -> gpd.GeoDataFrame:
+    def parse_kmls(folder: Path) -> 'gpd.GeoDataFrame':
+        import geopandas as gpd
+        import pandas as pd
+        from shapely.geometry import LineString
+
         try:
             records = []
             kml_files = list(folder.rglob('*.kml'))
@@ -66,7 +70,7 @@ class KMLParser:
             raise FileProcessingError(f"KML parsing failed: {str(e)}")
 
     @staticmethod
-    def extract_kml_metadata(gdf: gpd.GeoDataFrame) -> Dict[str, Any]:
+    def extract_kml_metadata(gdf: 'gpd.GeoDataFrame') -> Dict[str, Any]:
         return {
             "total_zones": len(gdf),
             "columns": gdf.columns.tolist(),
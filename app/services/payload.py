@@ -0,0 +1,74 @@
+import gzip
+import json
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlencode
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+
+
+def dumps(obj: Any) -> str:
+    """Serialize to compact JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def quantize_paths(paths: List[List[List[float]]], precision: int) -> List[List[List[float]]]:
+    return [[[round(c, precision) for c in point] for point in path] for path in paths]
+
+
+def quantize_features(features: List[Dict[str, Any]], precision: int) -> List[Dict[str, Any]]:
+    """Round polyline/polygon coordinates to `precision` decimals in place."""
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        for key in ("paths", "rings"):
+            if key in geometry:
+                geometry[key] = quantize_paths(geometry[key], precision)
+    return features
+
+
+def encode_form(payload: Dict[str, str], compress: bool, level: int = 6) -> Tuple[bytes, Dict[str, str], int]:
+    """
+    Form-encode an applyEdits payload, optionally gzip-compressing the body.
+
+    Returns (body, headers, raw_size) so callers can report both sizes.
+    """
+    body = urlencode(payload).encode('ascii')
+    headers = {"Content-Type": FORM_CONTENT_TYPE}
+    raw_size = len(body)
+
+    if compress:
+        body = gzip.compress(body, compresslevel=level)
+        headers["Content-Encoding"] = "gzip"
+
+    return body, headers, raw_size
+
+
+class PayloadStats:
+    """Running totals of request body sizes for one upload."""
+
+    def __init__(self, precision: int, gzip_enabled: bool):
+        self.precision = precision
+        self.gzip = gzip_enabled
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.requests = 0
+
+    def record(self, raw_size: int, sent_size: int) -> None:
+        self.raw_bytes += raw_size
+        self.sent_bytes += sent_size
+        self.requests += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.sent_bytes,
+            "requests": self.requests,
+            "gzip": self.gzip,
+            "coordinate_precision": self.precision,
+        }
@@ -1,18 +1,20 @@
+import struct
 import zipfile
 import shutil
 from pathlib import Path
-from typing import Optional
-import pandas as pd
-import geopandas as gpd
-from openpyxl import load_workbook
+from typing import TYPE_CHECKING, List, Optional
 
 from app.core.config import settings
 from app.core.exceptions import FileProcessingError
 
+if TYPE_CHECKING:
+    import geopandas as gpd
+    import pandas as pd
+
 
 class ShapefileService:
     @staticmethod
-    def create_shapefile_for_edit(gdf: gpd.GeoDataFrame, spk_number: str, work_dir: Path) -> Path:
+    def create_shapefile_for_edit(gdf: 'gpd.GeoDataFrame', spk_number: str, work_dir: Path) -> Path:
         try:
             shp_path = work_dir / f"{spk_number}_zones.shp"
             gdf.to_file(shp_path, driver='ESRI Shapefile')
@@ -31,7 +33,10 @@ class ShapefileService:
             raise FileProcessingError(f"Shapefile creation failed: {str(e)}")
 
     @staticmethod
-    def process_excel(excel_path: Path, merged_gdf: gpd.GeoDataFrame, spk_number: str, key_id: str) -> pd.DataFrame:
+    def process_excel(excel_path: Path, merged_gdf: 'gpd.GeoDataFrame', spk_number: str, key_id: str) -> 'pd.DataFrame':
+        import pandas as pd
+        from openpyxl import load_workbook
+
         try:
             # Load and modify Excel
             wb = load_workbook(excel_path)
@@ -81,8 +86,8 @@ class ShapefileService:
 
     @staticmethod
     def create_final_shapefile(
-        gdf: gpd.GeoDataFrame,
-        df_summary: pd.DataFrame,
+        gdf: 'gpd.GeoDataFrame',
+        df_summary: 'pd.DataFrame',
         spk_number: str,
         work_dir: Path
     ) -> Path:
@@ -138,7 +143,9 @@ class ShapefileService:
             raise FileProcessingError(f"Final shapefile creation failed: {str(e)}")
 
     @staticmethod
-    def load_shapefile_from_zip(zip_path: Path, work_dir: Path) -> gpd.GeoDataFrame:
+    def load_shapefile_from_zip(zip_path: Path, work_dir: Path) -> 'gpd.GeoDataFrame':
+        import geopandas as gpd
+
         try:
             extract_dir = work_dir / "extracted_shp"
             if extract_dir.exists():
@@ -156,3 +163,50 @@ class ShapefileService:
 
         except Exception as e:
             raise FileProcessingError(f"Failed to load shapefile from ZIP: {str(e)}")
+
+    @staticmethod
+    def count_features(zip_path: Path) -> int:
+        """Record count from the shapefile's .dbf header, read without extracting the ZIP."""
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as z:
+                dbf_files = [name for name in z.namelist() if name.lower().endswith('.dbf')]
+                if not dbf_files:
+                    raise FileProcessingError("No shapefile found in the uploaded ZIP")
+                with z.open(dbf_files[0]) as f:
+                    header = f.read(8)
+            return struct.unpack('<I', header[4:8])[0]
+
+        except FileProcessingError:
+            raise
+        except Exception as e:
+            raise FileProcessingError(f"Failed to read shapefile from ZIP: {str(e)}")
+
+    @staticmethod
+    def partition_shapefile_zip(zip_path: Path, work_dir: Path, size: int) -> List[Path]:
+        """Split a shapefile ZIP into ZIPs of at most `size` features each, in the original order."""
+        gdf = ShapefileService.load_shapefile_from_zip(zip_path, work_dir)
+
+        try:
+            parts_dir = work_dir / "parts"
+            if parts_dir.exists():
+                shutil.rmtree(parts_dir)
+
+            parts = []
+            for i, start in enumerate(range(0, len(gdf), size)):
+                out_dir = parts_dir / str(i)
+                out_dir.mkdir(parents=True)
+                part_shp = out_dir / "part.shp"
+                gdf.iloc[start:start + size].to_file(part_shp, driver="ESRI Shapefile", encoding="utf-8")
+
+                part_zip = parts_dir / f"part_{i}.zip"
+                with zipfile.ZipFile(part_zip, 'w', zipfile.ZIP_DEFLATED) as zout:
+                    for ext in ['shp', 'shx', 'dbf', 'prj', 'cpg']:
+                        p = part_shp.with_suffix(f'.{ext}')
+                        if p.exists():
+                            zout.write(p, p.name)
+                parts.append(part_zip)
+
+            return parts
+
+        except Exception as e:
+            raise FileProcessingError(f"Shapefile partitioning failed: {str(e)}")
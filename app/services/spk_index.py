@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spk_objects (
+    layer TEXT NOT NULL,
+    spk TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    PRIMARY KEY (layer, spk, object_id)
+);
+CREATE TABLE IF NOT EXISTS spk_state (
+    layer TEXT NOT NULL,
+    spk TEXT NOT NULL,
+    reconciled_at REAL NOT NULL,
+    PRIMARY KEY (layer, spk)
+);
+"""
+
+
+class SPKIndex:
+    """
+    Persistent SPKNumber -> OBJECTID index kept in a local SQLite file.
+
+    An SPK's entry is authoritative once its full OBJECTID set has been
+    reconciled against the server (a live query, or a replace upload that
+    deleted everything first). Adds and deletes made through this service
+    keep it current in between; entries older than `max_age` are treated as
+    unknown, since other clients may edit the layer too.
+    """
+
+    def __init__(self, path: str = None, max_age: float = None):
+        self.path = Path(path or settings.SPK_INDEX_PATH)
+        self.max_age = settings.SPK_INDEX_MAX_AGE if max_age is None else max_age
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _reconciled_at(self, layer: str, spk: str) -> Optional[float]:
+        row = self._conn.execute(
+            "SELECT reconciled_at FROM spk_state WHERE layer = ? AND spk = ?", (layer, spk)
+        ).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, layer: str, spk: str) -> Optional[List[int]]:
+        """OBJECTIDs for a fresh SPK entry, or None when the server must be asked."""
+        with self._lock:
+            reconciled_at = self._reconciled_at(layer, spk)
+            if reconciled_at is None or time.time() - reconciled_at > self.max_age:
+                return None
+            rows = self._conn.execute(
+                "SELECT object_id FROM spk_objects WHERE layer = ? AND spk = ? ORDER BY object_id", (layer, spk)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def reconcile(self, layer: str, spk: str, object_ids: Iterable[int]) -> None:
+        """Replace an SPK's OBJECTID set with the authoritative one and mark it fresh."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM spk_objects WHERE layer = ? AND spk = ?", (layer, spk))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO spk_objects (layer, spk, object_id) VALUES (?, ?, ?)",
+                    [(layer, spk, oid) for oid in object_ids]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO spk_state (layer, spk, reconciled_at) VALUES (?, ?, ?)",
+                    (layer, spk, time.time())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add(self, layer: str, spk: str, object_ids: Iterable[int]) -> None:
+        """Record OBJECTIDs returned in addResults."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO spk_objects (layer, spk, object_id) VALUES (?, ?, ?)",
+                [(layer, spk, oid) for oid in object_ids]
+            )
+
+    def remove(self, layer: str, spk: str, object_ids: Iterable[int]) -> None:
+        """Forget OBJECTIDs confirmed deleted in deleteResults."""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM spk_objects WHERE layer = ? AND spk = ? AND object_id = ?",
+                [(layer, spk, oid) for oid in object_ids]
+            )
+
+    def invalidate(self, layer: str, spk: str) -> None:
+        """Mark an SPK unknown, e.g. after an edit whose outcome is unclear."""
+        with self._lock:
+            self._conn.execute("DELETE FROM spk_state WHERE layer = ? AND spk = ?", (layer, spk))
+
+    def stale(self, layer: str, older_than: float, limit: int) -> List[str]:
+        """SPKs reconciled more than `older_than` seconds ago, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT spk FROM spk_state WHERE layer = ? AND reconciled_at < ? ORDER BY reconciled_at LIMIT ?",
+                (layer, time.time() - older_than, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+_index: Optional[SPKIndex] = None
+
+
+def get_spk_index() -> Optional[SPKIndex]:
+    """Get the shared index, opening it on first use; None when disabled."""
+    global _index
+
+    if _index is None and settings.SPK_INDEX_ENABLED:
+        _index = SPKIndex()
+
+    return _index
+
+
+def set_spk_index(index: Optional[SPKIndex]) -> None:
+    """Replace the shared index (used by tests to point at a temporary file)."""
+    global _index
+    _index = index
+
+
+def close_spk_index() -> None:
+    """Close the shared index, if it was opened."""
+    global _index
+
+    if _index is not None:
+        _index.close()
+    _index = None
@@ -0,0 +1,145 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.payload import dumps, quantize_paths
+
+# Attributes that define a flight zone's content; bookkeeping fields such as
+# ProcessedDate and CRT_Date change on every run and are not compared
+SYNC_COMPARED_FIELDS = [
+    "FlightID", "DroneID", "DroneCapacity", "SPKNumber", "KeyID",
+    "StartFlight", "EndFlight", "Height", "Width", "Speed",
+    "TaskArea", "SprayAmount", "VendorName", "UserID",
+]
+SYNC_OUT_FIELDS = ",".join(["OBJECTID"] + SYNC_COMPARED_FIELDS)
+# Compared separately: build_adds fills these with the current time when the
+# input has none, and such a placeholder must not count as a change
+SYNC_TIME_FIELDS = ["StartFlight", "EndFlight"]
+_HASHED_FIELDS = [field for field in SYNC_COMPARED_FIELDS if field not in SYNC_TIME_FIELDS]
+
+
+class SyncPlan:
+    def __init__(self):
+        self.adds: List[Dict[str, Any]] = []
+        self.updates: List[Dict[str, Any]] = []
+        self.deletes: List[int] = []
+        self.unchanged: List[str] = []
+        # FlightID -> (OBJECTID, attribute hash, flight times, geometry hash) of the live features
+        self.existing: Dict[Any, Tuple[int, str, Tuple[Any, ...], str]] = {}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "adds": [f["attributes"].get("FlightID") for f in self.adds],
+            "updates": [
+                {"flight_id": f["attributes"].get("FlightID"), "objectId": f["attributes"]["OBJECTID"]}
+                for f in self.updates
+            ],
+            "deletes": list(self.deletes),
+            "unchanged": len(self.unchanged),
+        }
+
+
+class SPKSyncPlanner:
+    """
+    Computes the minimal applyEdits diff between an SPK's live features and new zones.
+
+    Features are matched by FlightID and compared by attribute and geometry
+    hashes; only new, changed and vanished flights produce edits. Flight
+    times the input did not provide are neither compared nor overwritten.
+    """
+
+    def __init__(self, precision: int):
+        self.precision = precision
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float)):
+            return round(float(value), 6)
+        if isinstance(value, str):
+            return value.strip()
+        return value
+
+    def attribute_hash(self, attributes: Dict[str, Any]) -> str:
+        normalized = [self._normalize(attributes.get(field)) for field in _HASHED_FIELDS]
+        return hashlib.sha1(dumps(normalized).encode('utf-8')).hexdigest()
+
+    def flight_times(self, attributes: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(self._normalize(attributes.get(field)) for field in SYNC_TIME_FIELDS)
+
+    def geometry_hash(self, geometry: Dict[str, Any]) -> str:
+        geometry = geometry or {}
+        paths = geometry.get("paths") or geometry.get("rings") or []
+        return hashlib.sha1(dumps(quantize_paths(paths, self.precision)).encode('utf-8')).hexdigest()
+
+    def add_existing(self, plan: SyncPlan, feature: Dict[str, Any]) -> None:
+        """Index one live feature by hashes only, so existing geometry need not be kept."""
+        attributes = feature.get("attributes", {})
+        flight_id = attributes.get("FlightID")
+        if flight_id in plan.existing or flight_id is None:
+            # Duplicate or unkeyed rows can never be matched; drop them
+            plan.deletes.append(attributes["OBJECTID"])
+        else:
+            plan.existing[flight_id] = (
+                attributes["OBJECTID"],
+                self.attribute_hash(attributes),
+                self.flight_times(attributes),
+                self.geometry_hash(feature.get("geometry")),
+            )
+
+    def diff(
+        self,
+        plan: SyncPlan,
+        new_features: List[Dict[str, Any]],
+        unparsed_times: Optional[Dict[Any, Set[str]]] = None
+    ) -> SyncPlan:
+        """
+        Classify new features against the indexed live ones; unmatched live rows are deleted.
+
+        `unparsed_times` maps a FlightID to the time fields that hold a
+        placeholder rather than input (see ArcGISService.unparsed_flight_times).
+        """
+        unparsed_times = unparsed_times or {}
+        remaining = dict(plan.existing)
+        for feature in new_features:
+            flight_id = feature["attributes"].get("FlightID")
+            current = remaining.pop(flight_id, None)
+            if current is None:
+                plan.adds.append(feature)
+                continue
+
+            object_id, attribute_hash, flight_times, geometry_hash = current
+            placeholders = unparsed_times.get(flight_id, ())
+            same_attributes = attribute_hash == self.attribute_hash(feature["attributes"]) and all(
+                old == new
+                for field, old, new in zip(SYNC_TIME_FIELDS, flight_times, self.flight_times(feature["attributes"]))
+                if field not in placeholders
+            )
+            same_geometry = geometry_hash == self.geometry_hash(feature.get("geometry"))
+            if same_attributes and same_geometry:
+                plan.unchanged.append(flight_id)
+                continue
+
+            # Keep the creation date and any live flight time the input did not replace
+            attributes = {
+                k: v for k, v in feature["attributes"].items() if k != "CRT_Date" and k not in placeholders
+            }
+            attributes["OBJECTID"] = object_id
+            update = {"attributes": attributes}
+            if not same_geometry:
+                update["geometry"] = feature["geometry"]
+            plan.updates.append(update)
+
+        plan.deletes.extend(object_id for object_id, _, _, _ in remaining.values())
+        return plan
+
+    def plan(
+        self,
+        existing: List[Dict[str, Any]],
+        new_features: List[Dict[str, Any]],
+        unparsed_times: Optional[Dict[Any, Set[str]]] = None
+    ) -> SyncPlan:
+        plan = SyncPlan()
+        for feature in existing:
+            self.add_existing(plan, feature)
+        return self.diff(plan, new_features, unparsed_times)
@@ -0,0 +1,136 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.models.user import UserInDB
+from app.services.user_repository import Revocations, UserRepository, UsernameTakenError, normalize_username
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username_key TEXT NOT NULL UNIQUE,
+    gis_auth_username TEXT NOT NULL,
+    full_name TEXT,
+    hashed_gis_auth_password TEXT NOT NULL,
+    is_active INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revocations (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+_FIELDS = ('gis_auth_username', 'full_name', 'hashed_gis_auth_password', 'is_active', 'created_at')
+_COLUMNS = "id, " + ", ".join(_FIELDS)
+
+
+def _to_row(fields: Dict[str, Any]) -> Dict[str, Any]:
+    row = {name: fields[name] for name in _FIELDS if name in fields}
+    if 'gis_auth_username' in row:
+        row['username_key'] = normalize_username(row['gis_auth_username'])
+    if 'is_active' in row:
+        row['is_active'] = int(row['is_active'])
+    if isinstance(row.get('created_at'), datetime):
+        row['created_at'] = row['created_at'].isoformat()
+    return row
+
+
+def _to_user(row) -> UserInDB:
+    user_id, gis_auth_username, full_name, hashed, is_active, created_at = row
+    return UserInDB(
+        id=user_id,
+        gis_auth_username=gis_auth_username,
+        full_name=full_name,
+        hashed_gis_auth_password=hashed,
+        is_active=bool(is_active),
+        created_at=datetime.fromisoformat(created_at)
+    )
+
+
+class SQLiteUserRepository(UserRepository):
+    """
+    Users and revocations in a local SQLite file, for single-node installs.
+
+    Needs no Firebase credentials or network; a lookup is an indexed read
+    on a local file. Queries run on a worker thread so a slow disk never
+    blocks the event loop. Only one process should write the file.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or settings.USER_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _fetch_one(self, sql: str, params: tuple) -> Optional[UserInDB]:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return _to_user(row) if row else None
+
+    async def get_by_id(self, user_id: str) -> Optional[UserInDB]:
+        return await asyncio.to_thread(
+            self._fetch_one, f"SELECT {_COLUMNS} FROM users WHERE id = ?", (user_id,)
+        )
+
+    async def get_by_username(self, gis_auth_username: str) -> Optional[UserInDB]:
+        return await asyncio.to_thread(
+            self._fetch_one, f"SELECT {_COLUMNS} FROM users WHERE username_key = ?",
+            (normalize_username(gis_auth_username),)
+        )
+
+    def _insert(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        row = {'id': user_id, **_to_row(user_data)}
+        names = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        try:
+            with self._lock:
+                self._conn.execute(f"INSERT INTO users ({names}) VALUES ({placeholders})", tuple(row.values()))
+        except sqlite3.IntegrityError as e:
+            if 'username_key' in str(e):
+                raise UsernameTakenError("User with this GIS Auth Username already exists") from e
+            raise
+
+    async def create(self, user_id: str, user_data: Dict[str, Any]) -> UserInDB:
+        await asyncio.to_thread(self._insert, user_id, user_data)
+        return await self.get_by_id(user_id)
+
+    def _update(self, user_id: str, fields: Dict[str, Any]) -> None:
+        row = _to_row(fields)
+        if not row:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in row)
+        with self._lock:
+            self._conn.execute(f"UPDATE users SET {assignments} WHERE id = ?", (*row.values(), user_id))
+
+    async def update(self, user_id: str, fields: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._update, user_id, fields)
+
+    def load_revocations(self) -> Revocations:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM revocations WHERE kind = 'token' AND value <= ?", (now,))
+            rows = self._conn.execute("SELECT kind, key, value FROM revocations").fetchall()
+        users = {key: value for kind, key, value in rows if kind == 'user'}
+        tokens = {key: value for kind, key, value in rows if kind == 'token'}
+        return users, tokens
+
+    def store_revocation(self, kind: str, key: str, value: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO revocations (kind, key, value) VALUES (?, ?, ?)", (kind, key, value)
+            )
@@ -0,0 +1,227 @@
+import json
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id TEXT PRIMARY KEY,
+    spk TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batches (
+    upload_id TEXT NOT NULL,
+    batch_index INTEGER NOT NULL,
+    flight_ids TEXT NOT NULL,
+    object_ids TEXT,
+    committed_at REAL,
+    PRIMARY KEY (upload_id, batch_index)
+);
+"""
+
+
+class UploadJournal:
+    """
+    Per-upload checkpoints kept in a local SQLite file.
+
+    Each upload records the stage it reached and every applyEdits batch it
+    sent, with the FlightIDs and returned OBJECTIDs once the server committed
+    it. A copy of the upload ZIP is kept next to the journal until the
+    upload completes, so a resumed upload can rebuild its features without
+    the client sending the file again.
+    """
+
+    def __init__(self, path: str = None, files_dir: str = None, lease: float = None, retention: float = None):
+        self.path = Path(path or settings.UPLOAD_JOURNAL_PATH)
+        self.files_dir = Path(files_dir or settings.UPLOAD_JOURNAL_DIR)
+        self.lease = settings.UPLOAD_JOURNAL_LEASE if lease is None else lease
+        self.retention = settings.UPLOAD_JOURNAL_RETENTION if retention is None else retention
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def zip_path(self, upload_id: str) -> Path:
+        return self.files_dir / f"{upload_id}.zip"
+
+    def create(self, spk: str, key_id: str, mode: str, strategy: str, zip_path: Path) -> str:
+        """Start a journal entry for a new upload, claimed by the caller; returns its upload ID."""
+        self.purge()
+        upload_id = uuid.uuid4().hex
+        shutil.copy(zip_path, self.zip_path(upload_id))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO uploads (upload_id, spk, key_id, mode, strategy, stage, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'received', 'running', ?, ?)",
+                (upload_id, spk, key_id, mode, strategy, now, now)
+            )
+        return upload_id
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """The upload's journal entry with its batch totals, or None if unknown."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()
+            if row is None:
+                return None
+            batches = self._conn.execute(
+                "SELECT flight_ids FROM batches WHERE upload_id = ? AND committed_at IS NOT NULL", (upload_id,)
+            ).fetchall()
+        entry = dict(row)
+        entry["batches_committed"] = len(batches)
+        entry["features_committed"] = sum(len(json.loads(b["flight_ids"])) for b in batches)
+        return entry
+
+    def claim(self, upload_id: str) -> bool:
+        """
+        Mark an upload as running again for a resume.
+
+        Fails while another request holds it, i.e. it is still running and
+        has checkpointed within the lease window.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE uploads SET status = 'running', error = NULL, updated_at = ? "
+                "WHERE upload_id = ? AND status != 'completed' AND (status != 'running' OR updated_at < ?)",
+                (now, upload_id, now - self.lease)
+            )
+        return cursor.rowcount == 1
+
+    def set_stage(self, upload_id: str, stage: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET stage = ?, updated_at = ? WHERE upload_id = ?", (stage, time.time(), upload_id)
+            )
+
+    def complete(self, upload_id: str) -> None:
+        """Mark an upload done and drop its ZIP copy; it can no longer be resumed."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET stage = 'completed', status = 'completed', error = NULL, updated_at = ? "
+                "WHERE upload_id = ?",
+                (time.time(), upload_id)
+            )
+        self.zip_path(upload_id).unlink(missing_ok=True)
+
+    def fail(self, upload_id: str, error: str) -> None:
+        """Release an upload that stopped early so it can be resumed."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET status = 'failed', error = ?, updated_at = ? WHERE upload_id = ?",
+                (error, time.time(), upload_id)
+            )
+
+    def batch_sent(self, upload_id: str, batch_index: int, flight_ids: List[Any]) -> None:
+        """Checkpoint a batch just before it is sent; its outcome is unknown until committed."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batches (upload_id, batch_index, flight_ids) VALUES (?, ?, ?)",
+                (upload_id, batch_index, json.dumps(flight_ids))
+            )
+            self._conn.execute("UPDATE uploads SET updated_at = ? WHERE upload_id = ?", (now, upload_id))
+
+    def batch_committed(self, upload_id: str, batch_index: int, flight_ids: List[Any], object_ids: List[int]) -> None:
+        """Record the FlightIDs the server added in a batch and the OBJECTIDs it returned."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batches (upload_id, batch_index, flight_ids, object_ids, committed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (upload_id, batch_index, json.dumps(flight_ids), json.dumps(object_ids), now)
+            )
+            self._conn.execute("UPDATE uploads SET updated_at = ? WHERE upload_id = ?", (now, upload_id))
+
+    def committed_flight_ids(self, upload_id: str) -> Set[Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT flight_ids FROM batches WHERE upload_id = ? AND committed_at IS NOT NULL", (upload_id,)
+            ).fetchall()
+        return {flight_id for row in rows for flight_id in json.loads(row["flight_ids"])}
+
+    def committed_object_ids(self, upload_id: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT object_ids FROM batches WHERE upload_id = ? AND committed_at IS NOT NULL "
+                "ORDER BY batch_index",
+                (upload_id,)
+            ).fetchall()
+        return [oid for row in rows for oid in json.loads(row["object_ids"])]
+
+    def has_uncommitted_batches(self, upload_id: str) -> bool:
+        """Whether a batch was sent without a recorded answer, so its features may or may not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM batches WHERE upload_id = ? AND committed_at IS NULL LIMIT 1", (upload_id,)
+            ).fetchone()
+        return row is not None
+
+    def next_batch_index(self, upload_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(batch_index) + 1, 0) FROM batches WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+        return row[0]
+
+    def purge(self) -> int:
+        """Forget uploads untouched for longer than the retention period; returns how many."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT upload_id FROM uploads WHERE updated_at < ?", (time.time() - self.retention,)
+            ).fetchall()
+            expired = [(row["upload_id"],) for row in rows]
+            self._conn.executemany("DELETE FROM batches WHERE upload_id = ?", expired)
+            self._conn.executemany("DELETE FROM uploads WHERE upload_id = ?", expired)
+        for (upload_id,) in expired:
+            self.zip_path(upload_id).unlink(missing_ok=True)
+        return len(expired)
+
+
+_journal: Optional[UploadJournal] = None
+
+
+def get_upload_journal() -> UploadJournal:
+    """Get the shared journal, opening it on first use."""
+    global _journal
+
+    if _journal is None:
+        _journal = UploadJournal()
+
+    return _journal
+
+
+def set_upload_journal(journal: Optional[UploadJournal]) -> None:
+    """Replace the shared journal (used by tests to point at a temporary file)."""
+    global _journal
+    _journal = journal
+
+
+def close_upload_journal() -> None:
+    """Close the shared journal, if it was opened."""
+    global _journal
+
+    if _journal is not None:
+        _journal.close()
+    _journal = None
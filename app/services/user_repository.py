@@ -0,0 +1,93 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.user import UserInDB
+
+# (user ID -> revoked_at, token ID -> expires_at), both as epoch seconds
+Revocations = Tuple[Dict[str, float], Dict[str, float]]
+
+
+class UsernameTakenError(ValueError):
+    pass
+
+
+def normalize_username(gis_auth_username: str) -> str:
+    """Key of a username in the index; lookups ignore case and surrounding spaces."""
+    return gis_auth_username.strip().lower()
+
+
+class UserRepository(ABC):
+    """
+    Where users and token revocations are stored.
+
+    `USER_STORE` picks the backend: "firestore" (the default) or "sqlite",
+    an embedded file for single-node and offline installs. Usernames are
+    unique after `normalize_username`; `create` raises UsernameTakenError
+    otherwise. The revocation methods block and are called off the loop.
+    A backend must implement every abstract method to be instantiated.
+    """
+
+    @abstractmethod
+    async def get_by_id(self, user_id: str) -> Optional[UserInDB]:
+        ...
+
+    @abstractmethod
+    async def get_by_username(self, gis_auth_username: str) -> Optional[UserInDB]:
+        ...
+
+    @abstractmethod
+    async def create(self, user_id: str, user_data: Dict[str, Any]) -> UserInDB:
+        ...
+
+    @abstractmethod
+    async def update(self, user_id: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def load_revocations(self) -> Revocations:
+        """Every unexpired revocation."""
+        ...
+
+    @abstractmethod
+    def store_revocation(self, kind: str, key: str, value: float) -> None:
+        """Record a 'user' (key=user ID, value=revoked_at) or 'token' (key=jti, value=expires_at) revocation."""
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+_repository: Optional[UserRepository] = None
+
+
+def get_user_repository() -> UserRepository:
+    """Get the shared repository for USER_STORE, creating it on first use."""
+    global _repository
+
+    if _repository is None:
+        if settings.USER_STORE == 'sqlite':
+            from app.services.sqlite_user_repository import SQLiteUserRepository
+            _repository = SQLiteUserRepository()
+        elif settings.USER_STORE == 'firestore':
+            from app.services.firestore_user_repository import FirestoreUserRepository
+            _repository = FirestoreUserRepository()
+        else:
+            raise ValueError(f"Unknown USER_STORE '{settings.USER_STORE}', expected 'firestore' or 'sqlite'")
+
+    return _repository
+
+
+def set_user_repository(repository: Optional[UserRepository]) -> None:
+    """Replace the shared repository (used by tests to avoid Firestore)."""
+    global _repository
+    _repository = repository
+
+
+def close_user_repository() -> None:
+    """Close the shared repository, if it was opened."""
+    global _repository
+
+    if _repository is not None:
+        _repository.close()
+    _repository = None
@@ -2,67 +2,47 @@ import uuid
 from datetime import datetime
 from typing import Optional
 from app.models.user import UserCreate, UserInDB, User
-from app.core.security import get_password_hash, verify_password
-from app.core.firebase import get_firestore_client
+from app.core.config import settings
+from app.core.security import password_hasher
+from app.services.user_repository import UsernameTakenError, get_user_repository
+from app.utils.cache import TTLCache
 
+# Users by ID, shared by every auth dependency within and across requests
+user_cache = TTLCache(ttl=settings.USER_CACHE_TTL, max_entries=settings.USER_CACHE_MAX_ENTRIES)
 
-class UserService:
-    @staticmethod
-    def _get_users_collection():
-        """Get Firestore users collection reference."""
-        db = get_firestore_client()
-        return db.collection('users')
 
+class UserService:
     @staticmethod
-    def get_user_by_gis_auth_username(gis_auth_username: str) -> Optional[UserInDB]:
+    async def get_user_by_gis_auth_username(gis_auth_username: str) -> Optional[UserInDB]:
         """Get user by GIS auth username."""
         try:
-            users_ref = UserService._get_users_collection()
-            query = users_ref.where('gis_auth_username', '==', gis_auth_username).limit(1)
-            docs = query.stream()
-
-            for doc in docs:
-                user_data = doc.to_dict()
-                user_data['id'] = doc.id
-
-                # Convert Firestore Timestamp to datetime if needed
-                if 'created_at' in user_data and hasattr(user_data['created_at'], 'seconds'):
-                    user_data['created_at'] = datetime.fromtimestamp(user_data['created_at'].seconds)
-
-                return UserInDB(**user_data)
-
-            return None
+            return await get_user_repository().get_by_username(gis_auth_username)
         except Exception as e:
             print(f"Error getting user by username: {e}")
             return None
 
     @staticmethod
-    def get_user_by_id(user_id: str) -> Optional[UserInDB]:
-        """Get user by ID."""
-        try:
-            users_ref = UserService._get_users_collection()
-            doc = users_ref.document(user_id).get()
-
-            if doc.exists:
-                user_data = doc.to_dict()
-                user_data['id'] = doc.id
+    async def get_user_by_id(user_id: str) -> Optional[UserInDB]:
+        """Get user by ID, served from user_cache when possible."""
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
 
-                # Convert Firestore Timestamp to datetime if needed
-                if 'created_at' in user_data and hasattr(user_data['created_at'], 'seconds'):
-                    user_data['created_at'] = datetime.fromtimestamp(user_data['created_at'].seconds)
-
-                return UserInDB(**user_data)
-
-            return None
+        try:
+            user = await get_user_repository().get_by_id(user_id)
         except Exception as e:
             print(f"Error getting user by ID: {e}")
             return None
 
+        if user is not None:
+            user_cache.set(user_id, user)
+        return user
+
     @staticmethod
-    def create_user(user_create: UserCreate) -> UserInDB:
+    async def create_user(user_create: UserCreate) -> UserInDB:
         """Create a new user."""
         # Check if user already exists
-        if UserService.get_user_by_gis_auth_username(user_create.gis_auth_username):
+        if await UserService.get_user_by_gis_auth_username(user_create.gis_auth_username):
             raise ValueError("User with this GIS Auth Username already exists")
 
         # Create new user
@@ -70,46 +50,74 @@ class UserService:
         user_data = {
             "gis_auth_username": user_create.gis_auth_username,
             "full_name": user_create.full_name,
-            "hashed_gis_auth_password": get_password_hash(user_create.gis_auth_password),
+            "hashed_gis_auth_password": await password_hasher.hash(user_create.gis_auth_password),
             "is_active": True,
             "created_at": datetime.utcnow()
         }
 
         try:
-            # Store in Firestore
-            users_ref = UserService._get_users_collection()
-            users_ref.document(user_id).set(user_data)
-
-            # Return UserInDB object
-            user_data['id'] = user_id
-            user_data['created_at'] = user_data['created_at'].isoformat()
-            return UserInDB(**user_data)
+            user = await get_user_repository().create(user_id, user_data)
+            UserService.invalidate_user(user_id)
+            return user
+        except UsernameTakenError:
+            raise
         except Exception as e:
             print(f"Error creating user: {e}")
             raise ValueError(f"Failed to create user: {str(e)}")
 
     @staticmethod
-    def authenticate_user(gis_auth_username: str, gis_auth_password: str) -> Optional[UserInDB]:
-        """Authenticate user with GIS auth credentials."""
-        user = UserService.get_user_by_gis_auth_username(gis_auth_username)
+    def invalidate_user(user_id: str) -> bool:
+        """Drop a cached user; call after every write to that user's document."""
+        return user_cache.delete(user_id)
+
+    @staticmethod
+    def cache_stats() -> dict:
+        return user_cache.stats()
+
+    @staticmethod
+    async def update_password_hash(user_id: str, hashed_password: str) -> None:
+        """Store a new password hash, e.g. after a bcrypt cost change."""
+        await get_user_repository().update(user_id, {"hashed_gis_auth_password": hashed_password})
+        UserService.invalidate_user(user_id)
+
+    @staticmethod
+    async def authenticate_user(gis_auth_username: str, gis_auth_password: str) -> Optional[UserInDB]:
+        """
+        Authenticate user with GIS auth credentials.
+
+        bcrypt runs off the event loop; a hash made with an outdated cost
+        factor is replaced on successful login.
+        """
+        user = await UserService.get_user_by_gis_auth_username(gis_auth_username)
 
         if not user:
             return None
 
-        if not verify_password(gis_auth_password, user.hashed_gis_auth_password):
+        verified, new_hash = await password_hasher.verify_and_update(gis_auth_password, user.hashed_gis_auth_password)
+        if not verified:
             return None
 
+        if new_hash:
+            try:
+                await UserService.update_password_hash(user.id, new_hash)
+            except Exception as e:
+                # The old hash still works; try again on the next login
+                print(f"Error rehashing password: {e}")
+
         return user
 
     @staticmethod
-    def get_user_gis_credentials(user_id: str) -> Optional[dict]:
+    async def get_user_gis_credentials(user_id: str) -> Optional[dict]:
         """Get shared GIS credentials for ArcGIS operations from environment variables."""
-        from app.core.config import settings
-        user = UserService.get_user_by_id(user_id)
+        user = await UserService.get_user_by_id(user_id)
 
         if not user:
             return None
 
+        return UserService.shared_gis_credentials()
+
+    @staticmethod
+    def shared_gis_credentials() -> dict:
         # Return ONLY shared credentials from .env for ArcGIS operations
         # User's GIS_AUTH credentials are only for app authentication, NOT for ArcGIS
         return {
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with a time-to-live and an LRU size bound.
+
+    Entries older than `ttl` seconds are stale; entries older than
+    `ttl + stale_ttl` are expired and dropped on access.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable) -> Tuple[Any, Optional[float]]:
+        """Return (value, age) for a live entry, or (_MISSING, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING, None
+
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age > self.ttl + self.stale_ttl:
+                del self._entries[key]
+                return _MISSING, None
+
+            self._entries.move_to_end(key)
+            return value, age
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a fresh value, or `default` if the key is missing or stale."""
+        value, age = self._lookup(key)
+        if value is _MISSING or age > self.ttl:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._entries.pop(key, _MISSING) is not _MISSING
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches `predicate`; returns the count removed."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+
+class AsyncTTLCache(TTLCache):
+    """
+    TTLCache with async loading and stale-while-revalidate.
+
+    Stale entries are served immediately while a single background task
+    refreshes them; concurrent misses for the same key share one load.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, stale_ttl: float = 0):
+        super().__init__(ttl, max_entries, stale_ttl)
+        self._inflight: Dict[Hashable, "asyncio.Future"] = {}
+        self._refresh_tasks: Set["asyncio.Task"] = set()
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited shared failure is not logged
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                await self._load(key, loader)
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {key!r}: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value, age = self._lookup(key)
+
+        if value is _MISSING:
+            self.misses += 1
+            return await self._load(key, loader)
+
+        if age > self.ttl:
+            self.stale_hits += 1
+            self._refresh_in_background(key, loader)
+        else:
+            self.hits += 1
+        return value
@@ -1,40 +1,134 @@
+import hashlib
 import shutil
 import zipfile
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Callable, Optional, Tuple
 from fastapi import UploadFile
-import tempfile
+from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import settings
-from app.core.exceptions import InvalidFileFormatError
+from app.core.exceptions import InvalidFileFormatError, UploadTooLargeError, WorkspaceQuotaExceededError
+from app.utils.workspace import Workspace, get_workspace_manager
+
+
+def _copy_limited(
+    source: BinaryIO,
+    file_path: Path,
+    limit: int,
+    chunk_size: int,
+    too_large: Callable[[], Exception]
+) -> Tuple[int, str]:
+    """Copy in chunks, raising `too_large()` before any chunk past `limit` is written; returns (size, sha256)."""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, "wb") as f:
+            for chunk in iter(lambda: source.read(chunk_size), b""):
+                size += len(chunk)
+                if size > limit:
+                    raise too_large()
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        file_path.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
 
 
 class FileUtils:
     @staticmethod
     def get_work_dir() -> Path:
-        work_dir = Path(settings.WORK_DIR)
-        if work_dir.exists():
-            shutil.rmtree(work_dir)
-        work_dir.mkdir(parents=True)
-        return work_dir
+        """A new, empty directory of its own; routes use the workspace manager directly for the quota."""
+        return get_workspace_manager().create().path
 
     @staticmethod
-    async def save_upload_file(upload_file: UploadFile, work_dir: Path, filename: Optional[str] = None) -> Path:
+    async def save_upload_file(
+        upload_file: UploadFile,
+        work_dir: Path,
+        filename: Optional[str] = None,
+        workspace: Optional[Workspace] = None
+    ) -> Path:
+        file_path, _ = await FileUtils.persist_upload(upload_file, work_dir, filename, workspace=workspace)
+        return file_path
+
+    @staticmethod
+    async def persist_upload(
+        upload_file: UploadFile,
+        work_dir: Path,
+        filename: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        workspace: Optional[Workspace] = None
+    ) -> Tuple[Path, str]:
+        """
+        Copy an upload to disk in UPLOAD_CHUNK_SIZE pieces on a worker thread.
+
+        Returns the file's path and sha256 hex digest, computed while copying.
+        Stops with UploadTooLargeError (413) as soon as the file passes
+        `max_bytes` (MAX_UPLOAD_SIZE by default), or with
+        WorkspaceQuotaExceededError (413) before it would overrun the
+        workspace's remaining quota, leaving no partial file.
+        """
         if not filename:
             filename = upload_file.filename
 
         file_path = work_dir / filename
-        with open(file_path, "wb") as f:
-            content = await upload_file.read()
-            f.write(content)
+        limit = settings.MAX_UPLOAD_SIZE if max_bytes is None else max_bytes
+        too_large = partial(UploadTooLargeError, limit)
+        if workspace is not None and workspace.remaining() < limit:
+            limit = workspace.remaining()
+            too_large = partial(WorkspaceQuotaExceededError, workspace.quota)
 
-        return file_path
+        await upload_file.seek(0)
+        _, digest = await run_in_threadpool(
+            _copy_limited, upload_file.file, file_path, limit, settings.UPLOAD_CHUNK_SIZE, too_large
+        )
+        return file_path, digest
 
     @staticmethod
-    def extract_zip(zip_path: Path, extract_to: Path) -> Path:
+    def zip_size(zip_path: Path) -> int:
+        """Bytes the archive's members take once extracted, as declared in its directory."""
         try:
             with zipfile.ZipFile(zip_path, 'r') as z:
-                z.extractall(extract_to)
+                return sum(info.file_size for info in z.infolist())
+        except zipfile.BadZipFile:
+            raise InvalidFileFormatError("Invalid ZIP file")
+
+    @staticmethod
+    def extract_zip(zip_path: Path, extract_to: Path, workspace: Optional[Workspace] = None) -> Path:
+        """
+        Extract an archive. With a workspace it is refused up front if its
+        declared size would not fit the quota, and each entry is checked
+        against the remaining quota before it is written, counting the bytes
+        actually inflated rather than trusting the archive's directory.
+        """
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as z:
+                if workspace is None:
+                    z.extractall(extract_to)
+                    return extract_to
+
+                infos = z.infolist()
+                workspace.check_quota(incoming=sum(info.file_size for info in infos))
+                budget = workspace.remaining()
+                root = extract_to.resolve()
+                for info in infos:
+                    target = (extract_to / info.filename).resolve()
+                    if target != root and root not in target.parents:
+                        raise InvalidFileFormatError(f"Unsafe path in ZIP: {info.filename}")
+                    if info.is_dir():
+                        target.mkdir(parents=True, exist_ok=True)
+                        continue
+                    if info.file_size > budget:
+                        raise WorkspaceQuotaExceededError(workspace.quota)
+
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    with z.open(info) as source:
+                        size, _ = _copy_limited(
+                            source, target, budget, settings.UPLOAD_CHUNK_SIZE,
+                            partial(WorkspaceQuotaExceededError, workspace.quota)
+                        )
+                    budget -= size
             return extract_to
         except zipfile.BadZipFile:
             raise InvalidFileFormatError("Invalid ZIP file")
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.core.exceptions import WorkspaceQuotaExceededError
+
+_ROOT_NAME = "flight-zone-exporter"
+
+
+def default_root() -> Path:
+    """tmpfs when the host has a writable /dev/shm, else the system temp dir."""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm / _ROOT_NAME
+    return Path(tempfile.gettempdir()) / _ROOT_NAME
+
+
+class Workspace:
+    """One request's private scratch directory, limited to `quota` bytes."""
+
+    def __init__(self, path: Path, quota: int):
+        self.path = path
+        self.quota = quota
+
+    def usage(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def remaining(self) -> int:
+        return max(self.quota - self.usage(), 0)
+
+    def check_quota(self, incoming: int = 0) -> None:
+        """Raise WorkspaceQuotaExceededError if the files so far plus `incoming` bytes exceed the quota."""
+        if self.usage() + incoming > self.quota:
+            raise WorkspaceQuotaExceededError(self.quota)
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class WorkspaceManager:
+    """
+    Hands every request its own directory under `root`.
+
+    Directories are named by a random ID, so concurrent requests (and
+    workers sharing the root) never see each other's files. Routes remove
+    their workspace in a `finally`; `sweep` clears ones a killed worker
+    left behind.
+    """
+
+    def __init__(self, root: str = None, quota: int = None, stale_after: float = None):
+        self.root = Path(root or settings.WORK_DIR or default_root())
+        self.quota = settings.WORKSPACE_QUOTA if quota is None else quota
+        self.stale_after = settings.WORKSPACE_STALE_AFTER if stale_after is None else stale_after
+
+    def create(self) -> Workspace:
+        path = self.root / uuid.uuid4().hex
+        path.mkdir(parents=True)
+        return Workspace(path, self.quota)
+
+    def sweep(self) -> int:
+        """Remove workspaces untouched for `stale_after` seconds; returns how many."""
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time() - self.stale_after
+        removed = 0
+        for path in self.root.iterdir():
+            try:
+                stale = path.is_dir() and path.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                continue
+            if stale:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+_manager: Optional[WorkspaceManager] = None
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    """Get the shared manager, creating it on first use."""
+    global _manager
+
+    if _manager is None:
+        _manager = WorkspaceManager()
+
+    return _manager
+
+
+def set_workspace_manager(manager: Optional[WorkspaceManager]) -> None:
+    """Replace the shared manager (used by tests to point at a temporary directory)."""
+    global _manager
+    _manager = manager
@@ -0,0 +1,120 @@
+"""
+Measure cold-start import cost per route group, the way a fresh Vercel or
+Lambda worker pays it.
+
+Every sample runs in a new interpreter. For each route module it reports
+the import time and which heavy stacks (geospatial, Excel, Firebase,
+requests) came along; `app` additionally answers one /api/health request
+through the Mangum handler, which is the whole cold start of a health
+check. Medians are compared with cold_start_baseline.json:
+
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --update   # record a new baseline
+
+The run fails if any group loads a heavy stack at import, or if a group's
+median grows more than --tolerance over its baseline. Baselines are
+machine-specific; re-record them with --update on the host that checks.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BASELINE = Path(__file__).with_name("cold_start_baseline.json")
+
+GROUPS = {
+    "app": "app.main",
+    "health": "app.api.routes.health",
+    "auth": "app.api.routes.auth",
+    "arcgis": "app.api.routes.arcgis",
+    "kml": "app.api.routes.kml",
+}
+
+# Loaded on first use by the routes that need them, never at import
+HEAVY = ("geopandas", "shapely", "pandas", "numpy", "openpyxl", "firebase_admin", "google.cloud.firestore", "requests")
+
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter() - started
+first_request = None
+if {request}:
+    from app.main import handler
+    event = {{
+        "version": "2.0", "routeKey": "$default", "rawPath": "/api/health", "rawQueryString": "",
+        "headers": {{"host": "bench"}}, "isBase64Encoded": False,
+        "requestContext": {{"http": {{"method": "GET", "path": "/api/health", "protocol": "HTTP/1.1",
+                                     "sourceIp": "127.0.0.1"}}, "stage": "$default"}},
+    }}
+    request_started = time.perf_counter()
+    status = handler(event, None)["statusCode"]
+    assert status == 200, status
+    first_request = time.perf_counter() - request_started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"import": imported, "first_request": first_request, "heavy": heavy}}))
+"""
+
+
+def sample(module: str, request: bool) -> dict:
+    code = _CHILD.format(module=module, request=request, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(runs: int) -> dict:
+    results = {}
+    for group, module in GROUPS.items():
+        samples = [sample(module, group == "app") for _ in range(runs)]
+        result = {
+            "import": statistics.median(s["import"] for s in samples),
+            "heavy": sorted({name for s in samples for name in s["heavy"]}),
+        }
+        if group == "app":
+            result["first_request"] = statistics.median(s["first_request"] for s in samples)
+        results[group] = result
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per group")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed growth over the baseline median")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+
+    failures = []
+    print(f"{'group':<8} {'import':>9} {'baseline':>9} {'1st req':>9}  heavy stacks")
+    for group, result in results.items():
+        seconds = result["import"]
+        before = baseline.get(group, {}).get("import")
+        first_request = result.get("first_request")
+        print(
+            f"{group:<8} {seconds * 1000:>7.0f}ms "
+            f"{f'{before * 1000:.0f}ms' if before else '-':>9} "
+            f"{f'{first_request * 1000:.0f}ms' if first_request is not None else '':>9}  "
+            f"{', '.join(result['heavy']) or '-'}"
+        )
+        if result["heavy"]:
+            failures.append(f"{group} imports {', '.join(result['heavy'])} at startup")
+        if before and not args.update and seconds > before * (1 + args.tolerance):
+            failures.append(f"{group} import took {seconds * 1000:.0f}ms, baseline {before * 1000:.0f}ms")
+
+    if args.update:
+        BASELINE.write_text(json.dumps(
+            {group: {"import": round(result["import"], 4)} for group, result in results.items()}, indent=2
+        ) + "\n")
+        print(f"baseline written to {BASELINE}")
+
+    if failures:
+        print("\nREGRESSION:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
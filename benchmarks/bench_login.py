@@ -0,0 +1,101 @@
+"""
+Measure /api/auth/login throughput under concurrency, in-process.
+
+Users are served from a throwaway SQLite user store, so the numbers
+isolate bcrypt and the event loop rather than Firestore. While the logins run, /api/health is probed
+continuously; its worst latency shows how far the login burst stalls
+everything else on the worker. `--inline` verifies on the event loop, the
+way logins worked before the bcrypt pool, for comparison:
+
+    python -m benchmarks.bench_login --logins 200 --concurrency 50
+    python -m benchmarks.bench_login --logins 200 --concurrency 50 --inline
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from datetime import datetime
+from unittest import mock
+
+import httpx
+
+from app.core import security
+from app.core.security import pwd_context
+from app.main import app
+from app.services.sqlite_user_repository import SQLiteUserRepository
+from app.services.user_repository import set_user_repository
+
+
+async def run(args, store_dir: str) -> None:
+    store = SQLiteUserRepository(f"{store_dir}/users.sqlite3")
+    await store.create("bench", {
+        "gis_auth_username": "bench",
+        "hashed_gis_auth_password": pwd_context.hash("bench-password"),
+        "is_active": True,
+        "created_at": datetime.utcnow()
+    })
+    set_user_repository(store)
+    hasher = security.PasswordHasher(workers=args.workers, max_queue=args.logins)
+    if args.inline:
+        async def inline(fn, *a):
+            return fn(*a)
+        hasher._run = inline
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        statuses = []
+
+        async def login():
+            async with semaphore:
+                response = await client.post(
+                    "/api/auth/login", json={"gis_auth_username": "bench", "gis_auth_password": "bench-password"}
+                )
+                statuses.append(response.status_code)
+
+        probe_latencies = []
+        done = asyncio.Event()
+
+        async def probe():
+            # Each round should take ~10ms; anything beyond that is time the loop was blocked
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/health")
+                await asyncio.sleep(0.01)
+                probe_latencies.append(time.perf_counter() - started - 0.01)
+
+        with mock.patch("app.services.user_service.password_hasher", hasher):
+            prober = asyncio.ensure_future(probe())
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(args.logins)))
+            elapsed = time.perf_counter() - started
+            done.set()
+            await prober
+
+    set_user_repository(None)
+    store.close()
+    ok = sum(1 for s in statuses if s == 200)
+    mode = "inline" if args.inline else f"pool x{args.workers}"
+    print(f"bcrypt rounds       {security.settings.BCRYPT_ROUNDS}")
+    print(f"mode                {mode}")
+    print(f"logins              {ok}/{args.logins} ok in {elapsed:.2f}s")
+    print(f"throughput          {args.logins / elapsed:.1f} logins/s")
+    if probe_latencies:
+        print(f"health probe        {len(probe_latencies)} calls, worst stall {max(probe_latencies) * 1000:.1f}ms")
+    print(f"peak bcrypt queue   {hasher.peak_waiting}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=security.settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--inline", action="store_true", help="verify on the event loop instead of the pool")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as store_dir:
+        asyncio.run(run(parser.parse_args(), store_dir))
+
+
+if __name__ == "__main__":
+    main()
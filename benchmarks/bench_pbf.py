@@ -0,0 +1,112 @@
+"""
+Compare f=json and f=pbf FeatureServer reads against the offline simulator.
+
+Reports bytes transferred, decode time per format (to f=json shaped dicts
+and to a GeoDataFrame) and end-to-end time of FeatureQueryEngine.features()
+for an SPK-sized polyline layer:
+
+    python -m benchmarks.bench_pbf --features 5000 --vertices 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from app.services.feature_query import FeatureQueryEngine
+from app.services.pbf import decode_geodataframe, decode_query_result, to_geodataframe
+from tests.arcgis_simulator import ArcGISSimulator, SimulatorConfig
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def seed(simulator: ArcGISSimulator, features: int, vertices: int) -> None:
+    rng = random.Random(0)
+    for i in range(features):
+        x, y = 106.0 + rng.random(), -6.0 - rng.random()
+        path = []
+        for _ in range(vertices):
+            x += rng.uniform(-1e-4, 1e-4)
+            y += rng.uniform(-1e-4, 1e-4)
+            path.append([round(x, 8), round(y, 8)])
+        simulator.add_feature({
+            "SPKNumber": "BENCH",
+            "FlightID": f"BENCH-{i}",
+            "DroneID": f"D{i % 20}",
+            "TaskArea": round(rng.uniform(0.5, 3.0), 4),
+            "StartFlight": 1735700000000 + i * 1000,
+        }, {"paths": [path]})
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def run(args) -> None:
+    simulator = ArcGISSimulator(SimulatorConfig(max_record_count=args.page_size))
+    seed(simulator, args.features, args.vertices)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=simulator.app), base_url="http://simulator")
+    layer_url = "http://simulator" + httpx.URL(simulator_layer_url()).path
+
+    rows = []
+    for fmt in ("json", "pbf"):
+        bodies = []
+        for offset in range(0, args.features, args.page_size):
+            response = await client.get(f"{layer_url}/query", params={
+                'f': fmt, 'where': "SPKNumber='BENCH'", 'outFields': '*', 'returnGeometry': 'true',
+                'orderByFields': 'OBJECTID', 'resultOffset': offset, 'resultRecordCount': args.page_size,
+            })
+            bodies.append(response.content)
+
+        if fmt == "pbf":
+            decoders = {"pbf": decode_query_result, "pbf→gdf": decode_geodataframe}
+        else:
+            loads = orjson.loads if orjson is not None else json.loads
+            decoders = {"json": json.loads, "json→gdf": lambda body: to_geodataframe(loads(body))}
+            if orjson is not None:
+                decoders["orjson"] = orjson.loads
+
+        engine = FeatureQueryEngine(client, layer_url, "bench", page_size=args.page_size, query_format=fmt)
+        started = time.perf_counter()
+        features = await engine.features("SPKNumber='BENCH'", return_geometry=True)
+        end_to_end = time.perf_counter() - started
+        assert len(features) == args.features
+
+        for name, decode in decoders.items():
+            decode_time = timed(lambda: [decode(body) for body in bodies], args.repeat)
+            rows.append((name, sum(len(b) for b in bodies), decode_time, end_to_end))
+
+    await client.aclose()
+
+    print(f"{args.features} features x {args.vertices} vertices, page size {args.page_size}")
+    print(f"{'decoder':<9} {'bytes':>12} {'decode s':>10} {'fetch s':>10}")
+    for name, size, decode_time, end_to_end in rows:
+        print(f"{name:<9} {size:>12,} {decode_time:>10.3f} {end_to_end:>10.3f}")
+
+
+def simulator_layer_url() -> str:
+    from app.core.config import settings
+    return settings.ARCGIS_BASE_URL
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark f=json against f=pbf queries")
+    parser.add_argument("--features", type=int, default=5000)
+    parser.add_argument("--vertices", type=int, default=60)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Offline simulator of the ArcGIS portal and FeatureServer endpoints used by ArcGISService.
+
+Implements generateToken, FeatureServer query/applyEdits, portal
+features/generate and the dashboard MapServer query (f=json and f=pbf),
+with configurable latency, error rates and maxRecordCount. Every call is counted per endpoint
+so tests and benchmarks can assert round-trip budgets.
+
+In tests, use the `arcgis_simulator` fixture from tests/conftest.py.
+As a standalone process for benchmarks:
+
+    python -m tests.arcgis_simulator --port 8100 --latency 0.05
+
+then point the API at it with the ARCGIS_* URLs printed on startup.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import re
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.core.config import settings
+from app.services import pbf
+
+_CLAUSE = re.compile(r"^\s*(\w+)\s*(=|<>)\s*(?:'([^']*)'|(-?\d+(?:\.\d+)?))\s*$")
+
+
+@dataclass
+class SimulatorConfig:
+    latency: float = 0.0  # seconds added to every call
+    latency_jitter: float = 0.0  # extra uniform random latency, seconds
+    error_rate: float = 0.0  # fraction of calls answered with error_status
+    error_status: int = 500
+    json_error_rate: float = 0.0  # fraction of calls answered 200 with an ArcGIS error body
+    max_record_count: int = 1000
+    accept_gzip: bool = True
+    supports_pbf: bool = True  # answer f=pbf queries; otherwise reply with an ArcGIS error body
+    reject_logins: bool = False  # answer username/password token requests with an error
+    seed: Optional[int] = None
+
+
+def _path(url: str) -> str:
+    return urlparse(url).path.rstrip('/')
+
+
+def _matches(where: str, attributes: Dict[str, Any]) -> bool:
+    """Evaluate the small subset of SQL where clauses the service sends."""
+    if not where or where.strip() == '1=1':
+        return True
+
+    for clause in re.split(r"\s+AND\s+", where, flags=re.IGNORECASE):
+        match = _CLAUSE.match(clause)
+        if not match:
+            raise ValueError(f"Unsupported where clause: {clause}")
+        field, op, text, number = match.groups()
+        expected: Any = text if text is not None else float(number)
+        actual = attributes.get(field)
+        if isinstance(expected, float) and actual is not None:
+            actual = float(actual)
+        if (actual == expected) != (op == '='):
+            return False
+    return True
+
+
+def _sort_key(value: Any) -> tuple:
+    # Nulls last; numbers and strings never compared with each other
+    return (value is None, isinstance(value, str), value if value is not None else 0)
+
+
+class ArcGISSimulator:
+    def __init__(self, config: SimulatorConfig = None):
+        self.config = config or SimulatorConfig()
+        self.random = random.Random(self.config.seed)
+        self.calls: Counter = Counter()
+        self.features: Dict[int, Dict[str, Any]] = {}
+        self.dashboard_rows: List[Dict[str, Any]] = []
+        self._next_oid = 1
+        self.app = self._build_app()
+
+    # State helpers
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.features.clear()
+        self.dashboard_rows.clear()
+        self._next_oid = 1
+
+    def add_feature(self, attributes: Dict[str, Any], geometry: Dict[str, Any] = None) -> int:
+        oid = self._next_oid
+        self._next_oid += 1
+        self.features[oid] = {"attributes": {**attributes, "OBJECTID": oid}, "geometry": geometry}
+        return oid
+
+    def seed_spk(self, spk_number: str, count: int) -> List[int]:
+        return [
+            self.add_feature(
+                {"SPKNumber": spk_number, "FlightID": f"{spk_number}-{i}"},
+                {"paths": [[[106.0 + i * 1e-4, -6.0], [106.0 + i * 1e-4, -6.001]]]}
+            )
+            for i in range(count)
+        ]
+
+    def spk_features(self, spk_number: str) -> List[Dict[str, Any]]:
+        return [f for f in self.features.values() if f["attributes"].get("SPKNumber") == spk_number]
+
+    # Request plumbing
+
+    async def _simulate(self, endpoint: str) -> Optional[JSONResponse]:
+        self.calls[endpoint] += 1
+        delay = self.config.latency + self.random.uniform(0, self.config.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.config.error_rate:
+            return JSONResponse({"detail": "Simulated failure"}, status_code=self.config.error_status)
+        if self.random.random() < self.config.json_error_rate:
+            return JSONResponse({"error": {"code": 500, "message": "Simulated ArcGIS error", "details": []}})
+        return None
+
+    async def _form(self, request: Request) -> Dict[str, str]:
+        body = await request.body()
+        if request.headers.get('content-encoding') == 'gzip':
+            if not self.config.accept_gzip:
+                return None
+            body = gzip.decompress(body)
+        return dict(parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+
+    # Query evaluation
+
+    def _query(self, rows: List[Dict[str, Any]], params: Dict[str, str]) -> Dict[str, Any]:
+        where = params.get('where', '1=1')
+        try:
+            matched = [r for r in rows if _matches(where, r["attributes"])]
+        except ValueError as e:
+            return {"error": {"code": 400, "message": str(e), "details": []}}
+
+        if params.get('returnCountOnly') == 'true':
+            return {"count": len(matched)}
+        if params.get('returnIdsOnly') == 'true':
+            return {
+                "objectIdFieldName": "OBJECTID",
+                "objectIds": [r["attributes"]["OBJECTID"] for r in matched],
+            }
+
+        out_fields = params.get('outFields', '*')
+        fields = None if out_fields == '*' else [f.strip() for f in out_fields.split(',')]
+
+        def project(row):
+            attributes = row["attributes"]
+            if fields is not None:
+                attributes = {f: attributes.get(f) for f in fields}
+            feature = {"attributes": attributes}
+            if params.get('returnGeometry', 'true') == 'true' and row.get("geometry") is not None:
+                feature["geometry"] = row["geometry"]
+            return feature
+
+        features = [project(r) for r in matched]
+        if params.get('returnDistinctValues') == 'true':
+            seen, distinct = set(), []
+            for f in features:
+                key = json.dumps(f["attributes"], sort_keys=True)
+                if key not in seen:
+                    seen.add(key)
+                    distinct.append({"attributes": f["attributes"]})
+            features = distinct
+
+        order_by = params.get('orderByFields')
+        if order_by:
+            keys = [k.split()[0] for k in order_by.split(',')]
+            features.sort(key=lambda f: tuple(_sort_key(f["attributes"].get(k)) for k in keys))
+
+        offset = int(params.get('resultOffset', 0))
+        limit = min(int(params.get('resultRecordCount', self.config.max_record_count)), self.config.max_record_count)
+        page = features[offset:offset + limit]
+        return {
+            "objectIdFieldName": "OBJECTID",
+            "features": page,
+            "exceededTransferLimit": offset + len(page) < len(features),
+        }
+
+    def _respond(self, result: Dict[str, Any], params: Dict[str, str]) -> Any:
+        """Serialize a query result in the requested format."""
+        if params.get('f') != 'pbf' or 'error' in result:
+            return result
+        if not self.config.supports_pbf:
+            return {"error": {"code": 400, "message": "Invalid or missing input parameters.", "details": ["f=pbf"]}}
+
+        if 'count' in result:
+            body = pbf.encode_count(result['count'])
+        elif 'objectIds' in result:
+            body = pbf.encode_object_ids(result['objectIds'])
+        else:
+            body = pbf.encode_feature_result(result['features'], exceeded_transfer_limit=result['exceededTransferLimit'])
+        return Response(body, media_type=pbf.PBF_CONTENT_TYPE)
+
+    def _apply_edits(self, form: Dict[str, str]) -> Dict[str, Any]:
+        add_results, update_results, delete_results = [], [], []
+
+        for feature in json.loads(form.get('adds') or '[]'):
+            oid = self.add_feature(feature.get("attributes", {}), feature.get("geometry"))
+            add_results.append({"objectId": oid, "success": True})
+
+        for feature in json.loads(form.get('updates') or '[]'):
+            attributes = feature.get("attributes", {})
+            oid = attributes.get("OBJECTID")
+            current = self.features.get(oid)
+            if current is None:
+                update_results.append({"objectId": oid, "success": False, "error": {"code": 1019, "description": "Object is missing."}})
+                continue
+            current["attributes"].update(attributes)
+            if "geometry" in feature:
+                current["geometry"] = feature["geometry"]
+            update_results.append({"objectId": oid, "success": True})
+
+        deletes = form.get('deletes') or ''
+        for token in filter(None, deletes.split(',')):
+            oid = int(token)
+            if self.features.pop(oid, None) is None:
+                delete_results.append({"objectId": oid, "success": False, "error": {"code": 1019, "description": "Object is missing."}})
+            else:
+                delete_results.append({"objectId": oid, "success": True})
+
+        return {"addResults": add_results, "updateResults": update_results, "deleteResults": delete_results}
+
+    def _generate(self, zip_bytes: bytes, publish_parameters: Dict[str, Any]) -> Dict[str, Any]:
+        from app.services.esri_json import EsriJSONEncoder
+
+        with tempfile.TemporaryDirectory() as tmp:
+            zip_path = Path(tmp) / "upload.zip"
+            zip_path.write_bytes(zip_bytes)
+            features = EsriJSONEncoder.encode_shapefile_zip(zip_path, Path(tmp))
+
+        limit = publish_parameters.get('maxRecordCount') or self.config.max_record_count
+        return {"featureCollection": {"layers": [{
+            "layerDefinition": {"name": publish_parameters.get('name'), "geometryType": "esriGeometryPolyline"},
+            "featureSet": {"geometryType": "esriGeometryPolyline", "features": features[:limit]},
+        }]}}
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="ArcGIS Simulator")
+        token_path = _path(settings.ARCGIS_TOKEN_URL)
+        layer_path = _path(settings.ARCGIS_BASE_URL)
+        upload_path = _path(settings.ARCGIS_UPLOAD_URL)
+        dashboard_path = _path(settings.ARCGIS_DASHBOARD_URL)
+
+        @app.post(token_path)
+        async def generate_token(request: Request):
+            if (failure := await self._simulate("generateToken")) is not None:
+                return failure
+            form = await self._form(request)
+            if 'username' in form and self.config.reject_logins:
+                return {"error": {"code": 400, "message": "Unable to generate token.", "details": ["Invalid username or password."]}}
+            return {"token": f"sim-{self.calls['generateToken']}", "expires": int(time.time() + 3600) * 1000, "ssl": True}
+
+        @app.get(f"{layer_path}/query")
+        async def layer_query(request: Request):
+            if (failure := await self._simulate("query")) is not None:
+                return failure
+            params = dict(request.query_params)
+            return self._respond(self._query(list(self.features.values()), params), params)
+
+        @app.post(f"{layer_path}/applyEdits")
+        async def apply_edits(request: Request):
+            if (failure := await self._simulate("applyEdits")) is not None:
+                return failure
+            form = await self._form(request)
+            if form is None:
+                return JSONResponse({"detail": "gzip request bodies are not accepted"}, status_code=415)
+            return self._apply_edits(form)
+
+        @app.post(upload_path)
+        async def generate(request: Request):
+            if (failure := await self._simulate("generate")) is not None:
+                return failure
+            form = await request.form()
+            publish_parameters = json.loads(request.query_params.get('publishParameters') or '{}')
+            zip_bytes = await form['file'].read()
+            return await asyncio.to_thread(self._generate, zip_bytes, publish_parameters)
+
+        @app.get(f"{dashboard_path}/query")
+        async def dashboard_query(request: Request):
+            if (failure := await self._simulate("dashboardQuery")) is not None:
+                return failure
+            rows = [{"attributes": r} for r in self.dashboard_rows]
+            params = dict(request.query_params)
+            return self._respond(self._query(rows, params), params)
+
+        @app.get("/__simulator/calls")
+        async def calls():
+            return dict(self.calls)
+
+        @app.post("/__simulator/reset")
+        async def reset():
+            self.reset()
+            return {"success": True}
+
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline ArcGIS simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json-error-rate", type=float, default=0.0)
+    parser.add_argument("--max-record-count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    simulator = ArcGISSimulator(SimulatorConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        json_error_rate=args.json_error_rate,
+        max_record_count=args.max_record_count,
+        seed=args.seed,
+    ))
+
+    origin = f"http://{args.host}:{args.port}"
+    for name in ("ARCGIS_BASE_URL", "ARCGIS_SERVER_URL", "ARCGIS_TOKEN_URL", "ARCGIS_UPLOAD_URL", "ARCGIS_DASHBOARD_URL"):
+        print(f"export {name}={origin}{urlparse(getattr(settings, name)).path}")
+
+    uvicorn.run(simulator.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,11 +40,106 @@ def sample_shapefile_zip():
 
 @pytest.fixture
 def mock_arcgis_auth(mocker):
-    """Mock ArcGIS authentication"""
-    mock_service = mocker.patch('app.services.arcgis_service.ArcGISService.authenticate')
+    """Mock ArcGIS token exchange"""
+    mock_service = mocker.patch('app.services.async_arcgis_service.AsyncArcGISService.get_token')
     mock_service.return_value = "fake_token_12345"
     return mock_service
 
+@pytest.fixture(autouse=True)
+def reset_query_formats():
+    """Forget per-layer f=pbf fallbacks between tests"""
+    from app.services import feature_query
+    feature_query._pbf_unsupported.clear()
+    yield
+    feature_query._pbf_unsupported.clear()
+
+@pytest.fixture(autouse=True)
+def spk_index(tmp_path):
+    """Give every test its own empty SPK index"""
+    from app.services.spk_index import SPKIndex, set_spk_index
+    index = SPKIndex(str(tmp_path / "spk_index.sqlite3"))
+    set_spk_index(index)
+    yield index
+    set_spk_index(None)
+    index.close()
+
+@pytest.fixture(autouse=True)
+def upload_journal(tmp_path):
+    """Give every test its own empty upload journal"""
+    from app.services.upload_journal import UploadJournal, set_upload_journal
+    journal = UploadJournal(str(tmp_path / "upload_journal.sqlite3"), str(tmp_path / "uploads"))
+    set_upload_journal(journal)
+    yield journal
+    set_upload_journal(None)
+    journal.close()
+
+@pytest.fixture(autouse=True)
+def generate_cache(tmp_path):
+    """Give every test its own empty generate cache"""
+    from app.services.generate_cache import GenerateCache, set_generate_cache
+    cache = GenerateCache(str(tmp_path / "generate_cache"))
+    set_generate_cache(cache)
+    yield cache
+    set_generate_cache(None)
+
+@pytest.fixture(autouse=True)
+def workspaces(tmp_path):
+    """Create request workspaces under the test's own directory"""
+    from app.utils.workspace import WorkspaceManager, set_workspace_manager
+    manager = WorkspaceManager(str(tmp_path / "workspaces"))
+    set_workspace_manager(manager)
+    yield manager
+    set_workspace_manager(None)
+
+@pytest.fixture(scope="session", autouse=True)
+def artifacts(tmp_path_factory):
+    """Keep generated downloads in one temporary store for the whole run"""
+    from app.services.artifacts import ArtifactStore, set_artifact_store
+    store = ArtifactStore(str(tmp_path_factory.mktemp("artifacts")))
+    set_artifact_store(store)
+    yield store
+    set_artifact_store(None)
+
+@pytest.fixture(autouse=True)
+def user_store(tmp_path):
+    """Keep users in a per-test SQLite file instead of Firestore"""
+    from app.services import user_service
+    from app.services.sqlite_user_repository import SQLiteUserRepository
+    from app.services.user_repository import set_user_repository
+    store = SQLiteUserRepository(str(tmp_path / "users.sqlite3"))
+    set_user_repository(store)
+    user_service.user_cache.clear()
+    yield store
+    set_user_repository(None)
+    user_service.user_cache.clear()
+    store.close()
+
+@pytest.fixture(autouse=True)
+def revocations(monkeypatch):
+    """Keep the token deny-list in memory"""
+    from app.core.revocation import revocation_list
+    stored = []
+    monkeypatch.setattr(revocation_list, "loader", lambda: ({}, {}))
+    monkeypatch.setattr(revocation_list, "store", lambda kind, key, value: stored.append((kind, key, value)))
+    revocation_list.clear()
+    yield stored
+    revocation_list.clear()
+
+@pytest.fixture
+def arcgis_simulator():
+    """Route the shared ArcGIS HTTP client to an in-process simulator"""
+    import httpx
+    from app.core.http import set_http_client
+    from app.services.async_arcgis_service import AsyncArcGISService
+    from tests.arcgis_simulator import ArcGISSimulator, SimulatorConfig
+
+    simulator = ArcGISSimulator(SimulatorConfig(seed=0))
+    set_http_client(httpx.AsyncClient(transport=httpx.ASGITransport(app=simulator.app)))
+    AsyncArcGISService.invalidate_dashboard_cache()
+    yield simulator
+    set_http_client(None)
+    AsyncArcGISService.invalidate_dashboard_cache()
+
 @pytest.fixture
 def mock_firebase_user(mocker):
     """Mock Firebase user operations"""
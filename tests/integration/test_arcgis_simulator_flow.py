@@ -0,0 +1,259 @@
+import zipfile
+import pytest
+import geopandas as gpd
+from datetime import datetime
+from fastapi import status
+from shapely.geometry import LineString
+
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user, get_user_gis_credentials
+from app.services.async_arcgis_service import arcgis_limiter
+from app.models.user import UserInDB
+
+
+@pytest.fixture
+def final_zip(temp_work_dir):
+    """Build a final upload ZIP with a few flight zones"""
+    def build(names=("Z1", "Z2", "Z3"), area=1.0, start="2025-01-01 10:00:00"):
+        gdf = gpd.GeoDataFrame({
+            "Name": list(names),
+            "Flight_Con": ["D1"] * len(names),
+            "Task_Area": [area] * len(names),
+            "StarFlight": [start] * len(names),
+            "EndFlight": ["2025-01-01 10:30:00"] * len(names),
+            "geometry": [LineString([(106.0 + i * 1e-3, -6.0), (106.0 + i * 1e-3, -6.01)]) for i in range(len(names))],
+        }, crs="EPSG:4326")
+        shp = temp_work_dir / "SPK1.shp"
+        gdf.to_file(shp, driver="ESRI Shapefile")
+        zip_path = temp_work_dir / "final_upload.zip"
+        with zipfile.ZipFile(zip_path, "w") as z:
+            for ext in ("shp", "shx", "dbf", "prj", "cpg"):
+                p = shp.with_suffix(f".{ext}")
+                if p.exists():
+                    z.write(p, p.name)
+        return zip_path
+    return build
+
+
+@pytest.fixture
+def authenticated():
+    """Bypass user lookup for ArcGIS routes"""
+    user = UserInDB(
+        id="user123",
+        gis_auth_username="VENDOR1",
+        hashed_gis_auth_password="x",
+        is_active=True,
+        created_at=datetime.utcnow()
+    )
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    app.dependency_overrides[get_user_gis_credentials] = lambda: {"GIS_USERNAME": "u", "GIS_PASSWORD": "p"}
+    yield user
+    app.dependency_overrides.clear()
+
+
+def upload(client, zip_path, **data):
+    with open(zip_path, "rb") as f:
+        return client.post(
+            "/api/kml/upload-to-arcgis",
+            files={"final_zip": ("final_upload.zip", f, "application/zip")},
+            data={"spk_number": "SPK1", "key_id": "KEY1", **data}
+        )
+
+
+class TestArcGISSimulatorFlow:
+    def test_direct_upload_replaces_existing(self, client, arcgis_simulator, final_zip):
+        """Test direct upload deletes old SPK features and adds the new zones"""
+        arcgis_simulator.seed_spk("SPK1", 5)
+
+        response = upload(client, final_zip())
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["features_added"] == 3
+        assert sorted(f["attributes"]["FlightID"] for f in arcgis_simulator.spk_features("SPK1")) == ["Z1", "Z2", "Z3"]
+        assert arcgis_simulator.calls["generate"] == 0
+        # one batched delete and one batched add
+        assert arcgis_simulator.calls["applyEdits"] == 2
+
+    def test_portal_mode_uses_generate(self, client, arcgis_simulator, final_zip):
+        """Test portal mode still converts through features/generate"""
+        response = upload(client, final_zip(), mode="portal")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["features_added"] == 3
+        assert response.json()["upload_result"] == {"mode": "portal", "features": 3}
+        assert arcgis_simulator.calls["generate"] == 1
+
+    def test_portal_retry_reuses_cached_generate(self, client, arcgis_simulator, final_zip):
+        """Test re-uploading the same ZIP skips features/generate and a changed ZIP does not"""
+        upload(client, final_zip(), mode="portal")
+        retry = upload(client, final_zip(), mode="portal")
+
+        assert retry.json()["features_added"] == 3
+        assert arcgis_simulator.calls["generate"] == 1
+        assert sorted(f["attributes"]["FlightID"] for f in arcgis_simulator.spk_features("SPK1")) == ["Z1", "Z2", "Z3"]
+
+        upload(client, final_zip(names=("Z1", "Z2")), mode="portal")
+        assert arcgis_simulator.calls["generate"] == 2
+
+    def test_portal_splits_generate_by_max_record_count(self, client, arcgis_simulator, final_zip, monkeypatch):
+        """Test a ZIP over maxRecordCount is generated in parts and merged back in order"""
+        monkeypatch.setattr(settings, "ARCGIS_GENERATE_MAX_RECORDS", 2)
+        names = ("Z1", "Z2", "Z3", "Z4", "Z5")
+
+        response = upload(client, final_zip(names=names), mode="portal")
+
+        assert response.json()["features_added"] == 5
+        assert arcgis_simulator.calls["generate"] == 3
+        added = sorted(arcgis_simulator.spk_features("SPK1"), key=lambda f: f["attributes"]["OBJECTID"])
+        assert [f["attributes"]["FlightID"] for f in added] == list(names)
+
+    def test_portal_upload_at_limit_one(self, client, arcgis_simulator, final_zip, monkeypatch):
+        """Test applyEdits batches sent while generate streams do not deadlock on a single slot"""
+        monkeypatch.setattr(arcgis_limiter, "min_limit", 1)
+        monkeypatch.setattr(arcgis_limiter, "max_limit", 1)
+        monkeypatch.setattr(arcgis_limiter, "limit", 1.0)
+        monkeypatch.setattr(settings, "ARCGIS_EDIT_BATCH_SIZE", 5)
+        names = tuple(f"Z{i}" for i in range(60))
+
+        response = upload(client, final_zip(names=names), mode="portal")
+
+        assert response.json()["features_added"] == 60
+        assert arcgis_limiter.in_flight == 0
+
+    def test_upsert_dry_run_and_noop(self, client, arcgis_simulator, final_zip):
+        """Test upsert plans a diff and skips writes when nothing changed"""
+        dry = upload(client, final_zip(), strategy="upsert", dry_run="true")
+        assert dry.json()["sync_plan"]["adds"] == ["Z1", "Z2", "Z3"]
+        assert arcgis_simulator.calls["applyEdits"] == 0
+
+        upload(client, final_zip(), strategy="upsert")
+        assert arcgis_simulator.calls["applyEdits"] == 1
+
+        again = upload(client, final_zip(), strategy="upsert")
+        assert again.json()["sync_plan"]["unchanged"] == 3
+        assert arcgis_simulator.calls["applyEdits"] == 1
+
+        changed = upload(client, final_zip(names=("Z1", "Z2"), area=2.0), strategy="upsert")
+        plan = changed.json()["sync_plan"]
+        assert len(plan["updates"]) == 2 and len(plan["deletes"]) == 1
+        assert len(arcgis_simulator.spk_features("SPK1")) == 2
+
+    def test_upsert_settles_without_flight_times(self, client, arcgis_simulator, final_zip):
+        """Test zones whose start time falls back to the current time are unchanged on a rerun"""
+        upload(client, final_zip(start=""), strategy="upsert")
+        stored = {f["attributes"]["FlightID"]: f["attributes"]["StartFlight"] for f in arcgis_simulator.spk_features("SPK1")}
+
+        again = upload(client, final_zip(start=""), strategy="upsert", dry_run="true")
+
+        plan = again.json()["sync_plan"]
+        assert plan["updates"] == [] and plan["adds"] == [] and plan["deletes"] == []
+        assert plan["unchanged"] == 3
+
+        changed = upload(client, final_zip(start="", area=2.0), strategy="upsert")
+        assert len(changed.json()["sync_plan"]["updates"]) == 3
+        # The placeholder time does not overwrite the stored one
+        assert {f["attributes"]["FlightID"]: f["attributes"]["StartFlight"] for f in arcgis_simulator.spk_features("SPK1")} == stored
+
+    def test_large_spk_check_and_delete(self, client, arcgis_simulator, authenticated):
+        """Test SPKs larger than maxRecordCount are fully counted and deleted"""
+        arcgis_simulator.config.max_record_count = 10
+        arcgis_simulator.seed_spk("SPK1", 25)
+
+        check = client.post("/api/arcgis/spk/check", json={"spk_number": "SPK1"})
+        assert check.json()["count"] == 25
+        assert len(check.json()["oids"]) == 25
+
+        delete = client.request("DELETE", "/api/arcgis/spk", json={"spk_number": "SPK1"})
+        assert delete.json()["deleted_count"] == 25
+        assert arcgis_simulator.spk_features("SPK1") == []
+
+    def test_dashboard_cascade_single_query(self, client, arcgis_simulator, authenticated):
+        """Test the whole cascade is served from one dashboard query"""
+        arcgis_simulator.dashboard_rows.extend([
+            {"VendorCode": "VENDOR1", "Drone": 0, "Region": "R1", "District": "D1", "Petak": "P1", "SPKNumber": "S1", "Activity": "A"},
+            {"VendorCode": "VENDOR1", "Drone": 0, "Region": "R1", "District": "D2", "Petak": "P2", "SPKNumber": "S2", "Activity": "A"},
+            {"VendorCode": "OTHER", "Drone": 0, "Region": "R9", "District": "D9", "Petak": "P9", "SPKNumber": "S9", "Activity": "A"},
+        ])
+
+        assert client.get("/api/arcgis/dashboard/regions").json()["values"] == ["R1"]
+        assert client.get("/api/arcgis/dashboard/districts", params={"region": "R1"}).json()["values"] == ["D1", "D2"]
+        assert client.get("/api/arcgis/dashboard/spk-numbers", params={"petak": "P2"}).json()["values"][0]["spk_number"] == "S2"
+        hierarchy = client.get("/api/arcgis/dashboard/hierarchy").json()
+        assert hierarchy["regions"][0]["districts"][0]["petaks"][0]["petak"] == "P1"
+
+        assert arcgis_simulator.calls["dashboardQuery"] == 1
+
+    def test_json_fallback_for_servers_without_pbf(self, client, arcgis_simulator, authenticated):
+        """Test queries fall back to f=json once when the server rejects f=pbf"""
+        arcgis_simulator.config.supports_pbf = False
+        arcgis_simulator.seed_spk("SPK1", 3)
+
+        for _ in range(2):
+            check = client.post("/api/arcgis/spk/check", json={"spk_number": "SPK1", "include_oids": False})
+            assert check.json()["count"] == 3
+
+        # one rejected pbf attempt, then json for both checks
+        assert arcgis_simulator.calls["query"] == 3
+
+    def test_spk_index_skips_lookups_after_upload(self, client, arcgis_simulator, final_zip, authenticated):
+        """Test checks and deletes after an upload are served from the local SPK index"""
+        arcgis_simulator.seed_spk("SPK1", 2)
+        upload(client, final_zip())
+        queries = arcgis_simulator.calls["query"]
+
+        check = client.post("/api/arcgis/spk/check", json={"spk_number": "SPK1", "include_oids": True})
+        assert check.json()["count"] == 3
+        assert sorted(check.json()["oids"]) == sorted(
+            f["attributes"]["OBJECTID"] for f in arcgis_simulator.spk_features("SPK1")
+        )
+
+        delete = client.request("DELETE", "/api/arcgis/spk", json={"spk_number": "SPK1"})
+        assert delete.json()["deleted_count"] == 3
+        assert arcgis_simulator.calls["query"] == queries
+
+    def test_stale_index_recovers_on_delete(self, client, arcgis_simulator, spk_index, authenticated):
+        """Test a delete with outdated OBJECTIDs re-queries the layer and still deletes everything"""
+        oids = arcgis_simulator.seed_spk("SPK1", 2)
+        spk_index.reconcile(settings.ARCGIS_BASE_URL, "SPK1", oids + [999])
+
+        delete = client.request("DELETE", "/api/arcgis/spk", json={"spk_number": "SPK1"})
+
+        assert delete.status_code == status.HTTP_200_OK
+        assert arcgis_simulator.spk_features("SPK1") == []
+
+    @pytest.mark.parametrize("applied", [False, True])
+    def test_resume_continues_after_failed_batch(self, client, arcgis_simulator, final_zip, monkeypatch, applied):
+        """Test a resumed upload adds only what is missing, whether the failed batch reached the layer or not"""
+        monkeypatch.setattr(settings, "ARCGIS_EDIT_BATCH_SIZE", 1)
+        monkeypatch.setattr(settings, "ARCGIS_EDIT_CONCURRENCY", 1)
+        arcgis_simulator.seed_spk("SPK1", 2)
+        apply_edits = arcgis_simulator._apply_edits
+        calls = []
+
+        def flaky_apply_edits(form):
+            calls.append(form)
+            # call 1 is the delete; fail the second add once
+            if len(calls) == 3:
+                if applied:
+                    apply_edits(form)
+                return {"error": {"code": 503, "message": "Service unavailable", "details": []}}
+            return apply_edits(form)
+
+        arcgis_simulator._apply_edits = flaky_apply_edits
+
+        first = upload(client, final_zip())
+        upload_id = first.json()["upload_id"]
+        assert first.json()["success"] is False
+        status_before = client.get(f"/api/kml/uploads/{upload_id}").json()
+        assert (status_before["status"], status_before["stage"]) == ("failed", "applying")
+        assert status_before["features_committed"] == 2
+
+        resumed = client.post(f"/api/kml/upload-to-arcgis/{upload_id}/resume")
+
+        assert resumed.status_code == status.HTTP_200_OK
+        assert resumed.json()["success"] is True
+        assert resumed.json()["features_added"] == (0 if applied else 1)
+        assert sorted(f["attributes"]["FlightID"] for f in arcgis_simulator.spk_features("SPK1")) == ["Z1", "Z2", "Z3"]
+        assert client.get(f"/api/kml/uploads/{upload_id}").json()["status"] == "completed"
+        assert client.post(f"/api/kml/upload-to-arcgis/{upload_id}/resume").status_code == status.HTTP_409_CONFLICT
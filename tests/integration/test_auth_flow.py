@@ -122,3 +122,78 @@ class TestAuthFlow:
 
         # FastAPI returns 403 for missing credentials
         assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN]
+
+    def test_stateless_mode_skips_user_lookup(self, client, mock_firebase_user, mocker, monkeypatch):
+        """Test stateless tokens authenticate from their claims alone"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "AUTH_MODE", "stateless")
+        mock_firebase_user['authenticate'].return_value = UserInDB(
+            id='user123',
+            gis_auth_username='agasha123',
+            full_name='Test User',
+            hashed_gis_auth_password='x',
+            is_active=True,
+            created_at=datetime.utcnow()
+        )
+        token = client.post("/api/auth/login", json={
+            "gis_auth_username": "agasha123",
+            "gis_auth_password": "password123"
+        }).json()["access_token"]
+        mock_get_by_id = mocker.patch('app.services.user_service.UserService.get_user_by_id')
+
+        response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["gis_auth_username"] == "agasha123"
+        mock_get_by_id.assert_not_called()
+
+    def test_logout_revokes_token(self, client, mock_firebase_user, mocker, monkeypatch, revocations):
+        """Test a logged-out token is rejected while a new login still works"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "AUTH_MODE", "stateless")
+        test_user = UserInDB(
+            id='user123',
+            gis_auth_username='agasha123',
+            hashed_gis_auth_password='x',
+            is_active=True,
+            created_at=datetime.utcnow()
+        )
+        mock_firebase_user['authenticate'].return_value = test_user
+        mocker.patch('app.services.user_service.UserService.get_user_by_id', return_value=test_user)
+
+        def login():
+            return client.post("/api/auth/login", json={
+                "gis_auth_username": "agasha123",
+                "gis_auth_password": "password123"
+            }).json()["access_token"]
+
+        token = login()
+        logout = client.post("/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
+
+        assert logout.status_code == status.HTTP_200_OK
+        assert [kind for kind, _, _ in revocations] == ["token"]
+        assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == status.HTTP_401_UNAUTHORIZED
+        assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {login()}"}).status_code == status.HTTP_200_OK
+
+    def test_logout_revokes_token_in_default_mode(self, client, mock_firebase_user, mocker, monkeypatch, revocations):
+        """Test logout takes effect under the default stateful AUTH_MODE"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "AUTH_MODE", "stateful")
+        test_user = UserInDB(
+            id='user123',
+            gis_auth_username='agasha123',
+            hashed_gis_auth_password='x',
+            is_active=True,
+            created_at=datetime.utcnow()
+        )
+        mock_firebase_user['authenticate'].return_value = test_user
+        mocker.patch('app.services.user_service.UserService.get_user_by_id', return_value=test_user)
+        token = client.post("/api/auth/login", json={
+            "gis_auth_username": "agasha123",
+            "gis_auth_password": "password123"
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        assert client.get("/api/auth/me", headers=headers).status_code == status.HTTP_200_OK
+        assert client.post("/api/auth/logout", headers=headers).status_code == status.HTTP_200_OK
+        assert client.get("/api/auth/me", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
@@ -93,27 +93,31 @@ class TestKMLWorkflow:
         """Test downloading shapefile for editing"""
         # First generate shapefile
         with open(sample_kml_zip, 'rb') as f:
-            client.post(
+            generated = client.post(
                 "/api/kml/generate-shapefile",
                 files={"kml_zip": ("sample.zip", f, "application/zip")},
                 data={"spk_number": "SPK111"}
             )
 
         # Now download it
-        response = client.get("/api/kml/download/shapefile-for-edit")
+        artifact_id = generated.json()["artifact_id"]
+        response = client.get("/api/kml/download/shapefile-for-edit", params={"artifact_id": artifact_id})
 
         assert response.status_code == status.HTTP_200_OK
         assert response.headers["content-type"] == "application/zip"
 
-    def test_download_final_upload(self, client, sample_kml_zip, sample_excel_file):
+    def test_download_final_upload(self, client, sample_kml_zip, sample_excel_file, sample_shapefile_zip):
         """Test downloading final processed ZIP"""
         # First process files
-        with open(sample_kml_zip, 'rb') as kml, open(sample_excel_file, 'rb') as excel:
-            client.post(
+        with open(sample_kml_zip, 'rb') as kml, \
+             open(sample_excel_file, 'rb') as excel, \
+             open(sample_shapefile_zip, 'rb') as shp:
+            processed = client.post(
                 "/api/kml/process",
                 files={
                     "kml_zip": ("zones.zip", kml, "application/zip"),
-                    "excel_file": ("data.xlsx", excel, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                    "excel_file": ("data.xlsx", excel, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+                    "edited_shapefile": ("edited.zip", shp, "application/zip")
                 },
                 data={
                     "spk_number": "SPK222",
@@ -122,7 +126,70 @@ class TestKMLWorkflow:
             )
 
         # Now download it
-        response = client.get("/api/kml/download/final-upload")
+        response = client.get("/api/kml/download/final-upload", params={"artifact_id": processed.json()["artifact_id"]})
 
         assert response.status_code == status.HTTP_200_OK
         assert response.headers["content-type"] == "application/zip"
+
+    def test_download_requires_artifact_id(self, client):
+        """Test downloads never fall back to another request's artifact"""
+        assert client.get("/api/kml/download/final-upload").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert client.get("/api/kml/download/shapefile-for-edit").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_parallel_results_do_not_collide(self, client, sample_kml_zip, sample_excel_file, sample_shapefile_zip):
+        """Test each processed upload is downloadable under its own artifact_id"""
+        artifact_ids = []
+        for spk in ("SPK301", "SPK302"):
+            with open(sample_kml_zip, 'rb') as kml, \
+                 open(sample_excel_file, 'rb') as excel, \
+                 open(sample_shapefile_zip, 'rb') as shp:
+                response = client.post(
+                    "/api/kml/process",
+                    files={
+                        "kml_zip": ("zones.zip", kml, "application/zip"),
+                        "excel_file": ("data.xlsx", excel, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+                        "edited_shapefile": ("edited.zip", shp, "application/zip")
+                    },
+                    data={"spk_number": spk, "key_id": "KEY301"}
+                )
+            assert response.status_code == status.HTTP_200_OK
+            artifact_ids.append(response.json()["artifact_id"])
+
+        assert artifact_ids[0] != artifact_ids[1]
+        for artifact_id in artifact_ids:
+            response = client.get("/api/kml/download/final-upload", params={"artifact_id": artifact_id})
+            assert response.status_code == status.HTTP_200_OK
+        assert client.get("/api/kml/download/final-upload", params={"artifact_id": "0" * 32}).status_code == 404
+
+
+class TestUploadSizeLimit:
+    def test_declared_length_over_limit(self, client, monkeypatch):
+        """Test a body declared larger than MAX_UPLOAD_SIZE is refused before it is read"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+
+        response = client.post(
+            "/api/kml/generate-shapefile",
+            files={"kml_zip": ("zones.zip", b"0" * 4096, "application/zip")},
+            data={"spk_number": "SPK123"}
+        )
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_chunked_body_over_limit(self, client, monkeypatch):
+        """Test a body without Content-Length is cut off once it passes MAX_UPLOAD_SIZE"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+
+        def body():
+            for _ in range(64):
+                yield b"0" * 512
+
+        response = client.post(
+            "/api/kml/generate-shapefile",
+            content=body(),
+            headers={"content-type": "multipart/form-data; boundary=xyz"}
+        )
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert "limit" in response.json()["detail"]
@@ -0,0 +1,119 @@
+import pytest
+import httpx
+import respx
+
+from app.core.config import settings
+from app.core.exceptions import ArcGISAuthenticationError, SPKNotFoundError
+from app.services.async_arcgis_service import AsyncArcGISService
+
+
+@pytest.fixture
+def service():
+    return AsyncArcGISService(client=httpx.AsyncClient())
+
+
+@pytest.fixture
+def token_route():
+    with respx.mock(assert_all_called=False) as router:
+        route = router.post(settings.ARCGIS_TOKEN_URL).mock(
+            return_value=httpx.Response(200, json={"token": "tok"})
+        )
+        yield router, route
+
+
+class TestAsyncArcGISService:
+    async def test_get_token_runs_three_steps(self, service, token_route):
+        """Test token exchange goes through all three portal steps"""
+        _, route = token_route
+
+        token = await service.get_token()
+
+        assert token == "tok"
+        assert route.call_count == 3
+
+    async def test_get_token_failure(self, service):
+        """Test missing token in step response raises auth error"""
+        with respx.mock:
+            respx.post(settings.ARCGIS_TOKEN_URL).mock(
+                return_value=httpx.Response(200, json={"error": {"code": 400}})
+            )
+            with pytest.raises(ArcGISAuthenticationError, match="step 1"):
+                await service.get_token()
+
+    async def test_query_spk(self, service, token_route):
+        """Test SPK query returns OBJECTIDs from an ID-only query"""
+        router, _ = token_route
+        route = router.get(f"{settings.ARCGIS_BASE_URL}/query").mock(
+            return_value=httpx.Response(200, json={"objectIdFieldName": "OBJECTID", "objectIds": [2, 1]})
+        )
+
+        assert await service.query_spk("SPK1") == [1, 2]
+        assert route.calls.last.request.url.params["returnIdsOnly"] == "true"
+
+    async def test_check_spk_exists_counts_only(self, service, token_route):
+        """Test existence check without OIDs uses a count-only query"""
+        router, _ = token_route
+        route = router.get(f"{settings.ARCGIS_BASE_URL}/query").mock(
+            return_value=httpx.Response(200, json={"count": 3})
+        )
+
+        result = await service.check_spk_exists("SPK1", include_oids=False)
+
+        assert result == {"exists": True, "count": 3, "spk": "SPK1", "oids": []}
+        assert route.calls.last.request.url.params["returnCountOnly"] == "true"
+
+    async def test_delete_spk_not_found(self, service, token_route):
+        """Test deleting a missing SPK raises SPKNotFoundError"""
+        router, _ = token_route
+        router.get(f"{settings.ARCGIS_BASE_URL}/query").mock(
+            return_value=httpx.Response(200, json={"objectIds": None})
+        )
+
+        with pytest.raises(SPKNotFoundError):
+            await service.delete_spk("SPK1")
+
+    async def test_apply_edits_maps_attributes(self, service, token_route):
+        """Test generated features are mapped onto FeatureServer attributes"""
+        router, _ = token_route
+        route = router.post(f"{settings.ARCGIS_BASE_URL}/applyEdits").mock(
+            return_value=httpx.Response(200, json={"addResults": [{"objectId": 9, "success": True}]})
+        )
+        upload_response = {"featureCollection": {"layers": [{"featureSet": {"features": [{
+            "geometry": {"paths": [[[0, 0], [1, 1]]]},
+            "attributes": {"Name": "Z1", "Flight_Con": "D1", "StarFlight": "2025-01-01 10:00:00"}
+        }]}}]}}
+
+        result = await service.apply_edits(upload_response, "SPK1", "KEY1")
+
+        assert result["features_added"] == 1
+        body = route.calls.last.request.content.decode()
+        assert "FlightID" in body and "SPK1" in body
+
+    async def test_query_spk_served_from_index(self, service, token_route):
+        """Test a fresh index entry answers without a token or query round trip"""
+        router, token = token_route
+        route = router.get(f"{settings.ARCGIS_BASE_URL}/query").mock(
+            return_value=httpx.Response(200, json={"objectIds": [4, 3]})
+        )
+
+        assert await service.query_spk("SPK1") == [3, 4]
+        calls = route.call_count
+        assert await service.query_spk("SPK1") == [3, 4]
+        assert (await service.check_spk_exists("SPK1"))["count"] == 2
+
+        assert route.call_count == calls
+        assert token.call_count == 3
+
+    async def test_reconcile_refreshes_stale_entries(self, service, token_route, spk_index):
+        """Test the reconcile pass re-queries SPKs whose entries are aging"""
+        router, _ = token_route
+        router.get(f"{settings.ARCGIS_BASE_URL}/query").mock(
+            return_value=httpx.Response(200, json={"objectIds": [9]})
+        )
+        spk_index.reconcile(settings.ARCGIS_BASE_URL, "SPK1", [1])
+        spk_index.max_age = 0
+
+        assert await service.reconcile_spk_index() == 1
+
+        spk_index.max_age = 60
+        assert spk_index.lookup(settings.ARCGIS_BASE_URL, "SPK1") == [9]
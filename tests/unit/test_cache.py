@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+
+from app.utils.cache import TTLCache, AsyncTTLCache
+
+
+class TestTTLCache:
+    def test_get_set(self):
+        """Test fresh values are returned and counted as hits"""
+        cache = TTLCache(ttl=60, max_entries=10)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted at the size bound"""
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_expiry(self):
+        """Test entries past their TTL are not served"""
+        cache = TTLCache(ttl=0, max_entries=10)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+
+    def test_invalidate(self):
+        """Test predicate invalidation removes only matching keys"""
+        cache = TTLCache(ttl=60, max_entries=10)
+        cache.set(("v1", "x"), 1)
+        cache.set(("v1", "y"), 2)
+        cache.set(("v2", "x"), 3)
+
+        assert cache.invalidate(lambda k: k[0] == "v1") == 2
+        assert cache.get(("v2", "x")) == 3
+
+
+class TestAsyncTTLCache:
+    async def test_concurrent_misses_share_one_load(self):
+        """Test concurrent misses for one key call the loader once"""
+        cache = AsyncTTLCache(ttl=60, max_entries=10)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+        assert results == ["value"] * 5
+        assert len(calls) == 1
+
+    async def test_stale_while_revalidate(self):
+        """Test stale entries are served while a background refresh runs"""
+        cache = AsyncTTLCache(ttl=0, max_entries=10, stale_ttl=60)
+        cache.set("k", "old")
+
+        async def loader():
+            return "new"
+
+        assert await cache.get_or_load("k", loader) == "old"
+        await asyncio.sleep(0.01)
+        assert await cache.get_or_load("k", loader) == "new"
+        assert cache.stats()["stale_hits"] == 2
+
+    async def test_load_error_propagates(self):
+        """Test loader errors reach the caller and are not cached"""
+        cache = AsyncTTLCache(ttl=60, max_entries=10)
+
+        async def loader():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("k", loader)
+        assert len(cache) == 0
@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+import httpx
+import respx
+
+from app.services.concurrency import AdaptiveLimiter, LimitedClient
+
+URL = "https://arcgis.test/FeatureServer/0/query"
+
+
+@pytest.fixture
+def limiter():
+    return AdaptiveLimiter(initial=4, min_limit=1, max_limit=8, backoff=0.5, latency_tolerance=2.0, latency_floor=0.0)
+
+
+class TestAdaptiveLimiter:
+    def test_healthy_latency_grows_limit(self, limiter):
+        """Test the limit grows by about one slot per round of healthy responses"""
+        for _ in range(5):
+            limiter.record_success("query", 0.1)
+
+        assert limiter.current_limit == 5
+
+    def test_limit_capped_at_max(self, limiter):
+        """Test the limit never exceeds max_limit"""
+        for _ in range(200):
+            limiter.record_success("query", 0.1)
+
+        assert limiter.current_limit == 8
+
+    def test_overload_cuts_once_per_round_trip(self, limiter):
+        """Test a burst of failures within one round trip halves the limit once"""
+        limiter.record_success("query", 10.0)
+        limiter.record_overload()
+        limiter.record_overload()
+
+        assert limiter.current_limit == 2
+        assert limiter.stats()["overloads"] == 2
+
+    def test_slow_response_backs_off(self, limiter):
+        """Test latency far above the endpoint baseline reduces the limit"""
+        limiter.record_success("query", 0.1)
+        before = limiter.limit
+        limiter.record_success("query", 1.0)
+
+        assert limiter.limit < before
+
+    def test_baselines_are_per_endpoint(self, limiter):
+        """Test a slow endpoint is not judged against a fast one's baseline"""
+        limiter.record_success("query", 0.1)
+        before = limiter.limit
+        limiter.record_success("generate", 5.0)
+
+        assert limiter.limit > before
+
+    async def test_acquire_waits_for_free_slot(self):
+        """Test callers beyond the limit wait until a slot is released"""
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert limiter.stats()["waiting"] == 1
+
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 1
+
+    async def test_cancelled_wakeup_is_passed_on(self):
+        """Test a woken waiter cancelled before it resumes hands its slot to the next waiter"""
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+        first = asyncio.ensure_future(limiter.acquire())
+        second = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.release()
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+
+        assert first.cancelled()
+        assert limiter.in_flight == 1
+        assert limiter.stats()["waiting"] == 0
+
+
+class TestLimitedClient:
+    @respx.mock
+    async def test_error_signals_count_as_overload(self, limiter):
+        """Test 429/5xx and ArcGIS error bodies are overloads, success is a latency sample"""
+        respx.get(URL).mock(side_effect=[
+            httpx.Response(200, json={"count": 1}),
+            httpx.Response(429),
+            httpx.Response(200, json={"error": {"code": 500, "message": "busy"}}),
+        ])
+        client = LimitedClient(httpx.AsyncClient(), limiter)
+
+        for _ in range(3):
+            await client.get(URL)
+
+        stats = limiter.stats()
+        assert stats["successes"] == 1
+        assert stats["overloads"] == 2
+        assert stats["latency"]["samples"] == 1
+        assert stats["in_flight"] == 0
+
+    @respx.mock
+    async def test_client_error_bodies_leave_limit_alone(self, limiter):
+        """Test ArcGIS errors such as invalid queries or expired tokens are not overloads"""
+        respx.get(URL).mock(side_effect=[
+            httpx.Response(200, json={"error": {"code": 400, "message": "Invalid where clause"}}),
+            httpx.Response(200, json={"error": {"code": 498, "message": "Invalid token"}}),
+        ])
+        client = LimitedClient(httpx.AsyncClient(), limiter)
+        before = limiter.limit
+
+        for _ in range(2):
+            await client.get(URL)
+
+        assert limiter.limit == before
+        assert limiter.stats()["overloads"] == 0
+        assert limiter.stats()["errors"] == 2
+
+    @respx.mock
+    async def test_timeout_counts_as_overload(self, limiter):
+        """Test timeouts release the slot, cut the limit and propagate"""
+        respx.get(URL).mock(side_effect=httpx.ReadTimeout("slow"))
+        client = LimitedClient(httpx.AsyncClient(), limiter)
+
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get(URL)
+
+        assert limiter.current_limit == 2
+        assert limiter.in_flight == 0
+
+    @respx.mock
+    async def test_dropped_connection_counts_as_overload(self, limiter):
+        """Test refused connections cut the limit like timeouts"""
+        respx.get(URL).mock(side_effect=httpx.ConnectError("refused"))
+        client = LimitedClient(httpx.AsyncClient(), limiter)
+
+        with pytest.raises(httpx.ConnectError):
+            await client.get(URL)
+
+        assert limiter.stats()["overloads"] == 1
+        assert limiter.in_flight == 0
+
+    @respx.mock
+    async def test_stream_releases_slot_at_headers(self):
+        """Test limited calls made while reading a streamed body do not deadlock at limit 1"""
+        respx.post(URL).mock(return_value=httpx.Response(200, json={"features": []}))
+        respx.get(URL).mock(return_value=httpx.Response(200, json={"count": 1}))
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+        client = LimitedClient(httpx.AsyncClient(), limiter)
+
+        async def consume():
+            async with client.stream("POST", URL) as response:
+                await client.get(URL)
+                await response.aread()
+
+        await asyncio.wait_for(consume(), 1)
+        assert limiter.in_flight == 0
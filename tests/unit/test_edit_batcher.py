@@ -0,0 +1,137 @@
+import asyncio
+import json
+import pytest
+
+from app.core.exceptions import ArcGISUploadError
+from app.services.edit_batcher import ApplyEditsBatcher
+
+
+def make_adds(n):
+    return [{"geometry": None, "attributes": {"FlightID": f"F{i}"}} for i in range(n)]
+
+
+class TestApplyEditsBatcher:
+    def test_chunk_by_count(self):
+        """Test chunks never exceed the feature count limit"""
+        batcher = ApplyEditsBatcher(None, max_features=3, max_bytes=10_000, concurrency=1)
+        chunks = batcher.chunk(["{}"] * 7)
+        assert [len(c) for c in chunks] == [3, 3, 1]
+
+    def test_chunk_by_bytes(self):
+        """Test chunks are split when the serialized size limit is reached"""
+        batcher = ApplyEditsBatcher(None, max_features=100, max_bytes=25, concurrency=1)
+        chunks = batcher.chunk(["x" * 10] * 4)
+        assert [len(c) for c in chunks] == [2, 2]
+
+    async def test_submit_adds_merges_in_order(self):
+        """Test addResults from concurrent chunks are merged in input order"""
+        async def submit(payload):
+            adds = json.loads(payload["adds"])
+            return {"addResults": [
+                {"objectId": int(a["attributes"]["FlightID"][1:]), "success": True} for a in adds
+            ]}
+
+        batcher = ApplyEditsBatcher(submit, max_features=2, max_bytes=10_000, concurrency=3)
+        result = await batcher.submit_adds(make_adds(5))
+
+        assert result["batches"] == 3
+        assert result["added"] == 5
+        assert [r["objectId"] for r in result["addResults"]] == [0, 1, 2, 3, 4]
+        assert result["failed"] == []
+
+    async def test_submit_adds_reports_failed_features(self):
+        """Test a failing chunk only fails the features it carried"""
+        async def submit(payload):
+            adds = json.loads(payload["adds"])
+            if adds[0]["attributes"]["FlightID"] == "F2":
+                raise ArcGISUploadError("Apply edits failed: 500")
+            results = [{"objectId": 1, "success": True} for _ in adds]
+            if adds[0]["attributes"]["FlightID"] == "F0":
+                results[1] = {"objectId": None, "success": False, "error": {"code": 1000}}
+            return {"addResults": results}
+
+        batcher = ApplyEditsBatcher(submit, max_features=2, max_bytes=10_000, concurrency=2)
+        result = await batcher.submit_adds(make_adds(4))
+
+        assert result["added"] == 1
+        assert [f["flight_id"] for f in result["failed"]] == ["F1", "F2", "F3"]
+        assert "500" in result["failed"][1]["error"]["description"]
+
+    async def test_submit_deletes(self):
+        """Test deletes are sent as comma-separated OBJECTID chunks"""
+        sent = []
+
+        async def submit(payload):
+            sent.append(payload["deletes"])
+            return {"deleteResults": [
+                {"objectId": int(oid), "success": True} for oid in payload["deletes"].split(",")
+            ]}
+
+        batcher = ApplyEditsBatcher(submit, max_features=2, max_bytes=10_000, concurrency=2)
+        result = await batcher.submit_deletes([10, 11, 12])
+
+        assert sorted(sent) == ["10,11", "12"]
+        assert result["deleted"] == 3
+        assert result["failed"] == []
+
+    async def test_submit_adds_stream_bounds_in_flight(self):
+        """Test streamed adds are batched with at most `concurrency` batches outstanding"""
+        state = {"produced": 0, "done": 0, "in_flight": 0, "peak": 0, "held": 0}
+
+        async def stream():
+            for add in make_adds(9):
+                state["produced"] += 1
+                yield add
+
+        async def submit(payload):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            adds = json.loads(payload["adds"])
+            state["done"] += len(adds)
+            return {"addResults": [
+                {"objectId": int(a["attributes"]["FlightID"][1:]), "success": a["attributes"]["FlightID"] != "F4"}
+                for a in adds
+            ]}
+
+        batcher = ApplyEditsBatcher(submit, max_features=2, max_bytes=10_000, concurrency=2)
+        result = await batcher.submit_adds_stream(stream())
+
+        assert result["batches"] == 5
+        assert [r["objectId"] for r in result["addResults"]] == list(range(9))
+        assert [(f["index"], f["flight_id"]) for f in result["failed"]] == [(4, "F4")]
+        assert state["peak"] == 2
+        # Two batches in flight plus the one being filled
+        assert state["held"] <= 2 * 2 + 2 + 1
+
+    async def test_submit_adds_stream_batch_hooks(self):
+        """Test every batch is reported before sending and only successful batches are reported committed"""
+        events = []
+
+        async def stream():
+            for add in make_adds(5):
+                yield add
+
+        async def submit(payload):
+            adds = json.loads(payload["adds"])
+            if adds[0]["attributes"]["FlightID"] == "F2":
+                raise ArcGISUploadError("502 Bad Gateway")
+            return {"addResults": [{"objectId": 10, "success": True} for _ in adds]}
+
+        async def sent(index, flight_ids):
+            events.append(("sent", index, flight_ids))
+
+        async def committed(index, flight_ids, results):
+            events.append(("committed", index, flight_ids, [r["objectId"] for r in results]))
+
+        batcher = ApplyEditsBatcher(submit, max_features=2, max_bytes=10_000, concurrency=1)
+        result = await batcher.submit_adds_stream(stream(), on_batch_sent=sent, on_batch_committed=committed, start_index=4)
+
+        assert [f["flight_id"] for f in result["failed"]] == ["F2", "F3"]
+        assert [e for e in events if e[0] == "sent"] == [
+            ("sent", 4, ["F0", "F1"]), ("sent", 5, ["F2", "F3"]), ("sent", 6, ["F4"])
+        ]
+        assert [e for e in events if e[0] == "committed"] == [
+            ("committed", 4, ["F0", "F1"], [10, 10]), ("committed", 6, ["F4"], [10])
+        ]
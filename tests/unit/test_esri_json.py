@@ -0,0 +1,59 @@
+import math
+import pytest
+import geopandas as gpd
+from shapely.geometry import LineString, MultiLineString, Polygon
+
+from app.services.arcgis_service import ArcGISService
+from app.services.esri_json import EsriJSONEncoder
+
+
+@pytest.fixture
+def zones_gdf():
+    return gpd.GeoDataFrame({
+        "Name": ["Z1", "Z2", "Z3"],
+        "Flight_Con": ["D1", "D2", "D3"],
+        "Task_Area": [1.5, float("nan"), 2.0],
+        "StarFlight": ["2025-01-01 10:00:00", "", "2025-01-02 11:00:00"],
+        "geometry": [
+            LineString([(106.0, -6.0), (106.1, -6.1)]),
+            MultiLineString([[(0, 0), (1, 1)], [(2, 2), (3, 3), (4, 4)]]),
+            Polygon([(0, 0), (1, 0), (1, 1), (0, 0)]),
+        ],
+    }, crs="EPSG:4326")
+
+
+class TestEsriJSONEncoder:
+    def test_encode_paths(self, zones_gdf):
+        """Test lines, multi-lines and polygon rings become Esri paths"""
+        features = EsriJSONEncoder.encode(zones_gdf)
+
+        assert features[0]["geometry"]["paths"] == [[[106.0, -6.0], [106.1, -6.1]]]
+        assert len(features[1]["geometry"]["paths"]) == 2
+        assert len(features[1]["geometry"]["paths"][1]) == 3
+        assert features[2]["geometry"]["paths"][0][0] == features[2]["geometry"]["paths"][0][-1]
+        assert features[0]["geometry"]["spatialReference"] == {"wkid": 4326}
+
+    def test_encode_attributes(self, zones_gdf):
+        """Test attributes become JSON-safe Python values"""
+        features = EsriJSONEncoder.encode(zones_gdf)
+
+        assert features[0]["attributes"]["Name"] == "Z1"
+        assert features[1]["attributes"]["Task_Area"] is None
+        assert isinstance(features[2]["attributes"]["Task_Area"], float)
+
+    def test_reprojects_to_wgs84(self, zones_gdf):
+        """Test non-WGS84 input is reprojected before encoding"""
+        projected = zones_gdf.iloc[[0]].to_crs(epsg=3857)
+        x, y = EsriJSONEncoder.encode(projected)[0]["geometry"]["paths"][0][0]
+
+        assert math.isclose(x, 106.0, abs_tol=1e-9)
+        assert math.isclose(y, -6.0, abs_tol=1e-9)
+
+    def test_matches_generate_attribute_mapping(self, zones_gdf):
+        """Test encoded features map onto the layer schema like generate output"""
+        adds = ArcGISService.build_adds(EsriJSONEncoder.encode(zones_gdf), "SPK1", "KEY1")
+
+        assert adds[0]["attributes"]["FlightID"] == "Z1"
+        assert adds[0]["attributes"]["DroneID"] == "D1"
+        assert adds[0]["attributes"]["TaskArea"] == 1.5
+        assert adds[0]["attributes"]["SPKNumber"] == "SPK1"
@@ -0,0 +1,74 @@
+import pytest
+import httpx
+import respx
+
+from app.core.exceptions import ArcGISUploadError
+from app.services.feature_query import FeatureQueryEngine
+
+LAYER_URL = "https://arcgis.test/FeatureServer/0"
+
+
+def fake_layer(total, max_record_count):
+    """Simulate a layer that caps every page at max_record_count"""
+    def handler(request):
+        params = request.url.params
+        if params.get("returnCountOnly") == "true":
+            return httpx.Response(200, json={"count": total})
+        if params.get("returnIdsOnly") == "true":
+            return httpx.Response(200, json={"objectIds": list(range(total, 0, -1))})
+
+        offset = int(params["resultOffset"])
+        wanted = int(params["resultRecordCount"])
+        end = min(offset + min(wanted, max_record_count), total)
+        features = [{"attributes": {"OBJECTID": i + 1}} for i in range(offset, end)]
+        return httpx.Response(200, json={
+            "features": features,
+            "exceededTransferLimit": end < total and end - offset < wanted,
+        })
+    return handler
+
+
+@pytest.fixture
+def engine():
+    return FeatureQueryEngine(httpx.AsyncClient(), LAYER_URL, "tok", page_size=10, concurrency=3, query_format="json")
+
+
+class TestFeatureQueryEngine:
+    async def test_count_only(self, engine):
+        """Test count uses returnCountOnly"""
+        with respx.mock:
+            route = respx.get(f"{LAYER_URL}/query").mock(side_effect=fake_layer(42, 1000))
+            assert await engine.count("1=1") == 42
+            assert route.calls.last.request.url.params["returnCountOnly"] == "true"
+
+    async def test_object_ids(self, engine):
+        """Test ID-only query returns sorted OBJECTIDs"""
+        with respx.mock:
+            respx.get(f"{LAYER_URL}/query").mock(side_effect=fake_layer(3, 1000))
+            assert await engine.object_ids("1=1") == [1, 2, 3]
+
+    async def test_features_pages_past_max_record_count(self, engine):
+        """Test paging returns every feature even when the server caps pages"""
+        with respx.mock:
+            route = respx.get(f"{LAYER_URL}/query").mock(side_effect=fake_layer(25, 4))
+            features = await engine.features("1=1", "OBJECTID")
+
+        assert [f["attributes"]["OBJECTID"] for f in features] == list(range(1, 26))
+        # 1 count + 3 windows of 10, each split into pages of 4
+        assert route.call_count == 1 + 3 + 3 + 2
+
+    async def test_features_empty(self, engine):
+        """Test no page queries are issued when the count is zero"""
+        with respx.mock:
+            route = respx.get(f"{LAYER_URL}/query").mock(side_effect=fake_layer(0, 1000))
+            assert await engine.features("1=1") == []
+            assert route.call_count == 1
+
+    async def test_error_body_raises(self, engine):
+        """Test ArcGIS JSON error bodies raise ArcGISUploadError"""
+        with respx.mock:
+            respx.get(f"{LAYER_URL}/query").mock(
+                return_value=httpx.Response(200, json={"error": {"code": 400, "message": "Invalid query"}})
+            )
+            with pytest.raises(ArcGISUploadError, match="Invalid query"):
+                await engine.count("bad")
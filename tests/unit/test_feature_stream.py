@@ -0,0 +1,61 @@
+import json
+import pytest
+import httpx
+
+from app.core.exceptions import ArcGISUploadError
+from app.services.feature_stream import (
+    FeatureStreamDecoder,
+    GENERATE_FEATURES,
+    iter_response_features
+)
+
+
+def chunked(body, size=7):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestFeatureStreamDecoder:
+    def test_features_emitted_across_chunk_boundaries(self):
+        """Test features are decoded incrementally from arbitrarily split chunks"""
+        features = [{"attributes": {"OBJECTID": i, "Area": 1.5}, "geometry": {"paths": [[[106.1, -6.2]]]}} for i in range(3)]
+        body = json.dumps({"features": features, "exceededTransferLimit": True}).encode()
+
+        decoder = FeatureStreamDecoder()
+        decoded = []
+        for chunk in chunked(body):
+            decoded.extend(decoder.feed(chunk))
+        decoded.extend(decoder.close())
+
+        assert decoded == features
+        assert isinstance(decoded[0]["attributes"]["Area"], float)
+        assert decoder.metadata["exceededTransferLimit"] is True
+
+    def test_generate_prefix(self):
+        """Test features are found inside a featureCollection generate response"""
+        body = json.dumps({"featureCollection": {"layers": [{
+            "layerDefinition": {"name": "x"},
+            "featureSet": {"features": [{"attributes": {"Name": "Z1"}}]},
+        }]}}).encode()
+
+        decoder = FeatureStreamDecoder(GENERATE_FEATURES)
+        decoded = decoder.feed(body) + decoder.close()
+
+        assert decoded == [{"attributes": {"Name": "Z1"}}]
+
+    def test_error_body(self):
+        """Test an ArcGIS error body is captured and raised"""
+        decoder = FeatureStreamDecoder()
+        decoder.feed(b'{"error": {"code": 498, "message": "Invalid token"}}')
+        decoder.close()
+
+        with pytest.raises(ArcGISUploadError, match="Invalid token"):
+            decoder.raise_for_error("Query")
+
+
+class TestIterResponseFeatures:
+    async def test_http_error_raises(self):
+        """Test non-2xx responses raise before decoding"""
+        response = httpx.Response(500, content=b"boom")
+
+        with pytest.raises(ArcGISUploadError, match="500"):
+            [f async for f in iter_response_features(response, FeatureStreamDecoder(), "Query")]
@@ -1,6 +1,9 @@
+import hashlib
+import io
 import pytest
+from fastapi import UploadFile
 from app.utils.file_utils import FileUtils
-from app.core.exceptions import InvalidFileFormatError
+from app.core.exceptions import InvalidFileFormatError, UploadTooLargeError
 from pathlib import Path
 import zipfile
 
@@ -45,3 +48,24 @@ class TestFileUtils:
 
         FileUtils.cleanup_work_dir(temp_work_dir)
         assert not temp_work_dir.exists()
+
+    async def test_persist_upload_hashes_while_copying(self, temp_work_dir, monkeypatch):
+        """Test uploads are copied in chunks and hashed on the way"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 7)
+        data = b"zones " * 100
+        upload = UploadFile(file=io.BytesIO(data), filename="data.zip")
+
+        path, digest = await FileUtils.persist_upload(upload, temp_work_dir)
+
+        assert path.read_bytes() == data
+        assert digest == hashlib.sha256(data).hexdigest()
+
+    async def test_persist_upload_stops_at_limit(self, temp_work_dir):
+        """Test an oversized upload is refused with 413 and leaves no partial file"""
+        upload = UploadFile(file=io.BytesIO(b"x" * 5000), filename="big.zip")
+
+        with pytest.raises(UploadTooLargeError) as exc:
+            await FileUtils.persist_upload(upload, temp_work_dir, max_bytes=1000)
+        assert exc.value.status_code == 413
+        assert not (temp_work_dir / "big.zip").exists()
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.services.generate_cache import GenerateCache, generate_cache_key
+
+
+@pytest.fixture
+def zip_file(tmp_path):
+    path = tmp_path / "final_upload.zip"
+    path.write_bytes(b"PK zones")
+    return path
+
+
+def store(cache, key, features):
+    writer = cache.writer(key)
+    for feature in features:
+        writer.write(feature)
+    writer.commit()
+
+
+class TestGenerateCacheKey:
+    def test_key_covers_content_and_params(self, tmp_path, zip_file):
+        """Test the key follows the ZIP bytes and the parameters, not the file name or key order"""
+        copy = tmp_path / "copy.zip"
+        copy.write_bytes(zip_file.read_bytes())
+        key = generate_cache_key(zip_file, {"a": 1, "b": 2})
+
+        assert generate_cache_key(copy, {"b": 2, "a": 1}) == key
+        assert generate_cache_key(zip_file, {"a": 1, "b": 3}) != key
+        zip_file.write_bytes(b"PK other")
+        assert generate_cache_key(zip_file, {"a": 1, "b": 2}) != key
+
+    def test_known_hash_skips_reading(self, tmp_path, zip_file):
+        """Test a precomputed sha256 gives the same key without opening the file"""
+        key = generate_cache_key(zip_file, {"a": 1})
+        content_hash = hashlib.sha256(zip_file.read_bytes()).hexdigest()
+
+        assert generate_cache_key(tmp_path / "missing.zip", {"a": 1}, content_hash) == key
+
+
+class TestGenerateCache:
+    def test_round_trip(self, tmp_path):
+        """Test committed features read back in order and are counted as hits"""
+        cache = GenerateCache(str(tmp_path / "cache"), ttl=60, max_bytes=10_000)
+        features = [{"attributes": {"Name": f"Z{i}"}, "geometry": {"paths": [[[106.0, -6.0]]]}} for i in range(3)]
+        store(cache, "k", features)
+
+        assert list(cache.read(cache.get("k"))) == features
+        assert cache.get("missing") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_discarded_writes_are_not_visible(self, tmp_path):
+        """Test an abandoned writer leaves no entry and no temporary file"""
+        cache = GenerateCache(str(tmp_path / "cache"), ttl=60, max_bytes=10_000)
+        writer = cache.writer("k")
+        writer.write({"attributes": {}})
+        writer.discard()
+
+        assert cache.get("k") is None
+        assert list((tmp_path / "cache").iterdir()) == []
+
+    def test_ttl_and_size_cap(self, tmp_path):
+        """Test expired entries miss and the oldest entries go first when over the size cap"""
+        cache = GenerateCache(str(tmp_path / "cache"), ttl=60, max_bytes=100)
+        store(cache, "old", [{"attributes": {"Name": "x" * 40}}])
+        past = time.time() - 30
+        os.utime(cache.directory / "old.jsonl", (past, past))
+        store(cache, "new", [{"attributes": {"Name": "y" * 40}}])
+        store(cache, "newest", [{"attributes": {"Name": "z" * 40}}])
+
+        assert cache.get("old") is None
+        assert cache.get("newest") is not None
+
+        cache.ttl = 0
+        assert cache.get("newest") is None
@@ -0,0 +1,96 @@
+import pytest
+import httpx
+import respx
+
+from app.core.config import settings
+from app.services.async_arcgis_service import AsyncArcGISService
+from app.services.hierarchy import VendorHierarchy
+from app.services.pbf import PBF_CONTENT_TYPE, encode_feature_result
+
+ROWS = [
+    {"Region": "R1", "District": "D1", "Petak": "P1", "SPKNumber": "SPK2", "Activity": "Spray"},
+    {"Region": "R1", "District": "D1", "Petak": "P1", "SPKNumber": "SPK1", "Activity": "Spray"},
+    {"Region": "R1", "District": "D2", "Petak": "P2", "SPKNumber": "SPK3", "Activity": "Fert"},
+    {"Region": "R2", "District": "D3", "Petak": "P3", "SPKNumber": None, "Activity": None},
+    {"Region": "", "District": "D9", "Petak": "P9", "SPKNumber": "SPK9", "Activity": "X"},
+]
+
+
+class TestVendorHierarchy:
+    def test_cascade_lookups(self):
+        """Test each cascade level is served from the tree"""
+        tree = VendorHierarchy(ROWS)
+
+        assert tree.regions() == ["R1", "R2"]
+        assert tree.districts("R1") == ["D1", "D2"]
+        assert tree.petaks("D1") == ["P1"]
+        assert tree.spk_numbers("P1") == [
+            {"spk_number": "SPK1", "activity": "Spray"},
+            {"spk_number": "SPK2", "activity": "Spray"},
+        ]
+        assert tree.spk_numbers("P3") == []
+
+    def test_unknown_keys_return_empty(self):
+        """Test lookups for unknown keys return empty lists"""
+        tree = VendorHierarchy(ROWS)
+
+        assert tree.districts("nope") == []
+        assert tree.petaks("nope") == []
+
+    def test_levels_indexed_independently(self):
+        """Test a row missing an upper level still answers the lookups below it"""
+        tree = VendorHierarchy(ROWS + [
+            {"Region": "R1", "District": "D4", "Petak": None, "SPKNumber": None, "Activity": None},
+        ])
+
+        assert tree.regions() == ["R1", "R2"]
+        assert tree.districts("R1") == ["D1", "D2", "D4"]
+        assert tree.petaks("D4") == []
+        assert tree.petaks("D9") == ["P9"]
+        assert tree.spk_numbers("P9") == [{"spk_number": "SPK9", "activity": "X"}]
+
+    def test_to_dict(self):
+        """Test nested export of the whole hierarchy"""
+        regions = VendorHierarchy(ROWS).to_dict()
+
+        assert [r["region"] for r in regions] == ["R1", "R2"]
+        assert regions[0]["districts"][1]["petaks"][0]["spk_numbers"][0]["spk_number"] == "SPK3"
+
+
+class TestHierarchyLoader:
+    async def test_loads_all_pages_once(self):
+        """Test loader pages through results and caches the tree per vendor"""
+        AsyncArcGISService.invalidate_dashboard_cache()
+        pages = [
+            encode_feature_result([{"attributes": r} for r in ROWS[:2]], exceeded_transfer_limit=True),
+            encode_feature_result([{"attributes": r} for r in ROWS[2:]]),
+        ]
+
+        with respx.mock:
+            respx.post(settings.ARCGIS_TOKEN_URL).mock(return_value=httpx.Response(200, json={"token": "t"}))
+            query = respx.get(f"{settings.ARCGIS_DASHBOARD_URL}/query").mock(
+                side_effect=[httpx.Response(200, content=p, headers={"content-type": PBF_CONTENT_TYPE}) for p in pages]
+            )
+            service = AsyncArcGISService(client=httpx.AsyncClient())
+
+            assert await service.get_regions("V1") == ["R1", "R2"]
+            assert await service.get_petaks("V1", "D2") == ["P2"]
+
+        assert query.call_count == 2
+        assert query.calls[1].request.url.params["resultOffset"] == "2"
+        assert query.calls[1].request.url.params["f"] == "pbf"
+        AsyncArcGISService.invalidate_dashboard_cache()
+
+    async def test_query_dashboard_falls_back_to_json(self):
+        """Test ad-hoc dashboard queries are async and retry as f=json when pbf is rejected"""
+        with respx.mock:
+            respx.post(settings.ARCGIS_TOKEN_URL).mock(return_value=httpx.Response(200, json={"token": "t"}))
+            query = respx.get(f"{settings.ARCGIS_DASHBOARD_URL}/query").mock(side_effect=[
+                httpx.Response(200, json={"error": {"code": 400, "message": "Invalid format"}}),
+                httpx.Response(200, json={"features": [{"attributes": {"Region": "R1"}}]}),
+            ])
+            service = AsyncArcGISService(client=httpx.AsyncClient())
+
+            assert await service.query_dashboard("VendorCode='V1'", "Region") == [{"Region": "R1"}]
+
+        assert [call.request.url.params["f"] for call in query.calls] == ["pbf", "json"]
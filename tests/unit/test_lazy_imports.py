@@ -0,0 +1,14 @@
+import json
+import subprocess
+import sys
+
+from benchmarks.bench_cold_start import HEAVY
+
+
+class TestLazyImports:
+    def test_app_import_skips_heavy_stacks(self):
+        """Test importing the app (and so every router) leaves the heavy stacks for first use"""
+        code = f"import json, sys, app.main; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+        assert json.loads(out.strip().splitlines()[-1]) == []
@@ -0,0 +1,77 @@
+import gzip
+import json
+from urllib.parse import parse_qs
+
+import httpx
+import respx
+
+from app.core.config import settings
+from app.services import async_arcgis_service
+from app.services.async_arcgis_service import AsyncArcGISService
+from app.services.payload import dumps, encode_form, quantize_features
+
+
+class TestPayload:
+    def test_dumps_is_compact(self):
+        """Test JSON output has no whitespace separators"""
+        assert dumps({"a": [1, 2]}) == '{"a":[1,2]}'
+
+    def test_quantize_features(self):
+        """Test coordinates are rounded to the configured precision"""
+        features = [{"geometry": {"paths": [[[106.123456789, -6.987654321]]]}}]
+        quantize_features(features, 5)
+        assert features[0]["geometry"]["paths"] == [[[106.12346, -6.98765]]]
+
+    def test_encode_form_gzip_round_trip(self):
+        """Test compressed bodies decode back to the same form payload"""
+        payload = {"f": "json", "adds": dumps([{"attributes": {"FlightID": "F1"}}] * 50)}
+        body, headers, raw_size = encode_form(payload, compress=True)
+
+        assert headers["Content-Encoding"] == "gzip"
+        assert len(body) < raw_size
+        assert parse_qs(gzip.decompress(body).decode())["adds"][0] == payload["adds"]
+
+
+class TestCompressedApplyEdits:
+    async def test_reports_sizes_and_falls_back_when_gzip_rejected(self, monkeypatch):
+        """Test a rejected gzip body is resent plain and sizes are reported"""
+        monkeypatch.setattr(settings, "ARCGIS_GZIP_REQUESTS", True)
+        async_arcgis_service._gzip_rejected.clear()
+
+        def handler(request):
+            if request.headers.get("Content-Encoding") == "gzip":
+                return httpx.Response(200, json={"error": {"code": 400, "message": "Unable to parse"}})
+            adds = json.loads(parse_qs(request.content.decode())["adds"][0])
+            return httpx.Response(200, json={"addResults": [{"objectId": 1, "success": True} for _ in adds]})
+
+        with respx.mock:
+            respx.post(settings.ARCGIS_TOKEN_URL).mock(return_value=httpx.Response(200, json={"token": "t"}))
+            route = respx.post(f"{settings.ARCGIS_BASE_URL}/applyEdits").mock(side_effect=handler)
+            service = AsyncArcGISService(client=httpx.AsyncClient())
+
+            features = [{"geometry": {"paths": [[[0, 0], [1, 1]]]}, "attributes": {"Name": "Z1"}}]
+            result = await service.apply_features(features, "SPK1", "KEY1")
+
+        assert result["features_added"] == 1
+        assert route.call_count == 2
+        assert result["payload"]["gzip"] is False
+        assert result["payload"]["raw_bytes"] == result["payload"]["compressed_bytes"] > 0
+        assert settings.ARCGIS_BASE_URL in async_arcgis_service._gzip_rejected
+        async_arcgis_service._gzip_rejected.clear()
+
+    async def test_other_errors_pass_through(self, monkeypatch):
+        """Test error bodies unrelated to the encoding are neither retried nor disable gzip"""
+        monkeypatch.setattr(settings, "ARCGIS_GZIP_REQUESTS", True)
+        async_arcgis_service._gzip_rejected.clear()
+        error = {"error": {"code": 400, "message": "Cannot perform operation. Invalid geometry."}}
+
+        with respx.mock:
+            route = respx.post(f"{settings.ARCGIS_BASE_URL}/applyEdits").mock(
+                return_value=httpx.Response(200, json=error)
+            )
+            service = AsyncArcGISService(client=httpx.AsyncClient())
+            response = await service._post_edits("t", {"f": "json", "adds": "[]"}, service._payload_stats())
+
+        assert response.json() == error
+        assert route.call_count == 1
+        assert settings.ARCGIS_BASE_URL not in async_arcgis_service._gzip_rejected
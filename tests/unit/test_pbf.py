@@ -0,0 +1,142 @@
+import pytest
+import httpx
+import respx
+
+from app.core.exceptions import ArcGISUploadError
+from app.services import feature_query
+from app.services.feature_query import FeatureQueryEngine
+from app.services.pbf import (
+    PBF_CONTENT_TYPE,
+    PBFDecodeError,
+    decode_geodataframe,
+    decode_query_result,
+    encode_count,
+    encode_feature_result,
+    encode_object_ids,
+    to_geodataframe
+)
+
+LAYER_URL = "https://arcgis.test/FeatureServer/0"
+
+
+def polyline(i):
+    return {
+        "attributes": {"OBJECTID": i, "FlightID": f"F{i}", "TaskArea": 1.25, "Active": True, "Note": None, "Offset": -3},
+        "geometry": {"paths": [[[round(106.1 + i * 1e-3, 6), -6.2], [106.2, -6.25]], [[106.3, -6.3], [106.31, -6.31]]]},
+    }
+
+
+def pbf_response(body):
+    return httpx.Response(200, content=body, headers={"content-type": PBF_CONTENT_TYPE})
+
+
+class TestPBFCodec:
+    def test_feature_result_round_trip(self):
+        """Test attributes and multi-part delta-encoded geometry decode to the f=json shape"""
+        features = [polyline(i) for i in range(3)]
+
+        result = decode_query_result(encode_feature_result(features, exceeded_transfer_limit=True))
+
+        assert result["features"] == features
+        assert result["exceededTransferLimit"] is True
+        assert result["spatialReference"] == {"wkid": 4326}
+
+    def test_features_without_geometry(self):
+        """Test features with no geometry keep their place between geometric ones"""
+        features = [polyline(0), {"attributes": {"OBJECTID": 1}}, polyline(2)]
+
+        result = decode_query_result(encode_feature_result(features))
+
+        assert "geometry" not in result["features"][1]
+        assert result["features"][2]["geometry"] == polyline(2)["geometry"]
+
+    def test_polygon_and_point(self):
+        """Test polygons decode to rings and points to x/y"""
+        ring = [[106.0, -6.0], [106.1, -6.0], [106.1, -6.1], [106.0, -6.0]]
+        polygons = decode_query_result(encode_feature_result(
+            [{"attributes": {"OBJECTID": 1}, "geometry": {"rings": [ring]}}], geometry_type="esriGeometryPolygon"
+        ))
+        points = decode_query_result(encode_feature_result(
+            [{"attributes": {"OBJECTID": 1}, "geometry": {"x": 106.5, "y": -6.5}}], geometry_type="esriGeometryPoint"
+        ))
+
+        assert polygons["features"][0]["geometry"] == {"rings": [ring]}
+        assert points["features"][0]["geometry"] == {"x": 106.5, "y": -6.5}
+
+    def test_count_and_object_ids(self):
+        """Test count-only and ID-only results"""
+        assert decode_query_result(encode_count(1234)) == {"count": 1234}
+        assert decode_query_result(encode_object_ids([3, 1, 300000]))["objectIds"] == [3, 1, 300000]
+
+    def test_malformed(self):
+        """Test truncated payloads raise PBFDecodeError"""
+        with pytest.raises(PBFDecodeError):
+            decode_query_result(encode_feature_result([polyline(0)])[:-5])
+
+    def test_to_geodataframe(self):
+        """Test decoded results convert straight to a GeoDataFrame"""
+        gdf = to_geodataframe(decode_query_result(encode_feature_result([polyline(0)])))
+
+        assert gdf.crs.to_epsg() == 4326
+        assert gdf.iloc[0]["FlightID"] == "F0"
+        assert gdf.geometry.iloc[0].geom_type == "MultiLineString"
+
+    def test_decode_geodataframe_matches_dict_path(self):
+        """Test the vectorized GeoDataFrame decoder agrees with the dict decoder"""
+        ring = [[106.0, -6.0], [106.1, -6.0], [106.1, -6.1], [106.0, -6.0]]
+        lines = encode_feature_result([polyline(0), {"attributes": {"OBJECTID": 1}}, polyline(2)])
+        polygons = encode_feature_result(
+            [{"attributes": {"OBJECTID": 1}, "geometry": {"rings": [ring]}}], geometry_type="esriGeometryPolygon"
+        )
+
+        for body in (lines, polygons):
+            direct = decode_geodataframe(body)
+            via_dicts = to_geodataframe(decode_query_result(body))
+            assert list(direct["OBJECTID"]) == list(via_dicts["OBJECTID"])
+            assert all(
+                (a is None and b is None) or a.equals(b)
+                for a, b in zip(direct.geometry, via_dicts.geometry)
+            )
+
+
+class TestPBFQueries:
+    @respx.mock
+    async def test_queries_use_pbf(self):
+        """Test count and ID queries are sent as f=pbf"""
+        route = respx.get(f"{LAYER_URL}/query").mock(side_effect=[
+            pbf_response(encode_count(2)),
+            pbf_response(encode_object_ids([5, 4])),
+        ])
+        engine = FeatureQueryEngine(httpx.AsyncClient(), LAYER_URL, "tok", query_format="pbf")
+
+        assert await engine.count("1=1") == 2
+        assert await engine.object_ids("1=1") == [4, 5]
+        assert all(call.request.url.params["f"] == "pbf" for call in route.calls)
+
+    @respx.mock
+    async def test_falls_back_to_json_and_remembers(self):
+        """Test a layer that rejects f=pbf is retried and then queried with f=json"""
+        def handler(request):
+            if request.url.params["f"] == "pbf":
+                return httpx.Response(200, json={"error": {"code": 400, "message": "Invalid format"}})
+            return httpx.Response(200, json={"count": 7})
+
+        route = respx.get(f"{LAYER_URL}/query").mock(side_effect=handler)
+        engine = FeatureQueryEngine(httpx.AsyncClient(), LAYER_URL, "tok", query_format="pbf")
+
+        assert await engine.count("1=1") == 7
+        assert await engine.count("1=1") == 7
+        assert [call.request.url.params["f"] for call in route.calls] == ["pbf", "json", "json"]
+        assert f"{LAYER_URL}/query" in feature_query._pbf_unsupported
+
+    @respx.mock
+    async def test_non_format_error_does_not_disable_pbf(self):
+        """Test an error that JSON also reports leaves the layer on pbf"""
+        respx.get(f"{LAYER_URL}/query").mock(
+            return_value=httpx.Response(200, json={"error": {"code": 498, "message": "Invalid token"}})
+        )
+        engine = FeatureQueryEngine(httpx.AsyncClient(), LAYER_URL, "tok", query_format="pbf")
+
+        with pytest.raises(ArcGISUploadError, match="Invalid token"):
+            await engine.count("1=1")
+        assert engine.use_pbf
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from app.core.revocation import RevocationList
+
+
+class TestRevocationList:
+    async def test_first_load_then_background_refresh(self):
+        """Test the list loads before the first check and later refreshes without blocking"""
+        remote = {"users": {}, "tokens": {}}
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return dict(remote["users"]), dict(remote["tokens"])
+
+        revocations = RevocationList(loader=loader, store=lambda *args: None, refresh_interval=0)
+        await revocations.ensure_fresh()
+        assert not revocations.is_revoked({"sub": "u1", "iat": 1})
+
+        remote["users"]["u1"] = time.time()
+        await revocations.ensure_fresh()
+        await asyncio.sleep(0.05)
+
+        assert revocations.is_revoked({"sub": "u1", "iat": 1})
+        assert not revocations.is_revoked({"sub": "u1", "iat": time.time() + 10})
+        assert len(loads) == 2
+
+    async def test_local_revocations_apply_immediately(self):
+        """Test tokens revoked in this process are rejected before the store returns them"""
+        stored = []
+        revocations = RevocationList(loader=lambda: ({}, {}), store=lambda *args: stored.append(args))
+        await revocations.ensure_fresh()
+
+        await revocations.revoke_token("abc", time.time() + 60)
+        await revocations.ensure_fresh()
+
+        assert revocations.is_revoked({"sub": "u1", "jti": "abc"})
+        assert not revocations.is_revoked({"sub": "u1", "jti": "def"})
+        assert stored[0][:2] == ("token", "abc")
+
+    async def test_expired_tokens_are_dropped(self):
+        """Test token entries past their expiry are pruned on reload"""
+        revocations = RevocationList(loader=lambda: ({}, {"old": time.time() - 1}), store=lambda *args: None)
+        await revocations.ensure_fresh()
+
+        assert not revocations.is_revoked({"sub": "u1", "jti": "old"})
@@ -41,6 +41,22 @@ class TestSecurity:
         assert decoded["gis_auth_username"] == "gis_user"
         assert "exp" in decoded  # Expiration should be added
 
+    def test_token_ids_and_claims(self):
+        """Test every token gets its own ID and issue time alongside the user claims"""
+        from datetime import datetime
+        from app.core.security import token_claims
+        from app.models.user import UserInDB
+        user = UserInDB(
+            id="user123", gis_auth_username="gis_user", hashed_gis_auth_password="x", created_at=datetime(2025, 1, 1)
+        )
+
+        first = decode_access_token(create_access_token(data=token_claims(user)))
+        second = decode_access_token(create_access_token(data=token_claims(user)))
+
+        assert first["jti"] != second["jti"]
+        assert "iat" in first
+        assert (first["sub"], first["gis_auth_username"], first["active"]) == ("user123", "gis_user", True)
+
     def test_decode_invalid_token(self):
         """Test decoding invalid token returns None"""
         result = decode_access_token("invalid.token.here")
@@ -64,3 +80,43 @@ class TestSecurity:
         empty_hash = get_password_hash("")
         assert verify_password("", empty_hash) == True
         assert verify_password("notempty", empty_hash) == False
+
+
+class TestPasswordHasher:
+    async def test_verify_and_rehash_on_cost_change(self):
+        """Test a hash with a different bcrypt cost verifies and comes back rehashed"""
+        from passlib.context import CryptContext
+        from app.core.security import PasswordHasher
+
+        old = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("pw")
+        current = CryptContext(
+            schemes=["bcrypt"], bcrypt__default_rounds=5, bcrypt__min_rounds=5, bcrypt__max_rounds=5
+        )
+        hasher = PasswordHasher(current, workers=1)
+
+        verified, new_hash = await hasher.verify_and_update("pw", old)
+        assert verified and new_hash.startswith("$2b$05$")
+        assert await hasher.verify_and_update("pw", new_hash) == (True, None)
+        assert await hasher.verify_and_update("nope", old) == (False, None)
+
+    async def test_sheds_beyond_queue_limit(self):
+        """Test jobs past the queue limit are refused with 503 and counted"""
+        import asyncio
+        import threading
+        from app.core.exceptions import ServiceBusyError
+        from app.core.security import PasswordHasher
+
+        release = threading.Event()
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        first = asyncio.ensure_future(hasher._run(release.wait))
+        second = asyncio.ensure_future(hasher._run(release.wait))
+        await asyncio.sleep(0)
+
+        assert hasher.waiting == 1
+        with pytest.raises(ServiceBusyError):
+            await hasher._run(release.wait)
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["peak_waiting"] == 1
@@ -0,0 +1,45 @@
+import zipfile
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import LineString
+
+from app.core.exceptions import FileProcessingError
+from app.services.shapefile_service import ShapefileService
+
+
+@pytest.fixture
+def zones_zip(temp_work_dir):
+    gdf = gpd.GeoDataFrame({
+        "Name": [f"Z{i}" for i in range(5)],
+        "geometry": [LineString([(106.0 + i * 1e-3, -6.0), (106.0, -6.01)]) for i in range(5)],
+    }, crs="EPSG:4326")
+    shp = temp_work_dir / "SPK1.shp"
+    gdf.to_file(shp, driver="ESRI Shapefile")
+    zip_path = temp_work_dir / "final_upload.zip"
+    with zipfile.ZipFile(zip_path, "w") as z:
+        for ext in ("shp", "shx", "dbf", "prj", "cpg"):
+            p = shp.with_suffix(f".{ext}")
+            if p.exists():
+                z.write(p, p.name)
+    return zip_path
+
+
+class TestShapefilePartitioning:
+    def test_count_features(self, zones_zip, temp_work_dir):
+        """Test the feature count is read from the .dbf header"""
+        assert ShapefileService.count_features(zones_zip) == 5
+
+        empty = temp_work_dir / "empty.zip"
+        with zipfile.ZipFile(empty, "w") as z:
+            z.writestr("readme.txt", "nothing here")
+        with pytest.raises(FileProcessingError):
+            ShapefileService.count_features(empty)
+
+    def test_partition_keeps_order(self, zones_zip, temp_work_dir):
+        """Test parts hold at most `size` features and concatenate back to the original order"""
+        parts = ShapefileService.partition_shapefile_zip(zones_zip, temp_work_dir, 2)
+
+        assert [ShapefileService.count_features(p) for p in parts] == [2, 2, 1]
+        names = [name for part in parts for name in gpd.read_file(f"zip://{part}")["Name"]]
+        assert names == [f"Z{i}" for i in range(5)]
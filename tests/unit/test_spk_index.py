@@ -0,0 +1,54 @@
+import pytest
+
+from app.services.spk_index import SPKIndex
+
+LAYER = "https://arcgis.test/FeatureServer/0"
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SPKIndex(str(tmp_path / "index.sqlite3"), max_age=60)
+    yield index
+    index.close()
+
+
+class TestSPKIndex:
+    def test_unknown_until_reconciled(self, index):
+        """Test adds alone never make an SPK authoritative"""
+        index.add(LAYER, "SPK1", [1, 2])
+        assert index.lookup(LAYER, "SPK1") is None
+
+        index.reconcile(LAYER, "SPK1", [5, 3])
+        assert index.lookup(LAYER, "SPK1") == [3, 5]
+
+    def test_adds_and_deletes_keep_entry_current(self, index):
+        """Test addResults and deleteResults update a reconciled entry"""
+        index.reconcile(LAYER, "SPK1", [1, 2])
+        index.add(LAYER, "SPK1", [7])
+        index.remove(LAYER, "SPK1", [1])
+
+        assert index.lookup(LAYER, "SPK1") == [2, 7]
+        assert index.lookup("https://other/FeatureServer/0", "SPK1") is None
+
+    def test_expired_and_invalidated_entries(self, index):
+        """Test entries past max_age or invalidated need a live query"""
+        index.reconcile(LAYER, "SPK1", [1])
+        index.invalidate(LAYER, "SPK1")
+        assert index.lookup(LAYER, "SPK1") is None
+
+        index.reconcile(LAYER, "SPK2", [])
+        assert index.lookup(LAYER, "SPK2") == []
+        index.max_age = -1
+        assert index.lookup(LAYER, "SPK2") is None
+        assert index.stale(LAYER, older_than=0, limit=10) == ["SPK2"]
+
+    def test_persists_across_connections(self, tmp_path):
+        """Test the index survives a restart"""
+        path = str(tmp_path / "index.sqlite3")
+        first = SPKIndex(path, max_age=60)
+        first.reconcile(LAYER, "SPK1", [4])
+        first.close()
+
+        second = SPKIndex(path, max_age=60)
+        assert second.lookup(LAYER, "SPK1") == [4]
+        second.close()
@@ -0,0 +1,66 @@
+from app.services.spk_sync import SPKSyncPlanner
+
+
+def feature(flight_id, oid=None, area=1.0, path=((0.0, 0.0), (1.0, 1.0)), **extra):
+    attributes = {"FlightID": flight_id, "TaskArea": area, "SPKNumber": "SPK1", "CRT_Date": 1, **extra}
+    if oid is not None:
+        attributes["OBJECTID"] = oid
+    return {"attributes": attributes, "geometry": {"paths": [[list(p) for p in path]]}}
+
+
+class TestSPKSyncPlanner:
+    def test_plan_diff(self):
+        """Test new, changed, unchanged and vanished flights are classified"""
+        existing = [
+            feature("F1", oid=1),
+            feature("F2", oid=2, area=5.0),
+            feature("F3", oid=3, path=((0.0, 0.0), (2.0, 2.0))),
+            feature("F4", oid=4),
+        ]
+        new = [feature("F1"), feature("F2"), feature("F3"), feature("F5")]
+
+        plan = SPKSyncPlanner(precision=7).plan(existing, new)
+
+        assert [f["attributes"]["FlightID"] for f in plan.adds] == ["F5"]
+        assert [f["attributes"]["OBJECTID"] for f in plan.updates] == [2, 3]
+        assert plan.deletes == [4]
+        assert plan.unchanged == ["F1"]
+
+    def test_update_omits_unchanged_geometry_and_creation_date(self):
+        """Test attribute-only updates carry no geometry and keep CRT_Date"""
+        plan = SPKSyncPlanner(precision=7).plan([feature("F1", oid=7, area=2.0)], [feature("F1")])
+
+        update = plan.updates[0]
+        assert "geometry" not in update
+        assert "CRT_Date" not in update["attributes"]
+        assert update["attributes"]["OBJECTID"] == 7
+
+    def test_bookkeeping_fields_and_precision_ignored(self):
+        """Test ProcessedDate changes and sub-precision noise are not diffs"""
+        existing = [feature("F1", oid=1, ProcessedDate=1, path=((0.00000001, 0.0), (1.0, 1.0)))]
+        new = [feature("F1", ProcessedDate=2)]
+
+        plan = SPKSyncPlanner(precision=7).plan(existing, new)
+
+        assert plan.unchanged == ["F1"]
+        assert not plan.updates
+
+    def test_duplicate_flights_deleted(self):
+        """Test duplicate live rows for a FlightID are removed"""
+        plan = SPKSyncPlanner(precision=7).plan([feature("F1", oid=1), feature("F1", oid=2)], [feature("F1")])
+
+        assert plan.deletes == [2]
+        assert plan.summary()["unchanged"] == 1
+
+    def test_placeholder_flight_times_ignored(self):
+        """Test a flight time the input did not provide is neither a diff nor overwritten"""
+        existing = [feature("F1", oid=1, StartFlight=1000, EndFlight=2000)]
+        new = [feature("F1", StartFlight=9999, EndFlight=2000), feature("F1", StartFlight=9999, EndFlight=3000)]
+        planner = SPKSyncPlanner(precision=7)
+
+        assert planner.plan(existing, new[:1], {"F1": {"StartFlight"}}).unchanged == ["F1"]
+        assert planner.plan(existing, new[:1]).updates
+
+        update = planner.plan(existing, new[1:], {"F1": {"StartFlight"}}).updates[0]
+        assert "StartFlight" not in update["attributes"]
+        assert update["attributes"]["EndFlight"] == 3000
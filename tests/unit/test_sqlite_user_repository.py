@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.user import UserCreate
+from app.services.sqlite_user_repository import SQLiteUserRepository
+from app.services.user_repository import UserRepository, UsernameTakenError
+from app.services.user_service import UserService
+
+
+def user_data(**overrides):
+    return {
+        "gis_auth_username": "Agasha123",
+        "full_name": "Test User",
+        "hashed_gis_auth_password": "x",
+        "is_active": True,
+        "created_at": datetime(2025, 1, 1),
+        **overrides
+    }
+
+
+class TestSQLiteUserRepository:
+    async def test_round_trip(self, user_store):
+        """Test a created user reads back by ID and by normalized username"""
+        created = await user_store.create("u1", user_data())
+
+        assert created.created_at == datetime(2025, 1, 1)
+        assert (await user_store.get_by_id("u1")) == created
+        assert (await user_store.get_by_username(" agasha123 ")).id == "u1"
+        assert await user_store.get_by_username("someone") is None
+
+    async def test_username_is_unique(self, user_store):
+        """Test a second user with the same name in another case is rejected"""
+        await user_store.create("u1", user_data())
+
+        with pytest.raises(UsernameTakenError):
+            await user_store.create("u2", user_data(gis_auth_username="AGASHA123"))
+        assert await user_store.get_by_id("u2") is None
+
+    async def test_update(self, user_store):
+        """Test updates change only the given fields"""
+        await user_store.create("u1", user_data())
+        await user_store.update("u1", {"hashed_gis_auth_password": "y", "is_active": False})
+
+        user = await user_store.get_by_id("u1")
+        assert user.hashed_gis_auth_password == "y"
+        assert user.is_active is False
+        assert user.full_name == "Test User"
+
+    def test_revocations_survive_reopen(self, tmp_path):
+        """Test revocations persist and expired token entries are dropped"""
+        path = str(tmp_path / "users.sqlite3")
+        store = SQLiteUserRepository(path)
+        store.store_revocation("user", "u1", 100.0)
+        store.store_revocation("token", "live", 4e9)
+        store.store_revocation("token", "expired", 1.0)
+        store.close()
+
+        reopened = SQLiteUserRepository(path)
+        assert reopened.load_revocations() == ({"u1": 100.0}, {"live": 4e9})
+        reopened.close()
+
+    async def test_user_service_on_sqlite(self, user_store, mocker):
+        """Test registration and login work end to end without Firebase"""
+        mocker.patch("app.services.user_service.password_hasher.hash", return_value="hashed")
+        mocker.patch("app.services.user_service.password_hasher.verify_and_update", return_value=(True, None))
+        created = await UserService.create_user(UserCreate(gis_auth_username="new", gis_auth_password="pw"))
+
+        assert (await UserService.authenticate_user("New", "pw")).id == created.id
+        with pytest.raises(ValueError):
+            await UserService.create_user(UserCreate(gis_auth_username="NEW", gis_auth_password="pw"))
+
+
+class TestUserRepository:
+    def test_partial_backend_cannot_be_constructed(self):
+        """Test a backend missing any storage method fails at construction, not on first call"""
+        class NoRevocations(UserRepository):
+            async def get_by_id(self, user_id):
+                return None
+
+        with pytest.raises(TypeError):
+            NoRevocations()
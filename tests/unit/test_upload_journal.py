@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.upload_journal import UploadJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = UploadJournal(str(tmp_path / "journal.sqlite3"), str(tmp_path / "uploads"), lease=60)
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def zip_file(tmp_path):
+    path = tmp_path / "final_upload.zip"
+    path.write_bytes(b"PK")
+    return path
+
+
+class TestUploadJournal:
+    def test_create_keeps_zip_copy(self, journal, zip_file):
+        """Test a new upload is running, at the first stage and has its own ZIP copy"""
+        upload_id = journal.create("SPK1", "KEY1", "direct", "replace", zip_file)
+        entry = journal.get(upload_id)
+
+        assert (entry["spk"], entry["stage"], entry["status"]) == ("SPK1", "received", "running")
+        assert journal.zip_path(upload_id).read_bytes() == b"PK"
+        assert journal.get("missing") is None
+
+    def test_batch_checkpoints(self, journal, zip_file):
+        """Test committed batches feed the skip set and uncommitted ones are flagged"""
+        upload_id = journal.create("SPK1", "KEY1", "direct", "replace", zip_file)
+        journal.batch_sent(upload_id, 0, ["Z1", "Z2"])
+        journal.batch_committed(upload_id, 0, ["Z1", "Z2"], [11, 12])
+        journal.batch_sent(upload_id, 1, ["Z3"])
+
+        assert journal.committed_flight_ids(upload_id) == {"Z1", "Z2"}
+        assert journal.committed_object_ids(upload_id) == [11, 12]
+        assert journal.has_uncommitted_batches(upload_id)
+        assert journal.next_batch_index(upload_id) == 2
+        assert journal.get(upload_id)["features_committed"] == 2
+
+    def test_claim_respects_lease_and_completion(self, journal, zip_file):
+        """Test a running upload cannot be claimed, a failed one can, and a completed one never"""
+        upload_id = journal.create("SPK1", "KEY1", "direct", "replace", zip_file)
+        assert not journal.claim(upload_id)
+
+        journal.fail(upload_id, "502 Bad Gateway")
+        assert journal.get(upload_id)["error"] == "502 Bad Gateway"
+        assert journal.claim(upload_id)
+
+        journal.complete(upload_id)
+        assert not journal.claim(upload_id)
+        assert not journal.zip_path(upload_id).exists()
+
+    def test_purge_drops_expired_uploads(self, tmp_path, zip_file):
+        """Test uploads past the retention period are forgotten with their ZIP copies"""
+        journal = UploadJournal(str(tmp_path / "j.sqlite3"), str(tmp_path / "files"), retention=-1)
+        upload_id = journal.create("SPK1", "KEY1", "direct", "replace", zip_file)
+
+        assert journal.purge() == 1
+        assert journal.get(upload_id) is None
+        assert not journal.zip_path(upload_id).exists()
+        journal.close()
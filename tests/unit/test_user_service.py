@@ -0,0 +1,330 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from app.models.user import UserCreate
+from app.services import user_service
+from app.services.firestore_user_repository import FirestoreUserRepository
+from app.services.user_repository import UsernameTakenError, set_user_repository
+from app.services.user_service import UserService
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.doc_id = doc_id
+        self.id = doc_id
+
+    async def get(self, transaction=None):
+        self.collection.reads += 1
+        return FakeSnapshot(self.doc_id, self.collection.docs.get(self.doc_id))
+
+    async def set(self, data):
+        self.collection.docs[self.doc_id] = dict(data)
+
+    async def update(self, data):
+        self.collection.docs[self.doc_id].update(data)
+
+
+class FakeQuery:
+    def __init__(self, collection, field, value):
+        self.collection = collection
+        self.field = field
+        self.value = value
+
+    def limit(self, n):
+        return self
+
+    async def stream(self):
+        self.collection.reads += 1
+        for doc_id, data in list(self.collection.docs.items()):
+            if data.get(self.field) == self.value:
+                yield FakeSnapshot(doc_id, data)
+
+
+class FakeCollection:
+    """In-memory stand-in for an async Firestore collection"""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    def document(self, doc_id):
+        return FakeDocument(self, doc_id)
+
+    def where(self, field, op, value):
+        return FakeQuery(self, field, value)
+
+    async def stream(self):
+        self.reads += 1
+        for doc_id, data in list(self.docs.items()):
+            yield FakeSnapshot(doc_id, data)
+
+
+class FakeTransaction:
+    """Buffers writes until commit, with the hooks async_transactional drives"""
+
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self):
+        self._id = None
+        self.writes = []
+
+    def _clean_up(self):
+        self._id = None
+
+    async def _begin(self, retry_id=None):
+        self._id = b"txn"
+
+    async def _commit(self):
+        for ref, data in self.writes:
+            ref.collection.docs[ref.doc_id] = dict(data)
+        self._clean_up()
+
+    async def _rollback(self):
+        self.writes = []
+        self._clean_up()
+
+    def set(self, ref, data):
+        self.writes.append((ref, data))
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def collection(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def transaction(self):
+        return FakeTransaction()
+
+
+class FakeSyncCollection:
+    """Sync stand-in for the revocations collection, with write batches"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def document(self, doc_id):
+        collection = self
+
+        class Ref:
+            id = doc_id
+
+            def set(self, data):
+                collection.docs[doc_id] = dict(data)
+        return Ref()
+
+    def stream(self, predicate=lambda data: True):
+        for doc_id, data in list(self.docs.items()):
+            if predicate(data):
+                snapshot = FakeSnapshot(doc_id, data)
+                snapshot.reference = self.document(doc_id)
+                yield snapshot
+
+    def where(self, field, op, value):
+        assert op == "<="
+        collection = self
+
+        class Query:
+            def stream(self):
+                return collection.stream(lambda data: field in data and data[field] <= value)
+        return Query()
+
+    def batch(self):
+        collection = self
+
+        class Batch:
+            def __init__(self):
+                self.refs = []
+
+            def delete(self, ref):
+                self.refs.append(ref)
+
+            def commit(self):
+                for ref in self.refs:
+                    collection.docs.pop(ref.id, None)
+        return Batch()
+
+
+@pytest.fixture
+def revocation_docs(mocker):
+    collection = FakeSyncCollection()
+    fake = mocker.Mock(collection=lambda name: collection, batch=collection.batch)
+    mocker.patch("app.services.firestore_user_repository.get_firestore_client", return_value=fake)
+    return collection.docs
+
+
+@pytest.fixture
+def client():
+    client = FakeClient()
+    set_user_repository(FirestoreUserRepository(client))
+    user_service.user_cache.clear()
+    yield client
+    set_user_repository(None)
+    user_service.user_cache.clear()
+
+
+@pytest.fixture
+def users(client):
+    return client.collection("users")
+
+
+@pytest.fixture
+def usernames(client):
+    return client.collection("usernames")
+
+
+def user_doc(**overrides):
+    return {
+        "gis_auth_username": "agasha123",
+        "full_name": "Test User",
+        "hashed_gis_auth_password": "x",
+        "is_active": True,
+        "created_at": datetime(2025, 1, 1),
+        **overrides
+    }
+
+
+class TestUserCache:
+    async def test_repeat_lookups_hit_cache(self, users):
+        """Test a user is read from Firestore once and then served from the cache"""
+        users.docs["u1"] = user_doc()
+
+        first = await UserService.get_user_by_id("u1")
+        second = await UserService.get_user_by_id("u1")
+
+        assert first.gis_auth_username == second.gis_auth_username == "agasha123"
+        assert users.reads == 1
+        assert UserService.cache_stats()["hits"] >= 1
+
+    async def test_missing_users_are_not_cached(self, users):
+        """Test unknown IDs keep going to Firestore so new users are found"""
+        assert await UserService.get_user_by_id("u2") is None
+        users.docs["u2"] = user_doc()
+
+        assert await UserService.get_user_by_id("u2") is not None
+        assert users.reads == 2
+
+    async def test_invalidate_on_write(self, users):
+        """Test invalidation makes the next lookup see a changed document"""
+        users.docs["u1"] = user_doc()
+        await UserService.get_user_by_id("u1")
+        users.docs["u1"] = user_doc(is_active=False)
+
+        assert UserService.invalidate_user("u1")
+        assert (await UserService.get_user_by_id("u1")).is_active is False
+
+    async def test_create_user_writes_through(self, users, mocker):
+        """Test creating a user leaves no stale entry behind"""
+        mocker.patch("app.services.user_service.password_hasher.hash", return_value="hashed")
+        created = await UserService.create_user(UserCreate(gis_auth_username="new", gis_auth_password="pw"))
+
+        assert (await UserService.get_user_by_id(created.id)).gis_auth_username == "new"
+        # one username check, then one read by ID
+        assert users.reads == 2
+
+
+class TestUsernameIndex:
+    async def test_login_lookup_is_a_document_get(self, users, usernames, mocker):
+        """Test registration indexes the username and lookups use it instead of a query"""
+        mocker.patch("app.services.user_service.password_hasher.hash", return_value="hashed")
+        created = await UserService.create_user(UserCreate(gis_auth_username="New.User", gis_auth_password="pw"))
+        users.reads = 0
+
+        assert usernames.docs["new.user"] == {"user_id": created.id}
+        found = await UserService.get_user_by_gis_auth_username(" New.User ")
+        assert found.id == created.id
+        assert users.reads == 1
+        assert (await UserService.get_user_by_gis_auth_username("new.user")).id == created.id
+
+    async def test_taken_username_writes_nothing(self, users, usernames, mocker):
+        """Test the transaction rejects a name that is already indexed, in any case"""
+        mocker.patch("app.services.user_service.password_hasher.hash", return_value="hashed")
+        await UserService.create_user(UserCreate(gis_auth_username="agasha123", gis_auth_password="pw"))
+        mocker.patch.object(UserService, "get_user_by_gis_auth_username", return_value=None)
+
+        with pytest.raises(UsernameTakenError):
+            await UserService.create_user(UserCreate(gis_auth_username="AGASHA123", gis_auth_password="pw"))
+        assert len(users.docs) == 1
+        assert len(usernames.docs) == 1
+
+    async def test_unindexed_user_is_backfilled(self, users, usernames):
+        """Test a user from before the index is found by query once, then by index"""
+        users.docs["u1"] = user_doc()
+
+        assert (await UserService.get_user_by_gis_auth_username("agasha123")).id == "u1"
+        assert usernames.docs["agasha123"] == {"user_id": "u1"}
+
+        users.reads = 0
+        assert (await UserService.get_user_by_gis_auth_username("agasha123")).id == "u1"
+        assert users.reads == 1
+
+    async def test_exact_case_wins_on_legacy_clash(self, users, usernames):
+        """Test legacy users differing only by case each still log in with their own name"""
+        users.docs["u1"] = user_doc(gis_auth_username="Agasha123")
+        users.docs["u2"] = user_doc(gis_auth_username="AGASHA123")
+
+        assert (await UserService.get_user_by_gis_auth_username("Agasha123")).id == "u1"
+        assert (await UserService.get_user_by_gis_auth_username("AGASHA123")).id == "u2"
+        assert (await UserService.get_user_by_gis_auth_username("Agasha123")).id == "u1"
+
+    async def test_backfill_indexes_legacy_users_and_reports_clashes(self, client, users, usernames):
+        """Test the migration lets legacy users log in in any case and leaves clashes unindexed"""
+        users.docs["u1"] = user_doc(gis_auth_username="Mixed.Case")
+        users.docs["u2"] = user_doc(gis_auth_username="Twin")
+        users.docs["u3"] = user_doc(gis_auth_username="TWIN")
+
+        clashes = await FirestoreUserRepository(client).backfill_username_index()
+
+        assert clashes == {"twin": ["u2", "u3"]}
+        assert usernames.docs == {"mixed.case": {"user_id": "u1"}}
+        assert (await UserService.get_user_by_gis_auth_username("mixed.case")).id == "u1"
+
+
+class TestFirestoreRevocations:
+    def test_expired_tokens_are_purged(self, revocation_docs):
+        """Test loading and storing revocations delete token entries that have expired"""
+        repository = FirestoreUserRepository(FakeClient())
+        now = time.time()
+        repository.store_revocation("user", "u1", now)
+        repository.store_revocation("token", "old", now - 10)
+        repository.store_revocation("token", "live", now + 60)
+
+        assert set(revocation_docs) == {"user:u1", "live"}
+
+        revocation_docs["stale"] = {"kind": "token", "expires_at": now - 5}
+        users, tokens = repository.load_revocations()
+
+        assert users == {"u1": now}
+        assert tokens == {"live": now + 60}
+        assert set(revocation_docs) == {"user:u1", "live"}
+
+
+class TestAuthenticateUser:
+    async def test_rehashes_outdated_cost(self, users):
+        """Test a successful login with an outdated hash stores the new one"""
+        from passlib.context import CryptContext
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("pw")
+        users.docs["u1"] = user_doc(hashed_gis_auth_password=old_hash)
+
+        assert await UserService.authenticate_user("agasha123", "wrong") is None
+        assert users.docs["u1"]["hashed_gis_auth_password"] == old_hash
+
+        user = await UserService.authenticate_user("agasha123", "pw")
+        assert user.id == "u1"
+        assert users.docs["u1"]["hashed_gis_auth_password"] != old_hash
+        assert (await UserService.get_user_by_id("u1")).hashed_gis_auth_password == users.docs["u1"]["hashed_gis_auth_password"]
@@ -0,0 +1,103 @@
+import io
+import os
+import time
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from app.core.exceptions import InvalidFileFormatError, WorkspaceQuotaExceededError
+from app.services.artifacts import ArtifactStore
+from app.utils.file_utils import FileUtils
+from app.utils.workspace import WorkspaceManager
+
+
+class TestWorkspaceManager:
+    def test_workspaces_are_isolated(self, tmp_path):
+        """Test every request gets its own directory and cleanup removes only that one"""
+        manager = WorkspaceManager(str(tmp_path))
+        first, second = manager.create(), manager.create()
+        (first.path / "data.zip").write_bytes(b"a")
+        (second.path / "data.zip").write_bytes(b"b")
+
+        first.cleanup()
+        assert not first.path.exists()
+        assert (second.path / "data.zip").read_bytes() == b"b"
+
+    def test_quota(self, tmp_path):
+        """Test a workspace refuses files past its quota, including archives before extraction"""
+        workspace = WorkspaceManager(str(tmp_path), quota=1000).create()
+        (workspace.path / "a.bin").write_bytes(b"x" * 600)
+        workspace.check_quota()
+
+        with pytest.raises(WorkspaceQuotaExceededError) as exc:
+            workspace.check_quota(incoming=500)
+        assert exc.value.status_code == 413
+
+        archive = tmp_path / "big.zip"
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("zeros.kml", b"0" * 5000)
+        with pytest.raises(WorkspaceQuotaExceededError):
+            FileUtils.extract_zip(archive, workspace.path, workspace)
+        assert not (workspace.path / "zeros.kml").exists()
+
+    async def test_upload_stops_at_remaining_quota(self, tmp_path):
+        """Test an upload is cut off before it would overrun the workspace, leaving no partial file"""
+        workspace = WorkspaceManager(str(tmp_path), quota=1000).create()
+        (workspace.path / "a.bin").write_bytes(b"x" * 600)
+        upload = UploadFile(file=io.BytesIO(b"y" * 500), filename="data.zip")
+
+        with pytest.raises(WorkspaceQuotaExceededError):
+            await FileUtils.persist_upload(upload, workspace.path, workspace=workspace)
+        assert not (workspace.path / "data.zip").exists()
+        assert workspace.usage() == 600
+
+    def test_extract_refuses_paths_outside_workspace(self, tmp_path):
+        """Test entries that would land outside the target directory are not written"""
+        workspace = WorkspaceManager(str(tmp_path / "root"), quota=10000).create()
+        archive = tmp_path / "evil.zip"
+        with zipfile.ZipFile(archive, "w") as z:
+            z.writestr("../escape.txt", b"x")
+
+        with pytest.raises(InvalidFileFormatError):
+            FileUtils.extract_zip(archive, workspace.path, workspace)
+        assert not (workspace.path.parent / "escape.txt").exists()
+
+    def test_sweep_removes_only_stale(self, tmp_path):
+        """Test leftovers of a killed worker are swept while live workspaces stay"""
+        manager = WorkspaceManager(str(tmp_path), stale_after=60)
+        stale, live = manager.create(), manager.create()
+        old = time.time() - 120
+        os.utime(stale.path, (old, old))
+
+        assert manager.sweep() == 1
+        assert not stale.path.exists()
+        assert live.path.exists()
+
+
+class TestArtifactStore:
+    def test_artifacts_are_keyed_by_id(self, tmp_path):
+        """Test two saves of the same file name keep separate copies"""
+        store = ArtifactStore(str(tmp_path / "artifacts"))
+        src = tmp_path / "final_upload.zip"
+        src.write_bytes(b"first")
+        first = store.save(src, "final_upload.zip")
+        src.write_bytes(b"second")
+        second = store.save(src, "final_upload.zip")
+
+        assert store.path(first, "final_upload.zip").read_bytes() == b"first"
+        assert store.path(second, "final_upload.zip").read_bytes() == b"second"
+        assert store.path("../" + first, "final_upload.zip") is None
+
+    def test_expired_artifacts_are_gone(self, tmp_path):
+        """Test artifacts past their TTL are neither served nor kept"""
+        store = ArtifactStore(str(tmp_path / "artifacts"), ttl=60)
+        src = tmp_path / "zones_for_edit.zip"
+        src.write_bytes(b"zones")
+        artifact_id = store.save(src, "zones_for_edit.zip")
+        old = time.time() - 120
+        os.utime(store.directory / artifact_id / "zones_for_edit.zip", (old, old))
+        os.utime(store.directory / artifact_id, (old, old))
+
+        assert store.path(artifact_id, "zones_for_edit.zip") is None
+        assert store.purge() == 1